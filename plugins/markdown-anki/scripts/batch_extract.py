@@ -3,36 +3,158 @@
 批量提取目录中所有Markdown文件的生词。
 
 用法：
-    python batch_extract.py <input_dir> [output_dir]
+    python batch_extract.py <input_dir> [output_dir] [--recursive] [--max-depth N]
+                            [--include GLOB ...] [--exclude GLOB ...] [--follow-symlinks]
 
 输出：
     - 每个输入文件生成对应的JSON文件
     - output_dir默认为 /tmp/<input_dir_name>/
     - 每个文件的deck_name使用文件名（不含扩展名）
+    - 递归模式下JSON文件名包含相对路径（如 S01/0101.md -> S01_0101.json），避免重名覆盖
 """
 
+import argparse
+import os
 import sys
+from fnmatch import fnmatchcase
 from pathlib import Path
+from typing import Iterator, Sequence
 
 # 导入同目录的extract_words模块
 sys.path.insert(0, str(Path(__file__).parent))
 from extract_words import extract_words_from_file
+from cache_io import write_json
+from word_item import deck_to_json
 
 
-def batch_extract(input_dir: str, output_dir: str | None = None, pattern: str = "*.md") -> list[str]:
+def _matches(rel_path: str, name: str, patterns: Sequence[str]) -> bool:
+    """不含 / 的模式匹配文件名，含 / 的模式匹配相对路径"""
+    for pattern in patterns:
+        if fnmatchcase(rel_path if '/' in pattern else name, pattern):
+            return True
+    return False
+
+
+def discover_files(root: str | Path, include: str | Sequence[str] = "*.md",
+                   exclude: Sequence[str] = (), max_depth: int | None = 0,
+                   follow_symlinks: bool = False) -> Iterator[Path]:
     """
-    批量提取目录中所有markdown文件的生词。
+    基于 os.scandir 的惰性目录遍历，按稳定顺序返回匹配的文件。
+
+    每个目录内按名称排序后深度优先遍历：遇到子目录时先输出子目录中的文件，再继续当前目录
+    （如 a/x.md 在 a.md 之前，与对相对路径排序的结果不同），顺序稳定。
+    调用方可以边遍历边处理，不必等待整棵目录树扫描完成。
+
+    Args:
+        root: 根目录
+        include: 包含模式（glob），可以是单个模式或列表。不含 / 的模式匹配文件名，
+                 含 / 的模式匹配相对路径（如 S01/*.md）
+        exclude: 排除模式，同时作用于文件和目录（匹配的目录整个跳过）
+        max_depth: 最大递归深度，0 表示只处理根目录（默认），None 表示不限
+        follow_symlinks: 是否进入符号链接指向的目录（自动检测循环链接）；
+                         指向文件的符号链接总是包含，与 Path.glob 一致
+
+    Yields:
+        匹配的文件路径
+    """
+    if isinstance(include, str):
+        include = [include]
+    root = Path(root)
+
+    visited = set()
+    if follow_symlinks:
+        stat = root.stat()
+        visited.add((stat.st_dev, stat.st_ino))
+
+    def scan(directory: Path) -> list[os.DirEntry]:
+        try:
+            with os.scandir(directory) as it:
+                return sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"  {directory}: Error - {e}", file=sys.stderr)
+            return []
+
+    # 栈中保存 (目录项迭代器, 相对路径前缀, 深度)，只展开当前路径上的目录
+    stack = [(iter(scan(root)), '', 0)]
+    while stack:
+        entries, prefix, depth = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        rel_path = prefix + entry.name
+        if exclude and _matches(rel_path, entry.name, exclude):
+            continue
+
+        try:
+            if entry.is_dir(follow_symlinks=follow_symlinks):
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                if follow_symlinks:
+                    stat = entry.stat()
+                    key = (stat.st_dev, stat.st_ino)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+                stack.append((iter(scan(Path(entry.path))), rel_path + '/', depth + 1))
+            elif entry.is_file():
+                if _matches(rel_path, entry.name, include):
+                    yield Path(entry.path)
+        except OSError:
+            # 失效的符号链接等
+            continue
+
+
+def add_discovery_arguments(parser: argparse.ArgumentParser) -> None:
+    """添加文件发现相关的命令行参数"""
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='递归处理子目录（如 show/season/episode.md）')
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help='最大递归深度（指定后自动启用递归）')
+    parser.add_argument('--include', action='append', default=None, metavar='GLOB',
+                        help='包含的文件模式，可多次指定（默认 *.md）')
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help='排除的文件或目录模式，可多次指定')
+    parser.add_argument('--follow-symlinks', action='store_true',
+                        help='进入符号链接指向的目录（指向文件的符号链接总是包含）')
+
+
+def discovery_options(args: argparse.Namespace) -> dict:
+    """将命令行参数转换为 extract_words_from_directory 的关键字参数"""
+    if args.max_depth is not None:
+        max_depth = args.max_depth
+    else:
+        max_depth = None if args.recursive else 0
+    return {
+        'pattern': args.include or ['*.md'],
+        'exclude': args.exclude,
+        'max_depth': max_depth,
+        'follow_symlinks': args.follow_symlinks,
+    }
+
+
+def extract_words_from_directory(input_dir: str, output_dir: str | None = None,
+                                 pattern: str | Sequence[str] = "*.md",
+                                 exclude: Sequence[str] = (), max_depth: int | None = 0,
+                                 follow_symlinks: bool = False) -> list[dict]:
+    """
+    批量提取目录中所有markdown文件的生词，返回提取结果。
+
+    单词条目为 WordItem，仅在写出 JSON 文件时转换为字典。
+    文件边遍历边提取，参数含义见 discover_files。
 
     Args:
         input_dir: 输入目录，包含标记了生词的markdown文件
-        output_dir: 输出目录，存放生成的JSON文件。默认为 /tmp/<input_dir_name>/
+        output_dir: 输出目录，存放每个文件的JSON提取结果。默认为 /tmp/<input_dir_name>/
         pattern: 文件匹配模式，默认 *.md
+        exclude: 排除模式
+        max_depth: 最大递归深度，0 表示只处理根目录
+        follow_symlinks: 是否进入符号链接指向的目录
 
     Returns:
-        生成的JSON文件路径列表
+        提取结果列表（跳过没有生词的文件），每个元素同 extract_words_from_file 的返回值
     """
-    import json
-
     input_path = Path(input_dir)
 
     # 默认输出目录：/tmp/<目录名>/
@@ -42,61 +164,75 @@ def batch_extract(input_dir: str, output_dir: str | None = None, pattern: str =
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    md_files = sorted(input_path.glob(pattern))
-    if not md_files:
-        print(f"No files matching '{pattern}' in {input_dir}")
-        return []
-
-    output_files = []
+    all_data = []
     total_words = 0
+    file_count = 0
 
-    for md_file in md_files:
+    for md_file in discover_files(input_path, pattern, exclude, max_depth, follow_symlinks):
+        file_count += 1
+        rel_path = md_file.relative_to(input_path)
         try:
             result = extract_words_from_file(str(md_file))
 
             if result['word_count'] == 0:
-                print(f"  {md_file.name}: no words marked, skipping")
+                print(f"  {rel_path}: no words marked, skipping")
                 continue
 
-            # 输出文件名使用原文件名
-            output_file = output_path / f"{md_file.stem}.json"
-            output_file.write_text(
-                json.dumps(result, ensure_ascii=False, indent=2),
-                encoding='utf-8'
-            )
+            # 输出文件名使用原文件名（子目录中的文件带上相对路径）
+            output_name = '_'.join(rel_path.with_suffix('').parts)
+            output_file = output_path / f"{output_name}.json"
+            write_json(deck_to_json(result), output_file)
 
-            output_files.append(str(output_file))
+            result['output_file'] = str(output_file)
+            all_data.append(result)
             total_words += result['word_count']
-            print(f"  {md_file.name}: {result['word_count']} words -> {output_file.name}")
+            print(f"  {rel_path}: {result['word_count']} words -> {output_file.name}")
 
         except Exception as e:
-            print(f"  {md_file.name}: Error - {e}")
+            print(f"  {rel_path}: Error - {e}")
+
+    if file_count == 0:
+        print(f"No files matching '{pattern}' in {input_dir}")
+        return []
 
-    print(f"\nTotal: {len(output_files)} files, {total_words} words")
+    print(f"\nTotal: {len(all_data)} files, {total_words} words")
     print(f"Output directory: {output_path}")
-    return output_files
+    return all_data
+
+
+def batch_extract(input_dir: str, output_dir: str | None = None,
+                  pattern: str | Sequence[str] = "*.md", **discovery) -> list[str]:
+    """
+    批量提取目录中所有markdown文件的生词。
+
+    Args:
+        input_dir: 输入目录，包含标记了生词的markdown文件
+        output_dir: 输出目录，存放生成的JSON文件。默认为 /tmp/<input_dir_name>/
+        pattern: 文件匹配模式，默认 *.md
+        **discovery: 其他文件发现参数（exclude、max_depth、follow_symlinks）
+
+    Returns:
+        生成的JSON文件路径列表
+    """
+    all_data = extract_words_from_directory(input_dir, output_dir, pattern, **discovery)
+    return [data['output_file'] for data in all_data]
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python batch_extract.py <input_dir> [output_dir]")
-        print("")
-        print("Examples:")
-        print("  python batch_extract.py /path/to/articles/")
-        print("  python batch_extract.py /path/to/S01/ /tmp/S01_words/")
-        print("")
-        print("If output_dir is not specified, uses /tmp/<input_dir_name>/")
-        print("")
-        print("Output naming:")
-        print("  - Each file's deck_name = filename (without extension)")
-        print("  - Anki output filename = directory name (when using generate_anki.py)")
-        sys.exit(1)
-
-    input_dir = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
-
-    print(f"Extracting words from: {input_dir}")
-    batch_extract(input_dir, output_dir)
+    parser = argparse.ArgumentParser(
+        description='批量提取目录中所有Markdown文件的生词',
+        epilog="Output naming: each file's deck_name = filename (without extension); "
+               "Anki output filename = directory name (when using generate_anki.py)",
+    )
+    parser.add_argument('input_dir', help='输入目录')
+    parser.add_argument('output_dir', nargs='?', default=None,
+                        help='输出目录，默认 /tmp/<input_dir_name>/')
+    add_discovery_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"Extracting words from: {args.input_dir}")
+    options = discovery_options(args)
+    batch_extract(args.input_dir, args.output_dir, **options)
 
 
 if __name__ == '__main__':
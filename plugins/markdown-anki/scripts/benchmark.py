@@ -0,0 +1,789 @@
+#!/usr/bin/env python3
+"""
+性能基准测试
+
+在合成语料上测量各处理阶段的耗时和内存，用于验证优化效果。
+
+用法：
+    python benchmark.py memory [--files N] [--sentences N]
+    python benchmark.py cache-load [--words N]
+    python benchmark.py extract [--files N] [--sentences N]
+    python benchmark.py discover [--shows N]
+    python benchmark.py tiered [--words N] [--memory-entries N]
+    python benchmark.py bloom [--words N] [--new-ratio R]
+    python benchmark.py compress [--words N]
+    python benchmark.py sentences [--episodes N] [--repeat-ratio R]
+    python benchmark.py payload [--files N] [--bold-ratio R]
+    python benchmark.py finish [--files N] [--changed N]
+    python benchmark.py mark [--words N] [--megabytes N]
+    python benchmark.py merge [--words N] [--inputs N]
+    python benchmark.py find [--words N]
+    python benchmark.py near [--words N] [--queries N]
+"""
+
+import argparse
+import json
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from batch_extract import discover_files
+from cache_io import PLAIN, read_json, write_json
+from cache_merge import merge_caches
+from extract_words import BOLD_PATTERN, WORD_PATTERN, extract_words_from_file, get_sentence_context
+from key_index import PAGE_SIZE, key_index_path_for, load_key_index
+from near_match import edit_distance, load_near_index, max_distance_for, near_index_path_for
+from pipeline import BATCH_SIZE, Job, Pipeline, PipelineResult, batch_to_json, plan_batches
+from sentence_memory import sentence_key
+from word_item import words_to_json
+from tiered_cache import TieredTranslationCache
+from translation_cache import TranslationCache
+from vocab_marker import VocabularyMarker, load_marker, mark_text, marker_path_for
+
+
+def make_vocabulary(size: int, seed: int = 0) -> list[str]:
+    """生成合成词表（纯字母单词，长度 3-10）"""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        length = rng.randint(3, 10)
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return sorted(words)
+
+
+def make_markdown(vocabulary: list[str], sentences: int, rng: random.Random,
+                  bold_ratio: float = 0.08) -> str:
+    """生成一段剧本风格的 Markdown 文本，部分单词用 **word** 标记"""
+    lines = []
+    for _ in range(sentences):
+        tokens = []
+        for _ in range(rng.randint(6, 18)):
+            word = rng.choice(vocabulary)
+            tokens.append(f"**{word}**" if rng.random() < bold_ratio else word)
+        speaker = rng.choice(['Ross', 'Rachel', 'Monica', 'Chandler', 'Joey', 'Phoebe'])
+        lines.append(f"{speaker}: {' '.join(tokens).capitalize()}{rng.choice('.!?')}")
+        if rng.random() < 0.2:
+            lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def make_corpus(root: Path, files: int, sentences: int, vocabulary_size: int = 20000,
+                seed: int = 0) -> list[Path]:
+    """在 root 下生成 files 个合成 Markdown 文件"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = root / f"{i // 24 + 1:02d}{i % 24 + 1:02d}.md"
+        path.write_text(make_markdown(vocabulary, sentences, rng), encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def _legacy_layout(data: dict) -> dict:
+    """还原旧的数据布局：每个单词一个字典，例句各自独立"""
+    words = []
+    for item in data['words']:
+        words.append({
+            'word': item.word,
+            'word_lower': item.word_lower,
+            # 旧实现中每个单词的例句都是单独构造的字符串
+            'sentence': (item.sentence + ' ')[:-1],
+            'translation': '',
+            'sentence_translation': '',
+        })
+    return {**data, 'words': words}
+
+
+def bench_memory(args) -> None:
+    """比较整个目录的提取结果以 WordItem 和字典形式保存时的内存占用"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        paths = make_corpus(work_dir / 'corpus', args.files, args.sentences)
+
+        results = {}
+        for layout in ('dict', 'slots'):
+            tracemalloc.start()
+            start = time.perf_counter()
+            all_data = []
+            for path in paths:
+                data = extract_words_from_file(str(path))
+                all_data.append(_legacy_layout(data) if layout == 'dict' else data)
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            words = sum(len(data['words']) for data in all_data)
+            results[layout] = (current, peak, elapsed, words)
+            del all_data
+
+        print(f"Corpus: {args.files} files x {args.sentences} sentences")
+        print(f"{'layout':<8}{'words':>10}{'retained MB':>14}{'peak MB':>12}{'time s':>10}")
+        for layout, (current, peak, elapsed, words) in results.items():
+            print(f"{layout:<8}{words:>10}{current / 2**20:>14.2f}{peak / 2**20:>12.2f}{elapsed:>10.2f}")
+        saved = 1 - results['slots'][1] / results['dict'][1]
+        print(f"Peak memory reduced by {saved:.0%}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def make_cache_file(path: Path, words: int, seed: int = 0) -> list[str]:
+    """生成与真实格式一致（indent=2）的合成缓存文件，返回单词列表"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(words, seed)
+    cache = {}
+    for word in vocabulary:
+        cache[word] = {
+            'translation': f"n. {word}的释义；隆起 v. 使{word}",
+            'sentence_examples': [
+                {
+                    'sentence': f"So does he have a {word}? " * rng.randint(1, 3),
+                    'sentence_translation': '那他有驼背吗？',
+                }
+                for _ in range(rng.randint(1, 2))
+            ],
+        }
+    path.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding='utf-8')
+    return vocabulary
+
+
+def _best_of(func, repeat: int = 5) -> float:
+    """多次运行取最短耗时"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_cache_load(args) -> None:
+    """比较 JSON 与二进制快照的缓存加载耗时"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        cache_file = work_dir / 'translation_cache.json'
+        vocabulary = make_cache_file(cache_file, args.words)
+        TranslationCache(str(cache_file), use_snapshot=True)  # 生成快照
+        lookups = random.Random(1).sample(vocabulary, min(args.lookups, len(vocabulary)))
+
+        def json_full():
+            TranslationCache(str(cache_file), use_snapshot=False).cache
+
+        def snapshot_full():
+            TranslationCache(str(cache_file), use_snapshot=True).cache
+
+        def json_lookup():
+            cache = TranslationCache(str(cache_file), use_snapshot=False)
+            for word in lookups:
+                cache.get(word)
+
+        def snapshot_lookup():
+            cache = TranslationCache(str(cache_file), use_snapshot=True)
+            for word in lookups:
+                cache.get(word)
+
+        json_size = cache_file.stat().st_size
+        snapshot_size = cache_file.with_suffix('.snap').stat().st_size
+        print(f"Cache: {args.words} words, JSON {json_size / 2**20:.1f} MB, "
+              f"snapshot {snapshot_size / 2**20:.1f} MB")
+        print(f"{'path':<32}{'json s':>10}{'snapshot s':>12}{'speedup':>10}")
+        for label, json_func, snapshot_func in (
+            ('full load', json_full, snapshot_full),
+            (f"open + {len(lookups)} lookups", json_lookup, snapshot_lookup),
+        ):
+            json_time = _best_of(json_func)
+            snapshot_time = _best_of(snapshot_func)
+            print(f"{label:<32}{json_time:>10.3f}{snapshot_time:>12.3f}"
+                  f"{json_time / snapshot_time:>9.1f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _extract_per_sentence(path: Path) -> int:
+    """逐个标记构建句子（每个句子单独运行正则清理），作为对照"""
+    content = path.read_text(encoding='utf-8')
+    seen = set()
+    for match in BOLD_PATTERN.finditer(content):
+        word = match.group(1).strip().lower()
+        if word in seen or len(word) < 2 or not WORD_PATTERN.fullmatch(word):
+            continue
+        seen.add(word)
+        get_sentence_context(content, word, match.start(), match.end())
+    return len(seen)
+
+
+def bench_extract(args) -> None:
+    """测量生词提取吞吐量（MB/s）"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        paths = make_corpus(work_dir / 'corpus', args.files, args.sentences)
+        total_mb = sum(path.stat().st_size for path in paths) / 2**20
+
+        def scanner():
+            for path in paths:
+                extract_words_from_file(str(path))
+
+        def per_sentence():
+            for path in paths:
+                _extract_per_sentence(path)
+
+        print(f"Corpus: {args.files} files, {total_mb:.1f} MB")
+        print(f"{'extractor':<16}{'time s':>10}{'MB/s':>10}")
+        for label, func in (('per-sentence', per_sentence), ('scanner', scanner)):
+            elapsed = _best_of(func, repeat=3)
+            print(f"{label:<16}{elapsed:>10.3f}{total_mb / elapsed:>10.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_discover(args) -> None:
+    """测量递归文件发现的耗时（show/season/episode.md 目录结构）"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        root = work_dir / 'library'
+        for show in range(args.shows):
+            for season in range(args.seasons):
+                season_dir = root / f"show{show:03d}" / f"S{season + 1:02d}"
+                season_dir.mkdir(parents=True)
+                for episode in range(args.episodes):
+                    (season_dir / f"{season + 1:02d}{episode + 1:02d}.md").write_text('x')
+                (season_dir / 'notes.txt').write_text('x')
+        total = args.shows * args.seasons * args.episodes
+
+        def scandir_walk():
+            return sum(1 for _ in discover_files(root, '*.md', max_depth=None))
+
+        def rglob_sorted():
+            return len(sorted(root.rglob('*.md')))
+
+        first = next(discover_files(root, '*.md', max_depth=None))
+        start = time.perf_counter()
+        next(discover_files(root, '*.md', max_depth=None))
+        first_latency = time.perf_counter() - start
+
+        print(f"Tree: {total} markdown files ({args.shows} shows x {args.seasons} seasons "
+              f"x {args.episodes} episodes), first file: {first.relative_to(root)}")
+        print(f"{'walker':<16}{'time s':>10}{'files/s':>12}")
+        for label, func in (('Path.rglob', rglob_sorted), ('discover_files', scandir_walk)):
+            elapsed = _best_of(func, repeat=3)
+            print(f"{label:<16}{elapsed:>10.3f}{total / elapsed:>12.0f}")
+        print(f"discover_files first-file latency: {first_latency * 1000:.2f} ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_tiered(args) -> None:
+    """比较内存模式与分层模式查询时的内存峰值和耗时"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        cache_file = work_dir / 'translation_cache.json'
+        vocabulary = make_cache_file(cache_file, args.words)
+        TieredTranslationCache(str(cache_file)).close()  # 预先导入数据库
+
+        # 批量处理时的查询分布：少量常用词反复出现
+        rng = random.Random(1)
+        hot = rng.sample(vocabulary, min(args.memory_entries // 2, len(vocabulary)))
+        lookups = [rng.choice(hot) if rng.random() < 0.8 else rng.choice(vocabulary)
+                   for _ in range(args.lookups)]
+
+        results = {}
+        for mode in ('memory', 'tiered'):
+            tracemalloc.start()
+            start = time.perf_counter()
+            if mode == 'memory':
+                cache = TranslationCache(str(cache_file), use_snapshot=False)
+            else:
+                cache = TieredTranslationCache(str(cache_file), memory_entries=args.memory_entries)
+            for word in lookups:
+                cache.get(word)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            hit_rate = cache.get_stats().get('hit_rate') if mode == 'tiered' else None
+            cache.close()
+            results[mode] = (peak, elapsed, hit_rate)
+
+        print(f"Cache: {args.words} words, {len(lookups)} lookups, "
+              f"memory tier {args.memory_entries} entries")
+        print(f"{'mode':<8}{'peak MB':>10}{'time s':>10}{'hit rate':>10}")
+        for mode, (peak, elapsed, hit_rate) in results.items():
+            rate = f"{hit_rate:.0%}" if hit_rate is not None else '-'
+            print(f"{mode:<8}{peak / 2**20:>10.2f}{elapsed:>10.3f}{rate:>10}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_bloom(args) -> None:
+    """新剧集的单词分类：有无布隆过滤器时打开缓存并查询的耗时，以及实测误判率"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        cache_file = work_dir / 'translation_cache.json'
+        vocabulary = make_cache_file(cache_file, args.words)
+        TranslationCache(str(cache_file), use_snapshot=True, use_bloom=True)  # 生成快照和过滤器
+
+        # 未缓存的单词：前 lookups 个组成新剧集，全部用于测量误判率
+        cached = set(vocabulary)
+        probes = [word for word in make_vocabulary(args.words + 20000, seed=7) if word not in cached]
+        new_count = int(args.lookups * args.new_ratio)
+        episode = probes[:new_count] + random.Random(1).sample(vocabulary, args.lookups - new_count)
+
+        def classify(words, use_bloom, use_snapshot=False):
+            cache = TranslationCache(str(cache_file), use_snapshot=use_snapshot, use_bloom=use_bloom)
+            for word in words:
+                if cache.might_contain(word):
+                    cache.get(word)
+
+        cache = TranslationCache(str(cache_file), use_snapshot=False, use_bloom=True)
+        false_positives = sum(cache.might_contain(word) for word in probes)
+        print(f"Cache: {args.words} words, bloom file "
+              f"{cache.bloom_file.stat().st_size / 2**10:.0f} KB, episode {len(episode)} words "
+              f"({args.new_ratio:.0%} new)")
+        print(f"FP rate: configured {cache.bloom_fp_rate:.2%}, "
+              f"estimated {cache.get_stats()['bloom_estimated_fp_rate']:.3%}, "
+              f"measured {false_positives / len(probes):.3%} ({len(probes)} probes)")
+        print(f"{'workload':<28}{'no bloom s':>12}{'bloom s':>10}{'speedup':>10}")
+        for label, words, use_snapshot in (
+            ('episode (JSON)', episode, False),
+            ('episode (snapshot)', episode, True),
+            ('all new words (JSON)', random.Random(2).sample(probes, args.lookups), False),
+        ):
+            plain = _best_of(lambda: classify(words, False, use_snapshot))
+            bloom = _best_of(lambda: classify(words, True, use_snapshot))
+            print(f"{label:<28}{plain:>12.3f}{bloom:>10.3f}{plain / bloom:>9.1f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_compress(args) -> None:
+    """缓存文件在不同压缩格式和输出格式下的大小与读写耗时"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        source = work_dir / 'source.json'
+        make_cache_file(source, args.words)
+        cache = json.loads(source.read_text(encoding='utf-8'))
+        baseline = source.stat().st_size
+
+        print(f"Cache: {args.words} words, pretty JSON {baseline / 2**20:.1f} MB")
+        print(f"{'format':<20}{'size MB':>10}{'ratio':>8}{'write s':>10}{'read s':>10}")
+        for compression in (PLAIN, 'gzip', 'lzma'):
+            for pretty in (True, False):
+                target = work_dir / f"{compression}-{pretty}.json"
+                write_time = _best_of(lambda: write_json(cache, target, compression, pretty), repeat=3)
+                read_time = _best_of(lambda: read_json(target), repeat=3)
+                size = target.stat().st_size
+                label = f"{compression} {'pretty' if pretty else 'compact'}"
+                print(f"{label:<20}{size / 2**20:>10.2f}{size / baseline:>8.0%}"
+                      f"{write_time:>10.3f}{read_time:>10.3f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_sentences(args) -> None:
+    """逐集处理剧本：有无例句翻译记忆时需要翻译的例句数和字符数"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        rng = random.Random(0)
+        vocabulary = make_vocabulary(5000)
+        # 反复出现的台词（口头禅、片头片尾等），每次出现时标记的生词不同
+        recurring = [line for line in make_markdown(vocabulary, 300, rng, 0).splitlines() if line]
+
+        def mark(line: str) -> str:
+            speaker, text = line.split(': ', 1)
+            tokens = [f"**{token}**" if token.isalpha() and rng.random() < args.bold_ratio else token
+                      for token in text.split(' ')]
+            return f"{speaker}: {' '.join(tokens)}"
+
+        paths = []
+        for i in range(args.episodes):
+            lines = make_markdown(vocabulary, args.sentences, rng, args.bold_ratio).splitlines()
+            lines = [mark(rng.choice(recurring)) if rng.random() < args.repeat_ratio else line
+                     for line in lines]
+            path = work_dir / f"E{i + 1:02d}.md"
+            path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+            paths.append(path)
+
+        cached_words = set()
+        memory = set()
+        totals = {'words': 0, 'plain': 0, 'plain_chars': 0, 'memory': 0, 'memory_chars': 0}
+        for path in paths:
+            uncached = [item for item in extract_words_from_file(str(path))['words']
+                        if item.word_lower not in cached_words]
+            totals['words'] += len(uncached)
+            # 没有记忆：每个单词的例句都要翻译一次
+            totals['plain'] += len(uncached)
+            totals['plain_chars'] += sum(len(item.sentence) for item in uncached)
+            # 有记忆：之前各集已翻译过的例句直接填入，其余仍随单词一起翻译
+            pending = [item for item in uncached if sentence_key(item.sentence) not in memory]
+            totals['memory'] += len(pending)
+            totals['memory_chars'] += sum(len(item.sentence) for item in pending)
+            memory.update(sentence_key(item.sentence) for item in uncached)
+            cached_words.update(item.word_lower for item in uncached)
+
+        print(f"Episodes: {args.episodes} x {args.sentences} lines, "
+              f"{args.repeat_ratio:.0%} recurring lines, {totals['words']} new words")
+        print(f"{'mode':<16}{'sentences':>12}{'chars':>12}")
+        print(f"{'no memory':<16}{totals['plain']:>12}{totals['plain_chars']:>12}")
+        print(f"{'sentence memory':<16}{totals['memory']:>12}{totals['memory_chars']:>12}")
+        print(f"Sentence translations saved: {1 - totals['memory'] / max(1, totals['plain']):.0%}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_payload(args) -> None:
+    """批次文件大小：逐词内嵌例句与规范化例句表（相同单词数）"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        rng = random.Random(0)
+        vocabulary = make_vocabulary(20000)
+        words = []
+        seen = set()
+        for i in range(args.files):
+            path = work_dir / f"E{i + 1:02d}.md"
+            path.write_text(make_markdown(vocabulary, args.sentences, rng, args.bold_ratio),
+                            encoding='utf-8')
+            for item in extract_words_from_file(str(path))['words']:
+                if item.word_lower not in seen:
+                    seen.add(item.word_lower)
+                    words.append(item)
+
+        def size(data) -> int:
+            return len(json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+
+        inline = [words[i:i + BATCH_SIZE] for i in range(0, len(words), BATCH_SIZE)]
+        inline_bytes = sum(size({'words': words_to_json(batch)}) for batch in inline)
+        grouped = plan_batches(words, BATCH_SIZE)
+        grouped_bytes = sum(size(batch_to_json(batch)) for batch in grouped)
+        sentences = sum(len(batch_to_json(batch)['sentences']) for batch in grouped)
+
+        print(f"Words: {len(words)} new words from {args.files} files "
+              f"(bold ratio {args.bold_ratio:.0%}), {len({item.sentence for item in words})} sentences")
+        print(f"{'layout':<22}{'batches':>9}{'sentences':>11}{'KB':>9}{'bytes/word':>12}")
+        print(f"{'inline sentence':<22}{len(inline):>9}{len(words):>11}"
+              f"{inline_bytes / 2**10:>9.1f}{inline_bytes / len(words):>12.0f}")
+        print(f"{'sentence table':<22}{len(grouped):>9}{sentences:>11}"
+              f"{grouped_bytes / 2**10:>9.1f}{grouped_bytes / len(words):>12.0f}")
+        print(f"Payload reduction: {1 - grouped_bytes / inline_bytes:.0%}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_finish(args) -> None:
+    """合并生成阶段：重新提取整个目录与读取第一步保存的提取结果"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        paths = make_corpus(work_dir / 'corpus', args.files, args.sentences)
+        corpus_bytes = sum(path.stat().st_size for path in paths)
+        pipeline = Pipeline(cache=TranslationCache(str(work_dir / 'cache.json')),
+                            work_dir=str(work_dir / 'work'), jobs=1)
+        job = Job(name='corpus', kind='directory', sources=[str(work_dir / 'corpus')])
+        pipeline._extract_incremental(job, PipelineResult(status='', name=job.name))
+        artifact_bytes = pipeline._extraction_file(job).stat().st_size
+
+        def changed():
+            # 修改部分文件后只需重新提取这些文件
+            for path in paths[:args.changed]:
+                path.write_text(path.read_text(encoding='utf-8') + '\n', encoding='utf-8')
+            pipeline._extract_incremental(job, PipelineResult(status='', name=job.name))
+
+        print(f"Corpus: {args.files} files, {corpus_bytes / 2**20:.1f} MB; "
+              f"extraction artifact {artifact_bytes / 2**20:.2f} MB")
+        print(f"{'finish':<28}{'time s':>10}")
+        for label, func in (
+                ('re-extract all', lambda: pipeline.extract(job)),
+                ('artifact, unchanged', lambda: pipeline._extract_incremental(
+                    job, PipelineResult(status='', name=job.name))),
+                (f'artifact, {args.changed} changed', changed)):
+            print(f"{label:<28}{_best_of(func, repeat=3):>10.3f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_mark(args) -> None:
+    """自动标记：构建、读取、增量更新自动机的耗时，以及扫描多 MB 文本的吞吐量"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        cache_file = work_dir / 'translation_cache.json'
+        vocabulary = make_cache_file(cache_file, args.words)
+        cache = TranslationCache(str(cache_file), use_snapshot=False, use_bloom=False)
+
+        start = time.perf_counter()
+        marker = load_marker(cache, rebuild=True)
+        build = time.perf_counter() - start
+        marker_file = marker_path_for(cache_file)
+        load = _best_of(lambda: VocabularyMarker.load(marker_file))
+
+        # 缓存新增 100 个单词后增量更新
+        data = read_json(cache_file)
+        for word in make_vocabulary(100, seed=9):
+            data.setdefault(word, {'translation': 'n. 新词', 'sentence_examples': []})
+        write_json(data, cache_file)
+        cache = TranslationCache(str(cache_file), use_snapshot=False, use_bloom=False)
+        start = time.perf_counter()
+        load_marker(cache)
+        update = time.perf_counter() - start
+
+        # 一半单词已缓存、一半未缓存的文本，没有 **word** 标记
+        rng = random.Random(3)
+        mixed = rng.sample(vocabulary, min(len(vocabulary), 20000)) + make_vocabulary(20000, seed=11)
+        parts = []
+        size = 0
+        while size < args.megabytes * 2**20:
+            chunk = make_markdown(mixed, 200, rng, bold_ratio=0)
+            parts.append(chunk)
+            size += len(chunk)
+        text = ''.join(parts)
+
+        hits = marker.find(text)
+        scan = _best_of(lambda: marker.find(text), repeat=3)
+        rewrite = _best_of(lambda: mark_text(text, hits), repeat=3)
+        print(f"Vocabulary: {len(marker)} words, marker file {marker_file.stat().st_size / 2**20:.1f} MB")
+        print(f"Build {build:.3f}s, load {load:.3f}s, incremental update (+100 words, incl. reading cache keys) {update:.3f}s")
+        print(f"Scan {size / 2**20:.1f} MB: {scan:.3f}s ({size / 2**20 / scan:.1f} MB/s), "
+              f"{len(hits)} hits; rewrite with markers {rewrite:.3f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_merge(args) -> None:
+    """合并多台机器的缓存：外部排序归并与整体加载合并的耗时和内存峰值"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        # 每台机器的缓存：共同的一半单词（翻译各不相同）加上各自的新单词
+        inputs = []
+        shared = make_vocabulary(args.words // 2, seed=0)
+        for i in range(args.inputs):
+            path = work_dir / f"machine_{i}.json"
+            own = make_vocabulary(args.words - len(shared), seed=100 + i)
+            write_json({word: {'translation': f"n. {word} 释义 {i}",
+                               'sentence_examples': [{'sentence': f"Is that a {word}?",
+                                                      'sentence_translation': f"那是{word}吗？{i}"}]}
+                        for word in shared + own}, path)
+            inputs.append(path)
+        size = sum(path.stat().st_size for path in inputs)
+
+        def load_all():
+            merged = {}
+            for path in inputs:
+                for word, entry in read_json(path).items():
+                    stored = merged.setdefault(word, {'translation': '', 'sentence_examples': []})
+                    stored['translation'] = entry['translation']
+                    for example in entry['sentence_examples']:
+                        if example not in stored['sentence_examples']:
+                            stored['sentence_examples'].append(example)
+            write_json(merged, work_dir / 'load_all.json')
+
+        results = {}
+
+        def external():
+            results['merge'] = merge_caches(inputs, output=work_dir / 'merged.json')
+
+        print(f"Inputs: {args.inputs} caches x {args.words} words ({size / 2**20:.1f} MB)")
+        print(f"{'method':<20}{'time s':>10}{'peak MB':>10}")
+        for label, func in (('load all + dict', load_all), ('external merge', external)):
+            elapsed = _best_of(func, repeat=1)
+            # tracemalloc 会明显拖慢运行，内存峰值单独测量
+            tracemalloc.start()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label:<20}{elapsed:>10.2f}{peak / 2**20:>10.1f}")
+        result = results['merge']
+        print(f"Merged {result.words} words, {result.shared} shared, {len(result.conflicts)} conflicts")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_find(args) -> None:
+    """前缀查询：有序索引与加载整个缓存后扫描的耗时（都从启动开始计时）"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        cache_file = work_dir / 'translation_cache.json'
+        vocabulary = make_cache_file(cache_file, args.words)
+        cache = TranslationCache(str(cache_file), use_snapshot=True, use_bloom=True)  # 生成快照和过滤器
+        start = time.perf_counter()
+        load_key_index(cache)
+        build = time.perf_counter() - start
+
+        rng = random.Random(5)
+        prefixes = [word[:3] for word in rng.sample(vocabulary, 20)]
+
+        def scan():
+            data = read_json(cache_file)
+            for prefix in prefixes:
+                words = sorted(word for word in data if word.startswith(prefix))
+                [data[word] for word in words[:PAGE_SIZE]]
+
+        def indexed():
+            cache = TranslationCache(str(cache_file))
+            index = load_key_index(cache)
+            for prefix in prefixes:
+                words, _ = index.find(prefix)
+                [cache.get(word) for word in words]
+
+        print(f"Cache: {args.words} words, index built in {build:.3f}s "
+              f"({key_index_path_for(cache_file).stat().st_size / 2**10:.0f} KB)")
+        print(f"{len(prefixes)} prefix queries, first {PAGE_SIZE} entries each:")
+        plain = _best_of(scan, repeat=3)
+        fast = _best_of(indexed, repeat=3)
+        print(f"  load JSON + scan   {plain:.3f}s")
+        print(f"  key index          {fast:.3f}s ({plain / fast:.0f}x)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _misspell(word: str, rng: random.Random) -> str:
+    """对单词做一次随机编辑（替换、插入、删除或相邻交换）"""
+    position = rng.randrange(len(word))
+    letter = rng.choice(string.ascii_lowercase)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return word[:position] + letter + word[position + 1:]
+    if kind == 1:
+        return word[:position] + letter + word[position:]
+    if kind == 2:
+        return word[:position] + word[position + 1:]
+    position = min(position, len(word) - 2)
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+def bench_near(args) -> None:
+    """近似匹配：索引构建、加载和查询耗时，与逐个计算编辑距离比较（结果应一致）"""
+    work_dir = Path(tempfile.mkdtemp(prefix='anki_bench_'))
+    try:
+        cache_file = work_dir / 'translation_cache.json'
+        vocabulary = make_cache_file(cache_file, args.words)
+        cache = TranslationCache(str(cache_file))
+        start = time.perf_counter()
+        load_near_index(cache)
+        build = time.perf_counter() - start
+        load = _best_of(lambda: load_near_index(TranslationCache(str(cache_file))), repeat=3)
+
+        rng = random.Random(7)
+        cached = set(vocabulary)
+        queries = []
+        while len(queries) < args.queries:
+            word = _misspell(rng.choice(vocabulary), rng) if len(queries) % 2 else \
+                ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+            if word not in cached:
+                queries.append(word)
+
+        index = load_near_index(cache)
+        start = time.perf_counter()
+        found = [index.lookup(word, limit=args.words) for word in queries]
+        indexed = time.perf_counter() - start
+
+        # 逐个比较所有单词（只比较一部分查询）
+        sample = queries[:args.scan_queries]
+        start = time.perf_counter()
+        expected = []
+        for word in sample:
+            limit = max_distance_for(word)
+            expected.append(sorted(candidate for candidate in vocabulary if limit
+                                   and edit_distance(word, candidate, limit) <= limit))
+        scan = (time.perf_counter() - start) / len(sample)
+        recall = sum(len(set(truth) & {match for match, _ in result})
+                     for truth, result in zip(expected, found)) / max(1, sum(map(len, expected)))
+
+        print(f"Cache: {args.words} words, index built in {build:.2f}s, loaded in {load:.3f}s "
+              f"({near_index_path_for(cache_file).stat().st_size / 2**20:.1f} MB)")
+        print(f"{len(queries)} uncached words (half misspelled), "
+              f"{sum(1 for result in found if result)} flagged:")
+        print(f"  linear scan        {scan * 1000:.1f} ms/word")
+        print(f"  near-match index   {indexed / len(queries) * 1000:.3f} ms/word "
+              f"({scan * len(queries) / indexed:.0f}x), recall {recall:.1%}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='markdown-anki 性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    memory = subparsers.add_parser('memory', help='提取结果的内存占用（tracemalloc）')
+    memory.add_argument('--files', type=int, default=100, help='合成文件数')
+    memory.add_argument('--sentences', type=int, default=400, help='每个文件的句子数')
+    memory.set_defaults(func=bench_memory)
+
+    cache_load = subparsers.add_parser('cache-load', help='缓存加载：JSON 与二进制快照')
+    cache_load.add_argument('--words', type=int, default=50000, help='缓存单词数')
+    cache_load.add_argument('--lookups', type=int, default=200, help='单词查询次数')
+    cache_load.set_defaults(func=bench_cache_load)
+
+    extract = subparsers.add_parser('extract', help='生词提取吞吐量（MB/s）')
+    extract.add_argument('--files', type=int, default=50, help='合成文件数')
+    extract.add_argument('--sentences', type=int, default=2000, help='每个文件的句子数')
+    extract.set_defaults(func=bench_extract)
+
+    discover = subparsers.add_parser('discover', help='递归文件发现耗时')
+    discover.add_argument('--shows', type=int, default=40, help='剧集数')
+    discover.add_argument('--seasons', type=int, default=10, help='每部剧的季数')
+    discover.add_argument('--episodes', type=int, default=25, help='每季的集数')
+    discover.set_defaults(func=bench_discover)
+
+    tiered = subparsers.add_parser('tiered', help='分层缓存：内存峰值与查询耗时')
+    tiered.add_argument('--words', type=int, default=100000, help='缓存单词数')
+    tiered.add_argument('--lookups', type=int, default=50000, help='单词查询次数')
+    tiered.add_argument('--memory-entries', type=int, default=2000, help='内存层容量')
+    tiered.set_defaults(func=bench_tiered)
+
+    bloom = subparsers.add_parser('bloom', help='布隆过滤器：未缓存单词的判定耗时与误判率')
+    bloom.add_argument('--words', type=int, default=50000, help='缓存单词数')
+    bloom.add_argument('--lookups', type=int, default=500, help='剧集中的唯一单词数')
+    bloom.add_argument('--new-ratio', type=float, default=0.9, help='剧集中未缓存单词的比例')
+    bloom.set_defaults(func=bench_bloom)
+
+    compress = subparsers.add_parser('compress', help='缓存文件压缩：大小与读写耗时')
+    compress.add_argument('--words', type=int, default=50000, help='缓存单词数')
+    compress.set_defaults(func=bench_compress)
+
+    sentences = subparsers.add_parser('sentences', help='例句翻译记忆：需要翻译的例句数')
+    sentences.add_argument('--episodes', type=int, default=24, help='集数')
+    sentences.add_argument('--sentences', type=int, default=400, help='每集的台词行数')
+    sentences.add_argument('--repeat-ratio', type=float, default=0.1, help='反复出现的台词比例')
+    sentences.add_argument('--bold-ratio', type=float, default=0.08, help='单词被标记的比例')
+    sentences.set_defaults(func=bench_sentences)
+
+    payload = subparsers.add_parser('payload', help='批次文件大小：逐词例句与例句表')
+    payload.add_argument('--files', type=int, default=3, help='合成文件数')
+    payload.add_argument('--sentences', type=int, default=400, help='每个文件的台词行数')
+    payload.add_argument('--bold-ratio', type=float, default=0.08, help='单词被标记的比例')
+    payload.set_defaults(func=bench_payload)
+
+    finish = subparsers.add_parser('finish', help='合并生成：重新提取与读取保存的提取结果')
+    finish.add_argument('--files', type=int, default=240, help='合成文件数')
+    finish.add_argument('--sentences', type=int, default=400, help='每个文件的句子数')
+    finish.add_argument('--changed', type=int, default=2, help='两步之间修改的文件数')
+    finish.set_defaults(func=bench_finish)
+
+    mark = subparsers.add_parser('mark', help='自动标记：自动机构建、增量更新与扫描吞吐量')
+    mark.add_argument('--words', type=int, default=100000, help='缓存单词数')
+    mark.add_argument('--megabytes', type=float, default=4, help='扫描的文本大小（MB）')
+    mark.set_defaults(func=bench_mark)
+
+    merge = subparsers.add_parser('merge', help='合并多台机器的缓存：耗时与内存峰值')
+    merge.add_argument('--words', type=int, default=50000, help='每个缓存的单词数')
+    merge.add_argument('--inputs', type=int, default=4, help='缓存文件数')
+    merge.set_defaults(func=bench_merge)
+
+    find = subparsers.add_parser('find', help='前缀查询：有序索引与整体加载扫描')
+    find.add_argument('--words', type=int, default=100000, help='缓存单词数')
+    find.set_defaults(func=bench_find)
+
+    near = subparsers.add_parser('near', help='近似匹配：删除形式索引与逐个计算编辑距离')
+    near.add_argument('--words', type=int, default=100000, help='缓存单词数')
+    near.add_argument('--queries', type=int, default=500, help='未缓存单词数（一半是拼错的已缓存单词）')
+    near.add_argument('--scan-queries', type=int, default=10, help='逐个比较的查询数')
+    near.set_defaults(func=bench_near)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
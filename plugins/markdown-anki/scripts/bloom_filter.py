@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+翻译缓存的布隆过滤器
+
+新剧集中的大部分单词都不在缓存里，而确认"不在缓存"本来需要加载整个缓存（或查询
+磁盘数据库）。布隆过滤器（translation_cache.bloom，与缓存放在同一目录）记录所有
+已缓存的小写单词：
+
+- 过滤器判定"不存在"的单词一定不在缓存中，无需加载或查询缓存
+- 判定"可能存在"的单词再查询缓存，误判率由 cache_bloom_fp_rate 配置（默认 1%）
+- 文件头记录对应缓存的版本标记，缓存被其他程序修改后过滤器自动失效并重建
+"""
+
+import math
+import os
+import struct
+from hashlib import blake2b
+from pathlib import Path
+from typing import Iterable, Optional
+
+MAGIC = b'TCBLOOM\x01'
+VERSION = 1
+
+# magic, version, 位数, 哈希函数个数, 已添加单词数, 设计容量, 设计误判率, 版本标记长度
+_HEADER = struct.Struct('<8sHQIQQdH')
+
+# 默认误判率
+DEFAULT_FP_RATE = 0.01
+
+
+def bloom_path_for(cache_file: Path) -> Path:
+    """返回缓存 JSON 对应的布隆过滤器路径"""
+    return Path(cache_file).with_suffix('.bloom')
+
+
+def _hash_pair(word: str) -> tuple[int, int]:
+    """双重哈希的两个基础哈希值（第 i 个位置为 h1 + i * h2）"""
+    digest = blake2b(word.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """固定容量的布隆过滤器"""
+
+    def __init__(self, capacity: int, fp_rate: float = DEFAULT_FP_RATE):
+        """
+        按容量和误判率创建空过滤器
+
+        Args:
+            capacity: 设计容量（单词数），超过后误判率会上升
+            fp_rate: 达到设计容量时的误判率
+        """
+        self.capacity = max(1, capacity)
+        self.fp_rate = min(max(fp_rate, 1e-9), 0.5)
+        self.num_bits = max(64, math.ceil(-self.capacity * math.log(self.fp_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.count = 0
+        self.stamp = ''
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    @classmethod
+    def build(cls, words: Iterable[str], size: int, fp_rate: float = DEFAULT_FP_RATE) -> 'BloomFilter':
+        """
+        为一组单词创建过滤器（容量预留一倍，供后续添加）
+
+        Args:
+            words: 小写单词
+            size: 单词数量
+            fp_rate: 设计误判率
+        """
+        bloom = cls(max(1024, size * 2), fp_rate)
+        for word in words:
+            bloom.add(word)
+        return bloom
+
+    def _positions(self, word: str) -> Iterable[int]:
+        h1, h2 = _hash_pair(word)
+        m = self.num_bits
+        return ((h1 + i * h2) % m for i in range(self.num_hashes))
+
+    def add(self, word: str) -> None:
+        """添加单词"""
+        bits = self._bits
+        new = False
+        for position in self._positions(word):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+
+    def might_contain(self, word: str) -> bool:
+        """False 表示单词一定不存在；True 表示可能存在"""
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(word))
+
+    __contains__ = might_contain
+
+    def union(self, other: 'BloomFilter') -> bool:
+        """
+        合并另一个参数相同的过滤器（按位或）
+
+        Returns:
+            参数不同无法合并时返回 False
+        """
+        if (other.num_bits, other.num_hashes) != (self.num_bits, self.num_hashes):
+            return False
+        self._bits = bytearray(a | b for a, b in zip(self._bits, other._bits))
+        self.count = max(self.count, other.count)
+        return True
+
+    @property
+    def overloaded(self) -> bool:
+        """单词数已超过设计容量"""
+        return self.count > self.capacity
+
+    def estimated_fp_rate(self) -> float:
+        """按当前单词数估算的误判率"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def save(self, path: Path, stamp: str) -> None:
+        """
+        写入文件（先写临时文件再原子替换）
+
+        Args:
+            path: 过滤器文件路径
+            stamp: 对应缓存的版本标记
+        """
+        path = Path(path)
+        self.stamp = stamp
+        stamp_bytes = stamp.encode('utf-8')
+        temp_file = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+        with open(temp_file, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.num_bits, self.num_hashes, self.count,
+                                 self.capacity, self.fp_rate, len(stamp_bytes)))
+            f.write(stamp_bytes)
+            f.write(self._bits)
+        os.replace(temp_file, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['BloomFilter']:
+        """读取过滤器文件，不存在或格式不正确时返回 None"""
+        try:
+            data = Path(path).read_bytes()
+            (magic, version, num_bits, num_hashes, count, capacity, fp_rate,
+             stamp_length) = _HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != VERSION:
+            return None
+
+        bits_offset = _HEADER.size + stamp_length
+        bits = data[bits_offset:]
+        if len(bits) != (num_bits + 7) // 8:
+            return None
+
+        bloom = cls.__new__(cls)
+        bloom.capacity = capacity
+        bloom.fp_rate = fp_rate
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.count = count
+        bloom.stamp = data[_HEADER.size:bits_offset].decode('utf-8')
+        bloom._bits = bytearray(bits)
+        return bloom
+
+
+def load_fresh_bloom(path: Path, stamp: str) -> Optional[BloomFilter]:
+    """读取与缓存版本标记一致的过滤器，过期或不存在时返回 None"""
+    bloom = BloomFilter.load(path)
+    if bloom is None or not stamp or bloom.stamp != stamp:
+        return None
+    return bloom
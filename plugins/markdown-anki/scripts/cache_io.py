@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+JSON 文件的流式读写
+
+translation_cache.json 是一个顶层对象（单词 -> 翻译信息）。分层缓存导入和导出时
+逐条处理，内存占用与词表大小无关：
+
+- iter_json_object: 分块读取文件，逐个返回 (键, 值)
+- write_json_object: 逐条写出，格式与 json.dumps(..., ensure_ascii=False, indent=2) 一致
+
+缓存、提取结果等文件可以用 gzip 或 lzma 压缩（配置 compression），文件名不变，
+读取时按文件头的 magic bytes 自动识别，边读边解压：
+
+- read_json / write_json: 读写任意 JSON 文件（写入时按配置压缩，非 pretty 输出使用紧凑分隔符）
+- open_text: 以文本方式打开可能被压缩的文件
+"""
+
+import gzip
+import json
+import lzma
+import os
+import re
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional
+
+from config import get_compression, get_pretty_json
+
+# 不压缩（需要交给人或 Claude Code 直接阅读的文件）
+PLAIN = 'none'
+
+_MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'lzma': b'\xfd7zXZ\x00',
+}
+
+_DECODER = json.JSONDecoder()
+# 逐条写出时复用编码器（json.dumps 每次调用都会新建编码器）
+_KEY_ENCODER = json.JSONEncoder(ensure_ascii=False)
+_PRETTY_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2)
+_COMPACT_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+_WHITESPACE = ' \t\n\r'
+_SCALAR_END = re.compile(r'[\s,\]}]')
+
+
+def detect_compression(path: Path) -> Optional[str]:
+    """
+    按文件头识别压缩格式
+
+    Returns:
+        'gzip'、'lzma'，未压缩时返回 None
+    """
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for compression, magic in _MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def _resolve(compression: Optional[str]) -> Optional[str]:
+    """None 表示使用配置；PLAIN 表示不压缩"""
+    if compression is None:
+        compression = get_compression()
+    return None if compression in (None, PLAIN) else compression
+
+
+def open_text(path: Path, mode: str = 'r', compression: Optional[str] = None) -> IO[str]:
+    """
+    以文本方式打开文件，读取时自动识别压缩格式
+
+    Args:
+        path: 文件路径
+        mode: 'r' 或 'w'
+        compression: 写入时的压缩格式（'gzip'、'lzma'、PLAIN），None 表示使用配置
+    """
+    if mode == 'r':
+        compression = detect_compression(path)
+    else:
+        compression = _resolve(compression)
+
+    if compression == 'gzip':
+        # 压缩级别 6：压缩率接近最高级别，速度快很多
+        return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+    if compression == 'lzma':
+        return lzma.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def read_json(path: Path):
+    """读取 JSON 文件（自动识别压缩格式，边读边解压）"""
+    with open_text(path) as f:
+        return json.load(f)
+
+
+def write_json(data, path: Path, compression: Optional[str] = None,
+               pretty: Optional[bool] = None) -> None:
+    """
+    写入 JSON 文件（先写临时文件再原子替换，编码结果分块写出）
+
+    Args:
+        data: 要写入的数据
+        path: 输出文件路径
+        compression: 压缩格式（'gzip'、'lzma'、PLAIN），None 表示使用配置 compression
+        pretty: 是否缩进输出，None 表示使用配置 pretty_json；否则使用紧凑分隔符
+    """
+    if pretty is None:
+        pretty = get_pretty_json()
+    options = {'indent': 2} if pretty else {'separators': (',', ':')}
+
+    path = Path(path)
+    temp_file = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+    with open_text(temp_file, 'w', compression) as f:
+        json.dump(data, f, ensure_ascii=False, **options)
+    os.replace(temp_file, path)
+
+
+def iter_json_object(path: Path, chunk_size: int = 1 << 16) -> Iterator[tuple[str, object]]:
+    """
+    逐条读取 JSON 顶层对象
+
+    Args:
+        path: JSON 文件路径
+        chunk_size: 每次读取的字符数
+
+    Yields:
+        (键, 值)
+
+    Raises:
+        ValueError: 文件不是 JSON 对象或格式错误
+    """
+    with open_text(path) as f:
+        buffer = ''
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            """读取下一块，丢弃已解析的部分；文件结束时返回 False"""
+            nonlocal buffer, pos, eof
+            if eof:
+                return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_whitespace() -> str:
+            """跳过空白，返回下一个字符（文件结束时返回空字符串）"""
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return buffer[pos:pos + 1]
+
+        def decode():
+            """解析一个完整的值；值可能跨块，数据不足时继续读取"""
+            nonlocal pos
+            # 数字、true/false/null 没有结束符号，读到其后的分隔符再解析，避免在块末尾被截断
+            if buffer[pos:pos + 1] not in ('{', '[', '"'):
+                while _SCALAR_END.search(buffer, pos) is None and fill():
+                    pass
+            while True:
+                try:
+                    value, pos = _DECODER.raw_decode(buffer, pos)
+                    return value
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+
+        if skip_whitespace() != '{':
+            raise ValueError(f"Not a JSON object: {path}")
+        pos += 1
+
+        if skip_whitespace() == '}':
+            return
+        while True:
+            key = decode()
+            if not isinstance(key, str):
+                raise ValueError(f"Invalid JSON object key in {path}")
+            if skip_whitespace() != ':':
+                raise ValueError(f"Expected ':' after key {key!r} in {path}")
+            pos += 1
+            skip_whitespace()
+            yield key, decode()
+
+            separator = skip_whitespace()
+            pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or '}}' after key {key!r} in {path}")
+            skip_whitespace()
+
+
+def write_json_object(items: Iterable[tuple[str, object]], path: Path,
+                      compression: Optional[str] = None, pretty: Optional[bool] = None) -> int:
+    """
+    逐条写出 JSON 顶层对象（先写临时文件再原子替换）
+
+    Args:
+        items: (键, 值) 序列
+        path: 输出文件路径
+        compression: 压缩格式，None 表示使用配置 compression
+        pretty: 是否缩进输出，None 表示使用配置 pretty_json
+
+    Returns:
+        写出的条目数量
+    """
+    if pretty is None:
+        pretty = get_pretty_json()
+    if pretty:
+        first, separator, colon, end = '{\n  ', ',\n  ', ': ', '\n}'
+    else:
+        first, separator, colon, end = '{', ',', ':', '}'
+
+    path = Path(path)
+    temp_file = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+    count = 0
+    with open_text(temp_file, 'w', compression) as f:
+        for key, value in items:
+            f.write(first if count == 0 else separator)
+            f.write(_KEY_ENCODER.encode(key))
+            f.write(colon)
+            if pretty:
+                f.write(_PRETTY_ENCODER.encode(value).replace('\n', '\n  '))
+            else:
+                f.write(_COMPACT_ENCODER.encode(value))
+            count += 1
+        f.write(end if count else '{}')
+    os.replace(temp_file, path)
+    return count
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+合并多台机器的翻译缓存
+
+每台机器各自积累 translation_cache.json。合并时不逐条调用 cache.add()（每次都会重写
+整个文件），而是对所有输入做外部排序归并：
+
+- 每个输入流式读取，每 RUN_ENTRIES 条按单词排序后写入一个临时分段文件（marshal 记录）
+- heapq.merge 归并所有分段，同一单词的各个版本依次相邻，逐个合并后流式写出
+- 内存占用与分段大小成正比，与输入的数量和大小无关
+
+合并目标（默认为当前缓存）已有的内容也作为一个输入参与合并，并作为差异比较的基准。
+
+冲突策略：
+- 单词按规范化的小写形式合并（见 word_item.normalize_word）
+- 输入按文件修改时间从旧到新排列，每个字段取最新的输入中的非空值
+- sentence_examples 取并集：规范化后相同的例句只保留一条，例句翻译不同时取最新的
+- 翻译或例句翻译不一致时记入冲突报告
+"""
+
+import argparse
+import heapq
+import marshal
+import os
+import struct
+import sys
+import tempfile
+from dataclasses import asdict, dataclass, field
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterator, Optional
+
+from cache_io import PLAIN, iter_json_object, write_json, write_json_object
+from sentence_memory import normalize_sentence
+from word_item import normalize_word
+
+# 每个临时分段的条目数（决定合并时的内存占用）
+RUN_ENTRIES = 20000
+
+# 分段文件中每个 marshal 块的记录数（按块读写，减少逐条调用的开销）
+RUN_BLOCK = 1000
+
+# 分段文件中每个块的长度前缀
+_BLOCK_LENGTH = struct.Struct('<I')
+
+# 试运行时默认显示的差异条数
+DIFF_LIMIT = 50
+
+
+@dataclass(slots=True)
+class Conflict:
+    """同一单词在不同输入中的不一致"""
+
+    word: str
+    field: str                  # 'translation' 或 'sentence_translation'
+    values: list[list[str]]     # [输入, 值]，从旧到新
+    chosen: str
+    sentence: str = ''          # field 为 sentence_translation 时的例句
+
+
+@dataclass(slots=True)
+class Change:
+    """合并结果相对于合并目标原有内容的变化"""
+
+    word: str
+    kind: str                   # 'added' 或 'changed'
+    translation: str
+    old_translation: str = ''
+    examples_added: int = 0
+
+
+@dataclass(slots=True)
+class MergeResult:
+    """合并统计、冲突和差异"""
+
+    words: int = 0              # 合并后的单词数
+    shared: int = 0             # 出现在多个输入中的单词数
+    added: int = 0
+    changed: int = 0
+    conflicts: list[Conflict] = field(default_factory=list)
+    changes: list[Change] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _write_run(records: list, run_dir: Path, number: int) -> Path:
+    """排序并写出一个分段"""
+    records.sort()
+    path = run_dir / f"run_{number:05d}.bin"
+    with open(path, 'wb') as f:
+        for start in range(0, len(records), RUN_BLOCK):
+            block = marshal.dumps(records[start:start + RUN_BLOCK])
+            f.write(_BLOCK_LENGTH.pack(len(block)))
+            f.write(block)
+    return path
+
+
+def _read_run(path: Path) -> Iterator[tuple]:
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(_BLOCK_LENGTH.size)
+            if not header:
+                return
+            (length,) = _BLOCK_LENGTH.unpack(header)
+            # 整块读入后再解码（marshal.load 直接读文件时每个对象都要调用一次 read）
+            yield from marshal.loads(f.read(length))
+
+
+def _split_runs(sources: list[Path], run_dir: Path) -> list[Path]:
+    """
+    流式读取所有输入，写出按 (单词, 输入序号, 序号) 排序的分段
+
+    记录为 (单词, 输入序号, 序号, 条目)：前三项唯一，排序和归并时不会比较条目本身
+
+    Returns:
+        分段文件列表
+    """
+    runs = []
+    sequence = 0
+    for index, source in enumerate(sources):
+        records = []
+        for word, entry in iter_json_object(source):
+            if not isinstance(entry, dict):
+                continue
+            records.append((normalize_word(word), index, sequence, entry))
+            sequence += 1
+            if len(records) >= RUN_ENTRIES:
+                runs.append(_write_run(records, run_dir, len(runs)))
+                records = []
+        if records:
+            runs.append(_write_run(records, run_dir, len(runs)))
+    return runs
+
+
+def merge_versions(word: str, versions: list[tuple[int, dict]],
+                   labels: list[str]) -> tuple[dict, list[Conflict]]:
+    """
+    合并同一单词的多个版本
+
+    Args:
+        word: 单词
+        versions: (输入序号, 条目)，按输入从旧到新排列
+        labels: 输入的名称（用于冲突报告）
+
+    Returns:
+        (合并后的条目, 冲突列表)
+    """
+    merged: dict = {'translation': '', 'sentence_examples': []}
+    translations = []
+    examples: dict[str, dict] = {}
+    example_values: dict[str, list[list[str]]] = {}
+
+    for index, entry in versions:
+        for name, value in entry.items():
+            if name == 'sentence_examples':
+                continue
+            if value or name not in merged:
+                merged[name] = value
+        if entry.get('translation'):
+            translations.append([labels[index], entry['translation']])
+
+        for example in entry.get('sentence_examples') or []:
+            key = normalize_sentence(example.get('sentence', ''))
+            previous = examples.get(key)
+            translation = example.get('sentence_translation', '')
+            if previous is None or (translation and translation != previous.get('sentence_translation')):
+                examples[key] = dict(example)
+            if translation:
+                example_values.setdefault(key, []).append([labels[index], translation])
+
+    merged['sentence_examples'] = list(examples.values())
+
+    conflicts = []
+    if len({value for _, value in translations}) > 1:
+        conflicts.append(Conflict(word, 'translation', translations, merged['translation']))
+    for key, values in example_values.items():
+        if len({value for _, value in values}) > 1:
+            example = examples[key]
+            conflicts.append(Conflict(word, 'sentence_translation', values,
+                                      example.get('sentence_translation', ''),
+                                      example.get('sentence', '')))
+    return merged, conflicts
+
+
+def _diff(word: str, entry: dict, base: Optional[dict]) -> Optional[Change]:
+    """合并结果相对于目标原有条目的变化，没有变化时返回 None"""
+    if base is None:
+        return Change(word, 'added', entry.get('translation', ''))
+    if entry == base:
+        return None
+    return Change(word, 'changed', entry.get('translation', ''), base.get('translation', ''),
+                  len(entry['sentence_examples']) - len(base.get('sentence_examples') or []))
+
+
+def merge_caches(inputs: list[Path], target: Optional[Path] = None,
+                 output: Optional[Path] = None, collect_changes: bool = False) -> MergeResult:
+    """
+    合并多个缓存文件
+
+    Args:
+        inputs: 输入缓存文件（可以是压缩格式）
+        target: 合并目标原有的内容（参与合并，也是差异比较的基准），不存在时为 None
+        output: 输出文件，None 表示只计算结果（试运行）
+        collect_changes: 记录每个单词的变化（试运行、报告使用；否则只计数）
+
+    Returns:
+        MergeResult
+    """
+    # 同一文件只读取一次；目标同时作为输入传入时只算作目标
+    target = Path(target) if target is not None else None
+    seen = {target.resolve()} if target is not None else set()
+    sources = []
+    for path in map(Path, inputs):
+        if path.resolve() not in seen:
+            seen.add(path.resolve())
+            sources.append(path)
+    if target is not None:
+        sources.append(target)
+    # 目标按修改时间与其他输入一起排序，按对象本身（而不是路径比较）找到它的位置
+    sources.sort(key=lambda path: path.stat().st_mtime)
+    base_index = next((index for index, path in enumerate(sources) if path is target), -1)
+    labels = [str(path) for path in sources]
+
+    result = MergeResult()
+    with tempfile.TemporaryDirectory(prefix='cache_merge_') as run_dir:
+        runs = _split_runs(sources, Path(run_dir))
+        records = heapq.merge(*(_read_run(run) for run in runs))
+
+        def merged_entries() -> Iterator[tuple[str, dict]]:
+            for word, group in groupby(records, key=itemgetter(0)):
+                versions = [(index, entry) for _, index, _, entry in group]
+                result.words += 1
+                if len(versions) == 1:
+                    # 只出现在一个输入中：原样保留
+                    entry = versions[0][1]
+                else:
+                    entry, conflicts = merge_versions(word, versions, labels)
+                    if len({index for index, _ in versions}) > 1:
+                        result.shared += 1
+                    result.conflicts.extend(conflicts)
+
+                base = None
+                for index, version in versions:
+                    if index == base_index:
+                        base = version
+                change = _diff(word, entry, base)
+                if change is not None:
+                    if collect_changes:
+                        result.changes.append(change)
+                    if change.kind == 'added':
+                        result.added += 1
+                    else:
+                        result.changed += 1
+                yield word, entry
+
+        if output is None:
+            for _ in merged_entries():
+                pass
+        else:
+            write_json_object(merged_entries(), output)
+    return result
+
+
+def print_result(result: MergeResult, limit: int = DIFF_LIMIT, show_changes: bool = False) -> None:
+    """在控制台展示合并结果（试运行时显示差异）"""
+    print(f"✓ 合并后共 {result.words} 个单词（{result.shared} 个出现在多个输入中）")
+    print(f"  新增 {result.added} 个，更新 {result.changed} 个，冲突 {len(result.conflicts)} 处")
+
+    if show_changes and result.changes:
+        print("")
+        print("差异：")
+        for change in result.changes[:limit]:
+            if change.kind == 'added':
+                print(f"  + {change.word}  {change.translation}")
+            else:
+                detail = f"{change.old_translation} → {change.translation}" \
+                    if change.old_translation != change.translation else change.translation
+                examples = f"（例句 {change.examples_added:+d}）" if change.examples_added else ''
+                print(f"  ~ {change.word}  {detail}{examples}")
+        if len(result.changes) > limit:
+            print(f"  ... 还有 {len(result.changes) - limit} 处变化")
+
+    if result.conflicts:
+        print("")
+        print("⚠️  冲突（已取最新的值）：")
+        for conflict in result.conflicts[:limit]:
+            where = f"例句「{conflict.sentence}」" if conflict.sentence else '翻译'
+            values = dict.fromkeys(value for _, value in conflict.values)
+            print(f"  {conflict.word} {where}: {' | '.join(values)} → {conflict.chosen}")
+        if len(result.conflicts) > limit:
+            print(f"  ... 还有 {len(result.conflicts) - limit} 处冲突")
+
+
+def merge_command(cache, argv: list[str]) -> None:
+    """translation_cache.py merge 子命令"""
+    parser = argparse.ArgumentParser(prog='translation_cache.py merge',
+                                     description='合并多个翻译缓存文件')
+    parser.add_argument('inputs', nargs='+', help='要合并的缓存文件（其他机器的 translation_cache.json）')
+    parser.add_argument('--output', help='输出文件，默认合并到当前缓存')
+    parser.add_argument('--dry-run', action='store_true', help='只显示差异和冲突，不写入')
+    parser.add_argument('--report', help='将冲突和差异写为 JSON 报告')
+    parser.add_argument('--limit', type=int, default=DIFF_LIMIT, help='控制台最多显示的差异和冲突条数')
+    args = parser.parse_args(argv)
+
+    for path in args.inputs:
+        if not Path(path).exists():
+            print(f"Error: file not found: {path}")
+            sys.exit(1)
+
+    cache.flush()
+    output = Path(args.output) if args.output else cache.cache_file
+    with tempfile.TemporaryDirectory(prefix='cache_merge_') as temp_dir:
+        target = output if output.exists() else None
+        if output == cache.cache_file and hasattr(cache, 'export_json'):
+            # 分层模式：以数据库内容为合并目标；结果写入 JSON，下次打开缓存时导入数据库
+            target = Path(temp_dir) / 'store.json'
+            cache.export_json(str(target))
+            # 按数据库的修改时间参与新旧排序
+            store_mtime = cache.store_file.stat().st_mtime_ns
+            os.utime(target, ns=(store_mtime, store_mtime))
+        cache.close()
+
+        result = merge_caches(args.inputs, target, None if args.dry_run else output,
+                              collect_changes=args.dry_run or bool(args.report))
+
+    print_result(result, args.limit, show_changes=args.dry_run)
+    if args.report:
+        write_json(result.to_dict(), args.report, compression=PLAIN, pretty=True)
+        print(f"✓ 已写出报告: {args.report}")
+    if not args.dry_run:
+        print(f"✓ 已写入 {output}")
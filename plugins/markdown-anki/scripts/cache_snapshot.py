@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+翻译缓存二进制快照
+
+translation_cache.json 是缩进格式的 JSON，每次启动都要完整解析。快照文件
+（translation_cache.snap）与 JSON 放在同一目录，只使用标准库：
+
+    文件头  magic | 版本 | 源 JSON 的 mtime_ns 和大小 | 索引位置 | 数据区和索引的校验和
+    数据区  每个单词一条 marshal 记录，依次排列
+    索引    marshal 字典：单词 -> (偏移, 长度, crc32)
+
+- 快照记录了源 JSON 的 mtime 和大小，JSON 变化后快照自动失效，由调用方重新生成
+- 只打开索引即可按偏移读取单个单词，不需要反序列化整个缓存
+- 每条记录都有 crc32 校验，损坏的快照会被拒绝而不是返回错误数据
+"""
+
+import gc
+import marshal
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+MAGIC = b'TCSNAP\x00\x01'
+VERSION = 1
+
+# magic, version, source mtime_ns, source size, index offset, index length, data crc32, index crc32
+_HEADER = struct.Struct('<8sHqqQQII')
+
+
+class SnapshotError(Exception):
+    """快照文件格式错误、版本不符或校验失败"""
+
+
+def snapshot_path_for(cache_file: Path) -> Path:
+    """返回缓存 JSON 对应的快照路径"""
+    cache_file = Path(cache_file)
+    return cache_file.with_suffix('.snap')
+
+
+def _source_stamp(source: Path) -> tuple[int, int]:
+    """源 JSON 的 (mtime_ns, size)，不存在时返回 (0, 0)"""
+    try:
+        stat = source.stat()
+    except FileNotFoundError:
+        return 0, 0
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_snapshot(cache: dict, snapshot_file: Path, source_file: Path) -> int:
+    """
+    将缓存字典写入快照文件（先写临时文件再原子替换）
+
+    Args:
+        cache: 缓存字典（小写单词 -> 翻译信息）
+        snapshot_file: 快照文件路径
+        source_file: 对应的 JSON 文件，用于记录新鲜度
+
+    Returns:
+        写入的单词数量
+    """
+    snapshot_file = Path(snapshot_file)
+    mtime_ns, size = _source_stamp(Path(source_file))
+    temp_file = snapshot_file.with_name(f"{snapshot_file.name}.tmp.{os.getpid()}")
+
+    index = {}
+    data_crc = 0
+    with open(temp_file, 'wb') as f:
+        f.write(b'\x00' * _HEADER.size)
+        offset = _HEADER.size
+        for word, entry in cache.items():
+            record = marshal.dumps(entry)
+            f.write(record)
+            record_crc = zlib.crc32(record)
+            data_crc = zlib.crc32(record, data_crc)
+            index[word] = (offset, len(record), record_crc)
+            offset += len(record)
+
+        index_blob = marshal.dumps(index)
+        f.write(index_blob)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, mtime_ns, size, offset, len(index_blob),
+                             data_crc, zlib.crc32(index_blob)))
+
+    os.replace(temp_file, snapshot_file)
+    return len(index)
+
+
+class CacheSnapshot:
+    """只读快照：打开时只加载索引，单词按需按偏移解码"""
+
+    def __init__(self, snapshot_file: Path):
+        """
+        打开快照文件
+
+        Args:
+            snapshot_file: 快照文件路径
+
+        Raises:
+            SnapshotError: 文件格式、版本或索引校验不正确
+        """
+        self.snapshot_file = Path(snapshot_file)
+        with open(self.snapshot_file, 'rb') as f:
+            try:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # 空文件
+                raise SnapshotError(f"Empty snapshot file: {snapshot_file}") from e
+
+        if len(self._data) < _HEADER.size:
+            raise SnapshotError(f"Truncated snapshot file: {snapshot_file}")
+
+        (magic, version, self.source_mtime_ns, self.source_size,
+         index_offset, index_length, self._data_crc, index_crc) = _HEADER.unpack_from(self._data)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"Unsupported snapshot format: {snapshot_file}")
+
+        index_blob = self._data[index_offset:index_offset + index_length]
+        if len(index_blob) != index_length or zlib.crc32(index_blob) != index_crc:
+            raise SnapshotError(f"Snapshot index checksum mismatch: {snapshot_file}")
+        self._index: dict[str, tuple[int, int, int]] = marshal.loads(index_blob)
+        self._data_end = index_offset
+
+    def is_fresh(self, source_file: Path) -> bool:
+        """快照是否与源 JSON 一致（mtime 和大小都相同）"""
+        mtime_ns, size = _source_stamp(Path(source_file))
+        return size > 0 and (mtime_ns, size) == (self.source_mtime_ns, self.source_size)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._index
+
+    def keys(self) -> Iterator[str]:
+        """所有单词（不解码记录）"""
+        return iter(self._index)
+
+    def _decode(self, word: str, location: tuple[int, int, int]) -> dict:
+        offset, length, crc = location
+        record = self._data[offset:offset + length]
+        if zlib.crc32(record) != crc:
+            raise SnapshotError(f"Snapshot record checksum mismatch: {word}")
+        return marshal.loads(record)
+
+    def get(self, word: str) -> Optional[dict]:
+        """按偏移读取单个单词，不存在时返回 None"""
+        location = self._index.get(word)
+        if location is None:
+            return None
+        return self._decode(word, location)
+
+    def load_all(self) -> dict:
+        """解码整个缓存（整体校验一次；加载期间暂停 GC，避免大量小对象触发回收）"""
+        data = memoryview(self._data)[:self._data_end]
+        if zlib.crc32(data[_HEADER.size:]) != self._data_crc:
+            data.release()
+            raise SnapshotError(f"Snapshot data checksum mismatch: {self.snapshot_file}")
+
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            loads = marshal.loads
+            return {word: loads(data[offset:offset + length])
+                    for word, (offset, length, _) in self._index.items()}
+        finally:
+            data.release()
+            if gc_enabled:
+                gc.enable()
+
+    def close(self) -> None:
+        self._data.close()
+
+
+def open_fresh_snapshot(cache_file: Path) -> Optional[CacheSnapshot]:
+    """
+    打开与缓存 JSON 一致的快照
+
+    Returns:
+        快照对象；快照不存在、已过期或已损坏时返回 None
+    """
+    snapshot_file = snapshot_path_for(cache_file)
+    if not snapshot_file.exists():
+        return None
+    try:
+        snapshot = CacheSnapshot(snapshot_file)
+    except (SnapshotError, OSError, ValueError, EOFError):
+        return None
+    if not snapshot.is_fresh(cache_file):
+        snapshot.close()
+        return None
+    return snapshot
@@ -52,3 +52,120 @@ def get_output_dir() -> Path:
         return path
 
     return Path.cwd()
+
+
+def get_cache_snapshot() -> bool:
+    """
+    是否为翻译缓存生成二进制快照（translation_cache.snap）
+
+    Returns:
+        配置了 cache_snapshot: true 时返回 True，默认 False
+        （快照文件已存在时无论配置如何都会使用并保持更新）
+    """
+    return bool(load_config().get('cache_snapshot', False))
+
+
+def get_cache_mode() -> str:
+    """
+    翻译缓存模式
+
+    Returns:
+        'memory'（默认）：整个缓存加载到内存，每次添加后写回 translation_cache.json
+        'tiered'：内存中只保留固定数量的常用单词（LRU），其余存放在磁盘数据库中
+    """
+    mode = load_config().get('cache_mode', 'memory')
+    return mode if mode in ('memory', 'tiered') else 'memory'
+
+
+def get_cache_memory_entries() -> int:
+    """
+    分层缓存模式下内存中最多保留的单词数
+
+    Returns:
+        配置的 cache_memory_entries，默认 10000
+    """
+    try:
+        return max(1, int(load_config().get('cache_memory_entries', 10000)))
+    except (TypeError, ValueError):
+        return 10000
+
+
+def get_cache_bloom() -> bool:
+    """
+    是否使用布隆过滤器（translation_cache.bloom）快速判定未缓存的单词
+
+    Returns:
+        配置的 cache_bloom，默认 True
+    """
+    return bool(load_config().get('cache_bloom', True))
+
+
+def get_cache_bloom_fp_rate() -> float:
+    """
+    布隆过滤器的设计误判率
+
+    Returns:
+        配置的 cache_bloom_fp_rate（0 到 0.5 之间），默认 0.01
+    """
+    try:
+        rate = float(load_config().get('cache_bloom_fp_rate', 0.01))
+    except (TypeError, ValueError):
+        return 0.01
+    return rate if 0 < rate < 0.5 else 0.01
+
+
+def get_compression() -> str | None:
+    """
+    缓存和提取结果文件的压缩格式
+
+    Returns:
+        'gzip' 或 'lzma'；未配置 compression 或配置为 'none' 时返回 None
+        （读取时按文件头自动识别，修改配置不影响已有文件）
+    """
+    compression = load_config().get('compression')
+    return compression if compression in ('gzip', 'lzma') else None
+
+
+def get_pretty_json() -> bool:
+    """
+    JSON 文件是否缩进输出
+
+    Returns:
+        配置的 pretty_json，默认 True；False 时使用紧凑分隔符
+    """
+    return bool(load_config().get('pretty_json', True))
+
+
+def get_work_dir() -> Path:
+    """
+    批次文件、任务状态等中间文件的存放目录
+
+    Returns:
+        配置的 work_dir（自动展开 ~ 并创建目录），默认 /tmp
+    """
+    work_dir = load_config().get('work_dir')
+    if not work_dir:
+        return Path('/tmp')
+    path = Path(work_dir).expanduser()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_sentence_memory() -> bool:
+    """
+    是否使用例句翻译记忆（sentence_memory.json）填充和记录例句翻译
+
+    Returns:
+        配置的 sentence_memory，默认 True
+    """
+    return bool(load_config().get('sentence_memory', True))
+
+
+def get_near_match() -> bool:
+    """
+    第一步是否标记与已缓存单词拼写相近的未缓存单词（可能是拼写或 OCR 错误）
+
+    Returns:
+        配置的 near_match，默认 True
+    """
+    return bool(load_config().get('near_match', True))
@@ -1,57 +1,150 @@
 #!/usr/bin/env python3
 """
 从Markdown文件中提取标记的生词及其上下文句子。
-生词用 **word** 格式标记。
+生词用 **word** 格式标记，短语（如 **figure out**、**on the fence**）与单词一样提取。
 """
 
 import re
 import json
 import sys
+from bisect import bisect_left
 from pathlib import Path
+from typing import Iterator
+
+from cache_io import write_json
+from word_item import WordItem, deck_to_json, normalize_word
+
+
+# **word** 标记（整段文本只扫描一次）
+BOLD_PATTERN = re.compile(r'\*\*([^*]+)\*\*')
+# 有效生词：只包含字母、撇号和连字符
+WORD_PATTERN = re.compile(r"[a-zA-Z'-]+")
+# 短语最多包含的单词数（更长的通常是强调的整句，不作为生词）
+MAX_PHRASE_WORDS = 6
+# 有效短语：空格分隔的有效生词（已规范化）
+PHRASE_PATTERN = re.compile(r"[a-zA-Z'-]+(?: [a-zA-Z'-]+){0,%d}" % (MAX_PHRASE_WORDS - 1))
+# 向后查找句子结尾：句末标点，或段落边界（连续两个换行符）
+_FORWARD_BOUNDARY = re.compile(r'[.!?]|\n(?=\n)')
+
+# 向前/向后查找句子边界的最大距离
+CONTEXT_WINDOW = 500
+
+
+def _sentence_bounds(text: str, match_start: int, match_end: int) -> tuple[int, int]:
+    """
+    查找生词所在句子在原文中的范围（已去除首尾空白）
+
+    向前找句子开头（标点或段落边界），向后找句子结尾（标点或段落边界），
+    最多各查找 CONTEXT_WINDOW 个字符。
+    """
+    # 向前：最后一个句末标点，或段落边界（连续两个换行符中的第二个）
+    window_start = max(0, match_start - CONTEXT_WINDOW)
+    paragraph = text.rfind('\n\n', window_start, match_start)
+    boundary = max(
+        text.rfind('.', window_start + 1, match_start),
+        text.rfind('!', window_start + 1, match_start),
+        text.rfind('?', window_start + 1, match_start),
+        paragraph + 1 if paragraph >= 0 else -1,
+    )
+    sentence_start = match_start
+    if boundary >= 0:
+        # 跳过标点后的空白字符
+        sentence_start = boundary + 1
+        while sentence_start < match_start and text[sentence_start] in ' \t\n':
+            sentence_start += 1
+
+    # 向后：第一个句末标点（包含在句子内）或段落边界（不包含）
+    window_end = min(len(text), match_end + CONTEXT_WINDOW)
+    sentence_end = window_end
+    boundary_match = _FORWARD_BOUNDARY.search(text, match_end, window_end + 1)
+    if boundary_match and boundary_match.start() < window_end:
+        if boundary_match.group() == '\n':
+            sentence_end = boundary_match.start()
+        else:
+            sentence_end = boundary_match.end()
+
+    # 去除首尾空白
+    while sentence_start < sentence_end and text[sentence_start].isspace():
+        sentence_start += 1
+    while sentence_end > sentence_start and text[sentence_end - 1].isspace():
+        sentence_end -= 1
+    return sentence_start, sentence_end
+
+
+def _clean_sentence(sentence: str) -> str:
+    """移除 **word** 标记，并将连续空白（包括换行符）合并为一个空格"""
+    return ' '.join(BOLD_PATTERN.sub(r'\1', sentence).split())
 
 
 def get_sentence_context(text: str, word: str, match_start: int, match_end: int) -> str:
     """获取生词所在的完整句子作为上下文"""
-    # 向前找句子开头（标点或段落边界）
-    sentence_start = match_start
-    for i in range(match_start - 1, max(0, match_start - 500), -1):
-        # 遇到句子结束标点后的空白，说明找到了上一句的结尾
-        if text[i] in '.!?':
-            # 跳过标点后的空白字符
-            sentence_start = i + 1
-            while sentence_start < match_start and text[sentence_start] in ' \t\n':
-                sentence_start += 1
-            break
-        # 遇到连续两个换行符（段落边界）也视为句子开头
-        if i > 0 and text[i] == '\n' and text[i-1] == '\n':
-            sentence_start = i + 1
-            while sentence_start < match_start and text[sentence_start] in ' \t\n':
-                sentence_start += 1
-            break
-        if i == max(0, match_start - 500):
-            sentence_start = i
-
-    # 向后找句子结尾（标点或段落边界）
-    sentence_end = match_end
-    for i in range(match_end, min(len(text), match_end + 500)):
-        # 遇到句子结束标点
-        if text[i] in '.!?':
-            sentence_end = i + 1
-            break
-        # 遇到连续两个换行符（段落边界）
-        if i < len(text) - 1 and text[i] == '\n' and text[i+1] == '\n':
-            sentence_end = i
-            break
-        if i == min(len(text), match_end + 500) - 1:
-            sentence_end = i + 1
-
-    # 提取句子并清理
-    sentence = text[sentence_start:sentence_end].strip()
-    # 移除所有 **word** 标记，只保留单词本身
-    sentence = re.sub(r'\*\*([^*]+)\*\*', r'\1', sentence)
-    # 清理多余空白（将换行符替换为空格，多个空格合并为一个）
-    sentence = re.sub(r'\s+', ' ', sentence)
-    return sentence.strip()
+    sentence_start, sentence_end = _sentence_bounds(text, match_start, match_end)
+    return _clean_sentence(text[sentence_start:sentence_end])
+
+
+class MarkerScanner:
+    """
+    一次扫描整段文本中的所有 **word** 标记
+
+    - 标记只匹配一次，构建句子时直接复用标记位置，不再对每个句子运行正则
+    - 多个生词位于同一句子时，句子只构建一次
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._spans = [(m.start(), m.end(), m.group(1)) for m in BOLD_PATTERN.finditer(text)]
+        self._starts = [span[0] for span in self._spans]
+        self._sentences: dict[tuple[int, int], str] = {}
+
+    def marked_words(self) -> Iterator[tuple[int, int, str, str]]:
+        """
+        依次返回有效的生词（或短语）标记，跳过过短、纯数字或包含特殊字符的标记
+
+        Yields:
+            (标记开始位置, 标记结束位置, 原始形式, 规范化形式)
+            短语的原始形式中连续空白合并为一个空格
+        """
+        for start, end, marked in self._spans:
+            original = marked.strip()
+            word = original.lower()
+            if not WORD_PATTERN.fullmatch(word):
+                # 不是单个单词：规范化后按短语检查
+                original = ' '.join(original.split())
+                word = normalize_word(original)
+                if not PHRASE_PATTERN.fullmatch(word):
+                    continue
+            if len(word) < 2:
+                continue
+            yield start, end, original, word
+
+    def sentence(self, match_start: int, match_end: int) -> str:
+        """获取标记所在的句子（结果与 get_sentence_context 相同）"""
+        bounds = _sentence_bounds(self.text, match_start, match_end)
+        sentence = self._sentences.get(bounds)
+        if sentence is None:
+            sentence = self._build_sentence(*bounds)
+            self._sentences[bounds] = sentence
+        return sentence
+
+    def _build_sentence(self, sentence_start: int, sentence_end: int) -> str:
+        text = self.text
+        first = bisect_left(self._starts, sentence_start)
+        last = bisect_left(self._starts, sentence_end)
+
+        # 句子边界切在标记中间（如 **Mr. Smith**），按句子文本单独匹配标记
+        if (first > 0 and self._spans[first - 1][1] > sentence_start) or \
+                (last > 0 and self._spans[last - 1][1] > sentence_end):
+            return _clean_sentence(text[sentence_start:sentence_end])
+
+        # 用已匹配的标记拼接句子：标记外的原文 + 标记内的单词
+        parts = []
+        position = sentence_start
+        for start, end, marked in self._spans[first:last]:
+            parts.append(text[position:start])
+            parts.append(marked)
+            position = end
+        parts.append(text[position:sentence_end])
+        return ' '.join(''.join(parts).split())
 
 
 def extract_words_from_file(file_path: str) -> dict:
@@ -65,39 +158,22 @@ def extract_words_from_file(file_path: str) -> dict:
     # 使用文件名（不含扩展名）作为牌组名
     deck_name = path.stem
 
-    # 匹配 **word** 格式
-    pattern = r'\*\*([^*]+)\*\*'
-
     words_data = []
     seen_words = set()  # 避免重复
 
-    for match in re.finditer(pattern, content):
-        word = match.group(1).strip().lower()
-
-        # 跳过已处理的词和非单词内容
+    scanner = MarkerScanner(content)
+    for start, end, original_word, word in scanner.marked_words():
+        # 跳过已处理的词
         if word in seen_words:
             continue
-        if not word or len(word) < 2:
-            continue
-        # 跳过纯数字或特殊字符
-        if not re.match(r'^[a-zA-Z\'-]+$', word):
-            continue
-
         seen_words.add(word)
 
-        # 获取原始形式（保留大小写）
-        original_word = match.group(1).strip()
-
-        # 获取上下文句子
-        sentence = get_sentence_context(content, word, match.start(), match.end())
-
-        words_data.append({
-            'word': original_word,
-            'word_lower': word,
-            'sentence': sentence,
-            'translation': '',  # 待翻译
-            'sentence_translation': '',  # 待翻译
-        })
+        # 获取上下文句子，翻译字段留空，待翻译
+        words_data.append(WordItem(
+            word=original_word,
+            word_lower=word,
+            sentence=scanner.sentence(start, end),
+        ))
 
     return {
         'deck_name': deck_name,
@@ -121,13 +197,11 @@ def main():
 
     try:
         result = extract_words_from_file(input_file)
-        output = json.dumps(result, ensure_ascii=False, indent=2)
-
         if output_file:
-            Path(output_file).write_text(output, encoding='utf-8')
+            write_json(deck_to_json(result), output_file)
             print(f"Extracted {result['word_count']} words to {output_file}")
         else:
-            print(output)
+            print(json.dumps(deck_to_json(result), ensure_ascii=False, indent=2))
 
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
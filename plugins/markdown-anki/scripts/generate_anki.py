@@ -10,19 +10,24 @@
 - tags: 标签（牌组名，来自文件名）
 """
 
-import json
 import sys
 from pathlib import Path
 
+from cache_io import read_json
+from word_item import as_word_item
 
-def generate_anki_tsv(data: dict | list, output_path: str, deck_name: str = None) -> None:
+
+def write_anki_tsv(data: dict | list, output_path: str, deck_name: str = None) -> int:
     """
-    生成Anki可导入的TSV文件。
+    写出Anki可导入的TSV文件（不输出任何信息）。
 
     支持单个data dict或多个data的list（批量处理）。
 
     TSV格式：word<TAB>translation<TAB>sentence<TAB>sentence_translation<TAB>tags
     每个字段独立，便于Anki配置TTS和卡片模板。
+
+    Returns:
+        卡片数量
     """
     lines = []
 
@@ -44,10 +49,12 @@ def generate_anki_tsv(data: dict | list, output_path: str, deck_name: str = None
         tags = file_data.get('deck_name', '')
 
         for item in file_data['words']:
-            word = item['word']
-            translation = item.get('translation', '')
-            sentence = item.get('sentence', '')
-            sentence_translation = item.get('sentence_translation', '')
+            # 单词条目可能是 WordItem，也可能是从 JSON 文件读入的字典
+            item = as_word_item(item)
+            word = item.word
+            translation = item.translation
+            sentence = item.sentence
+            sentence_translation = item.sentence_translation
 
             # 清理特殊字符
             sentence = sentence.replace('\t', ' ').replace('\n', ' ')
@@ -60,7 +67,13 @@ def generate_anki_tsv(data: dict | list, output_path: str, deck_name: str = None
 
     output = '\n'.join(header + lines)
     Path(output_path).write_text(output, encoding='utf-8')
-    print(f"Generated Anki file: {output_path} ({len(lines)} cards)")
+    return len(lines)
+
+
+def generate_anki_tsv(data: dict | list, output_path: str, deck_name: str = None) -> None:
+    """生成Anki可导入的TSV文件，参数同 write_anki_tsv"""
+    cards = write_anki_tsv(data, output_path, deck_name)
+    print(f"Generated Anki file: {output_path} ({cards} cards)")
 
 
 def get_output_name(input_files: list[str]) -> str:
@@ -108,13 +121,13 @@ def main():
     try:
         if len(input_files) == 1:
             # 单文件模式
-            data = json.loads(Path(input_files[0]).read_text(encoding='utf-8'))
+            data = read_json(Path(input_files[0]))
             generate_anki_tsv(data, output_file)
         else:
             # 多文件批量模式
             all_data = []
             for input_file in sorted(input_files):
-                data = json.loads(Path(input_file).read_text(encoding='utf-8'))
+                data = read_json(Path(input_file))
                 all_data.append(data)
             generate_anki_tsv(all_data, output_file)
 
@@ -5,9 +5,10 @@
 这个工具可以将已有的 Anki 导出文件导入到缓存中，避免重复翻译。
 """
 
+import logging
 import sys
 from pathlib import Path
-from translation_cache import TranslationCache
+from translation_cache import TranslationCache, open_cache
 
 
 def import_from_anki_file(anki_file: str, cache: TranslationCache) -> int:
@@ -66,7 +67,8 @@ def main():
         sys.exit(1)
 
     anki_files = sys.argv[1:]
-    cache = TranslationCache()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    cache = open_cache()
 
     total_imported = 0
     for anki_file in anki_files:
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+缓存单词的有序索引
+
+translation_cache.py 原来只能按单词精确查询。浏览词表（如列出所有以 over 开头的单词）
+需要加载整个 JSON 再逐个扫描。有序索引（translation_cache.keys，与缓存放在同一目录）
+保存所有已缓存单词的排序列表：
+
+- 前缀查询：二分查找定位范围，O(log n)，结果数量也无需扫描即可得到
+- glob 模式（如 *ness、over*ed）：先按模式开头的固定前缀缩小范围，再逐个匹配
+- 分页列出：按偏移直接切片
+- 查询只读取索引，只有返回的那一页单词才从缓存中读取条目（有快照时按偏移解码）
+
+文件头记录缓存单词集合的版本标记，缓存变化后只插入新增的、删除已移除的单词，不从头排序。
+
+用法：
+    python translation_cache.py list [--offset N] [--limit N] [--keys-only]
+    python translation_cache.py find <前缀或模式> [--offset N] [--limit N] [--keys-only]
+"""
+
+import argparse
+import logging
+import marshal
+import os
+import re
+import struct
+import sys
+from bisect import bisect_left, bisect_right, insort
+from fnmatch import translate
+from pathlib import Path
+from typing import Iterable, Optional
+
+MAGIC = b'TCKEYS\x00\x01'
+VERSION = 1
+
+# magic, version, 版本标记长度
+_HEADER = struct.Struct('<8sHH')
+
+# glob 模式中的特殊字符
+_GLOB_CHARS = re.compile(r'[*?\[]')
+
+# 每页默认显示的单词数
+PAGE_SIZE = 50
+
+# 比所有单词都大的字符，用于确定前缀范围的上界
+_MAX_CHAR = '\U0010ffff'
+
+
+def key_index_path_for(cache_file: Path) -> Path:
+    """返回缓存 JSON 对应的有序索引路径"""
+    return Path(cache_file).with_suffix('.keys')
+
+
+def normalize_query(query: str) -> str:
+    """查询的规范化形式（与缓存键一致：小写、合并空白、弯撇号替换为 '；保留末尾的空格）"""
+    return re.sub(r'\s+', ' ', query.lower().replace('’', "'")).lstrip()
+
+
+class KeyIndex:
+    """已缓存单词的排序列表"""
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.stamp = ''
+        self._keys: list[str] = sorted(set(keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        position = bisect_left(self._keys, key)
+        return position < len(self._keys) and self._keys[position] == key
+
+    def update(self, keys: Iterable[str]) -> tuple[int, int]:
+        """
+        与缓存的单词集合同步
+
+        变化较少时逐个插入、删除（二分定位）；变化较多时整体重新排序。
+
+        Args:
+            keys: 缓存中的所有单词
+
+        Returns:
+            (新增数, 删除数)
+        """
+        wanted = set(keys)
+        current = set(self._keys)
+        added = wanted - current
+        removed = current - wanted
+        if len(added) + len(removed) > len(self._keys) // 16:
+            self._keys = sorted(wanted)
+        else:
+            for key in removed:
+                del self._keys[bisect_left(self._keys, key)]
+            for key in added:
+                insort(self._keys, key)
+        return len(added), len(removed)
+
+    def prefix_range(self, prefix: str) -> tuple[int, int]:
+        """以 prefix 开头的单词在排序列表中的范围 [start, end)"""
+        return (bisect_left(self._keys, prefix),
+                bisect_right(self._keys, prefix + _MAX_CHAR))
+
+    def find_prefix(self, prefix: str, offset: int = 0,
+                    limit: Optional[int] = PAGE_SIZE) -> tuple[list[str], int]:
+        """
+        前缀查询
+
+        Returns:
+            (本页的单词, 匹配总数)
+        """
+        start, end = self.prefix_range(prefix)
+        page_start = min(start + offset, end)
+        page_end = end if limit is None else min(page_start + limit, end)
+        return self._keys[page_start:page_end], end - start
+
+    def find_glob(self, pattern: str, offset: int = 0,
+                  limit: Optional[int] = PAGE_SIZE) -> tuple[list[str], int]:
+        """
+        glob 模式查询（*、?、[...]），只扫描模式开头的固定前缀对应的范围
+
+        Returns:
+            (本页的单词, 匹配总数)
+        """
+        literal = pattern[:match.start()] if (match := _GLOB_CHARS.search(pattern)) else pattern
+        start, end = self.prefix_range(literal)
+        matcher = re.compile(translate(pattern)).match
+        matches = [key for key in self._keys[start:end] if matcher(key)]
+        page_end = None if limit is None else offset + limit
+        return matches[offset:page_end], len(matches)
+
+    def find(self, query: str, offset: int = 0,
+             limit: Optional[int] = PAGE_SIZE) -> tuple[list[str], int]:
+        """包含 glob 特殊字符时按模式查询，否则按前缀查询"""
+        query = normalize_query(query)
+        if _GLOB_CHARS.search(query):
+            return self.find_glob(query, offset, limit)
+        return self.find_prefix(query, offset, limit)
+
+    def page(self, offset: int = 0, limit: Optional[int] = PAGE_SIZE) -> list[str]:
+        """按顺序列出单词的一页"""
+        return self._keys[offset:None if limit is None else offset + limit]
+
+    def save(self, path: Path, stamp: str) -> None:
+        """
+        写入文件（先写临时文件再原子替换）
+
+        Args:
+            path: 索引文件路径
+            stamp: 缓存单词集合的版本标记
+        """
+        path = Path(path)
+        self.stamp = stamp
+        stamp_bytes = stamp.encode('utf-8')
+        temp_file = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+        with open(temp_file, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(stamp_bytes)))
+            f.write(stamp_bytes)
+            f.write(marshal.dumps(self._keys))
+        os.replace(temp_file, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['KeyIndex']:
+        """读取索引文件，不存在或格式不正确时返回 None"""
+        try:
+            data = Path(path).read_bytes()
+            magic, version, stamp_length = _HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != VERSION:
+            return None
+
+        body_offset = _HEADER.size + stamp_length
+        try:
+            keys = marshal.loads(data[body_offset:])
+        except (ValueError, EOFError, TypeError):
+            return None
+        if not isinstance(keys, list):
+            return None
+
+        index = cls()
+        index.stamp = data[_HEADER.size:body_offset].decode('utf-8')
+        index._keys = keys
+        return index
+
+
+def load_key_index(cache, logger: logging.Logger = None) -> KeyIndex:
+    """
+    读取与缓存一致的有序索引，缓存变化后增量更新并保存
+
+    Args:
+        cache: TranslationCache 或 TieredTranslationCache
+        logger: 更新信息和警告的日志记录器，默认为本模块的 logger
+
+    Returns:
+        KeyIndex
+    """
+    logger = logger or logging.getLogger(__name__)
+    path = key_index_path_for(cache.cache_file)
+    stamp = cache.keys_stamp()
+    index = KeyIndex.load(path)
+    if index is not None and stamp and index.stamp == stamp:
+        return index
+
+    if index is None:
+        index = KeyIndex()
+    added, removed = index.update(cache.keys())
+    logger.info(f"  ✓ 单词索引已更新：新增 {added} 个、删除 {removed} 个（共 {len(index)} 个）")
+    if stamp:
+        try:
+            index.save(path, stamp)
+        except OSError as e:
+            logger.warning(f"Warning: Failed to write key index: {e}")
+    return index
+
+
+def query_command(cache, command: str, argv: list[str]) -> None:
+    """translation_cache.py list / find 子命令"""
+    parser = argparse.ArgumentParser(prog=f'translation_cache.py {command}',
+                                     description='按顺序列出缓存中的单词' if command == 'list'
+                                     else '按前缀或 glob 模式（*、?、[...]）查找缓存中的单词')
+    if command == 'find':
+        parser.add_argument('query', help='前缀（如 over）或 glob 模式（如 *ness、over*ed）')
+    parser.add_argument('--offset', type=int, default=0, help='跳过前 N 个结果')
+    parser.add_argument('--limit', type=int, default=PAGE_SIZE, help=f'每页的单词数（默认 {PAGE_SIZE}）')
+    parser.add_argument('--keys-only', action='store_true', help='只显示单词，不读取翻译')
+    args = parser.parse_args(argv)
+
+    index = load_key_index(cache)
+    offset = max(0, args.offset)
+    if command == 'find':
+        keys, total = index.find(args.query, offset, args.limit)
+    else:
+        keys, total = index.page(offset, args.limit), len(index)
+
+    for key in keys:
+        if args.keys_only:
+            print(key)
+        else:
+            entry = cache.get(key) or {}
+            print(f"{key}\t{entry.get('translation', '')}")
+
+    if keys:
+        shown = f"{offset + 1}-{offset + len(keys)}"
+        more = f"，下一页: --offset {offset + len(keys)}" if offset + len(keys) < total else ''
+        print(f"（第 {shown} 个，共 {total} 个{more}）", file=sys.stderr)
+    else:
+        print(f"（没有更多结果，共 {total} 个）", file=sys.stderr)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+已缓存单词的近似匹配索引
+
+剧本中拼错或 OCR 识别错误的加粗单词（如 recieve）不在缓存中，原来会被当作新单词送去翻译。
+近似匹配索引（translation_cache.near，与缓存放在同一目录）用于在分批前找出与已缓存单词
+编辑距离为 1～2 的未缓存单词（SymSpell 删除法）：
+
+- 建索引：每个已缓存单词的前 PREFIX_LENGTH 个字符删除至多 MAX_DISTANCE 个字符，
+  所有删除形式的哈希与单词编号打包成 64 位整数，排序后存为数组（读取时直接按字节载入）
+- 查询：对查询单词同样生成删除形式，二分查找数组得到候选单词，
+  再用编辑距离（相邻字符交换计为 1）逐个确认；10 万个单词时每次查询不到 1 毫秒
+- 单词越短允许的距离越小（见 max_distance_for），避免 cat/bat 这类正常单词互相匹配
+
+文件头记录缓存单词集合的版本标记。缓存变化后新增的单词记在增量表中、删除的单词只做标记，
+变化累积较多时才重新排序整个数组。
+
+用法：
+    python translation_cache.py near <单词> [--distance N] [--limit N]
+"""
+
+import argparse
+import logging
+import marshal
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from zlib import crc32
+
+from word_item import normalize_word
+
+MAGIC = b'TCNEAR\x00\x01'
+VERSION = 1
+
+# magic, version, 版本标记长度, 单词表长度
+_HEADER = struct.Struct('<8sHHI')
+
+# 最大编辑距离
+MAX_DISTANCE = 2
+
+# 只对单词的前 N 个字符生成删除形式（SymSpell 的前缀优化，索引大小与单词长度无关）
+PREFIX_LENGTH = 7
+
+# 短于此长度的单词不查询近似匹配
+MIN_WORD_LENGTH = 4
+
+# 查询最短的删除形式为 MIN_WORD_LENGTH - 1（4～6 个字母的单词只允许距离 1），更短的不写入索引
+_MIN_DELETE_LENGTH = MIN_WORD_LENGTH - 1
+
+# 每个单词默认返回的匹配数
+MATCH_LIMIT = 3
+
+_ID_MASK = 0xFFFFFFFF
+
+
+def near_index_path_for(cache_file: Path) -> Path:
+    """返回缓存 JSON 对应的近似匹配索引路径"""
+    return Path(cache_file).with_suffix('.near')
+
+
+def max_distance_for(word: str) -> int:
+    """
+    单词允许的最大编辑距离
+
+    Returns:
+        少于 MIN_WORD_LENGTH 个字符为 0（不查询），7 个字符以下为 1，其余为 MAX_DISTANCE
+    """
+    if len(word) < MIN_WORD_LENGTH:
+        return 0
+    return 1 if len(word) < 7 else MAX_DISTANCE
+
+
+def edit_distance(a: str, b: str, limit: int = MAX_DISTANCE) -> int:
+    """
+    编辑距离（插入、删除、替换和相邻字符交换各计为 1）
+
+    Args:
+        a, b: 比较的两个字符串
+        limit: 超过该距离后提前结束
+
+    Returns:
+        编辑距离；超过 limit 时返回 limit + 1
+    """
+    if a == b:
+        return 0
+    # 去掉公共前缀和后缀，只比较中间不同的部分
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a or not b:
+        return len(a) or len(b)
+
+    before: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if (i > 1 and j > 1 and char_a != char_b
+                    and char_a == b[j - 2] and a[i - 2] == char_b):
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _delete_hashes(word: str, distance: int, min_length: int = 0) -> set[int]:
+    """单词前缀删除至多 distance 个字符得到的所有形式（包括前缀本身）的哈希"""
+    level = {word[:PREFIX_LENGTH]}
+    deletes = set(level)
+    for _ in range(distance):
+        level = {text[:i] + text[i + 1:] for text in level if len(text) > min_length
+                 for i in range(len(text))}
+        deletes |= level
+    return {crc32(text.encode('utf-8')) for text in deletes if len(text) >= min_length}
+
+
+class NearMatchIndex:
+    """SymSpell 删除形式索引"""
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.stamp = ''
+        self._words: list[str] = []               # 单词编号 -> 单词（已删除的为空字符串）
+        self._entries = array('Q')                # 排序的 删除形式哈希 << 32 | 单词编号
+        self._base = 0                            # 数组中包含的单词数，之后的编号在增量表中
+        self._recent: dict[int, list[int]] = {}   # 增量表：删除形式哈希 -> 单词编号
+        self._rebuild(sorted(set(keys)))
+
+    def __len__(self) -> int:
+        return len(self._words) - self._words.count('')
+
+    def _rebuild(self, words: list[str]) -> None:
+        """按单词列表重新生成整个数组"""
+        self._words = list(words)
+        packed = [(value << 32) | word_id for word_id, word in enumerate(self._words)
+                  for value in _delete_hashes(word, MAX_DISTANCE, _MIN_DELETE_LENGTH)]
+        packed.sort()
+        self._entries = array('Q', packed)
+        self._base = len(self._words)
+        self._recent = {}
+
+    def update(self, keys: Iterable[str]) -> tuple[int, int]:
+        """
+        与缓存的单词集合同步
+
+        新增的单词写入增量表，删除的单词只清空编号对应的单词；
+        累积的变化超过单词数的 1/16 时重新生成数组。
+
+        Args:
+            keys: 缓存中的所有单词
+
+        Returns:
+            (新增数, 删除数)
+        """
+        wanted = set(keys)
+        ids = {word: word_id for word_id, word in enumerate(self._words) if word}
+        added = sorted(wanted.difference(ids))
+        removed = [word_id for word, word_id in ids.items() if word not in wanted]
+
+        pending = len(self._words) - self._base + self._words.count('')
+        if pending + len(added) + len(removed) > len(wanted) // 16:
+            self._rebuild(sorted(wanted))
+            return len(added), len(removed)
+
+        for word_id in removed:
+            self._words[word_id] = ''
+        for word in added:
+            word_id = len(self._words)
+            self._words.append(word)
+            for value in _delete_hashes(word, MAX_DISTANCE, _MIN_DELETE_LENGTH):
+                self._recent.setdefault(value, []).append(word_id)
+        return len(added), len(removed)
+
+    def _candidates(self, word: str, distance: int) -> Iterator[int]:
+        """与 word 有共同删除形式的单词编号（可能重复）"""
+        entries = self._entries
+        count = len(entries)
+        for value in _delete_hashes(word, distance):
+            position = bisect_left(entries, value << 32)
+            while position < count and entries[position] >> 32 == value:
+                yield entries[position] & _ID_MASK
+                position += 1
+            yield from self._recent.get(value, ())
+
+    def lookup(self, word: str, max_distance: Optional[int] = None,
+               limit: int = MATCH_LIMIT) -> list[tuple[str, int]]:
+        """
+        查找与 word 拼写相近的已缓存单词
+
+        Args:
+            word: 查询的单词（按 normalize_word 规范化）
+            max_distance: 最大编辑距离，默认按单词长度决定（见 max_distance_for）
+            limit: 最多返回的匹配数
+
+        Returns:
+            [(单词, 编辑距离)]，按距离、长度差和字母顺序排列；不包括 word 本身
+        """
+        word = normalize_word(word)
+        if max_distance is None:
+            max_distance = max_distance_for(word)
+        if max_distance <= 0:
+            return []
+
+        checked = set()
+        matches = []
+        for word_id in self._candidates(word, max_distance):
+            if word_id in checked:
+                continue
+            checked.add(word_id)
+            candidate = self._words[word_id]
+            if not candidate or candidate == word:
+                continue
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, abs(len(candidate) - len(word)), candidate))
+        matches.sort()
+        return [(candidate, distance) for distance, _, candidate in matches[:limit]]
+
+    def save(self, path: Path, stamp: str) -> None:
+        """
+        写入文件（先写临时文件再原子替换）
+
+        Args:
+            path: 索引文件路径
+            stamp: 缓存单词集合的版本标记
+        """
+        path = Path(path)
+        self.stamp = stamp
+        stamp_bytes = stamp.encode('utf-8')
+        words = marshal.dumps((self._words, self._base, self._recent))
+        temp_file = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+        with open(temp_file, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(stamp_bytes), len(words)))
+            f.write(stamp_bytes)
+            f.write(words)
+            self._entries.tofile(f)
+        os.replace(temp_file, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['NearMatchIndex']:
+        """读取索引文件，不存在或格式不正确时返回 None"""
+        try:
+            data = Path(path).read_bytes()
+            magic, version, stamp_length, words_length = _HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != VERSION:
+            return None
+
+        words_offset = _HEADER.size + stamp_length
+        entries_offset = words_offset + words_length
+        try:
+            words, base, recent = marshal.loads(data[words_offset:entries_offset])
+            entries = array('Q')
+            entries.frombytes(memoryview(data)[entries_offset:])
+        except (ValueError, EOFError, TypeError):
+            return None
+
+        index = cls()
+        index.stamp = data[_HEADER.size:words_offset].decode('utf-8')
+        index._words = words
+        index._base = base
+        index._recent = recent
+        index._entries = entries
+        return index
+
+
+def load_near_index(cache, logger: logging.Logger = None) -> NearMatchIndex:
+    """
+    读取与缓存一致的近似匹配索引，缓存变化后增量更新并保存
+
+    Args:
+        cache: TranslationCache 或 TieredTranslationCache
+        logger: 更新信息和警告的日志记录器，默认为本模块的 logger
+
+    Returns:
+        NearMatchIndex
+    """
+    logger = logger or logging.getLogger(__name__)
+    path = near_index_path_for(cache.cache_file)
+    stamp = cache.keys_stamp()
+    index = NearMatchIndex.load(path)
+    if index is not None and stamp and index.stamp == stamp:
+        return index
+
+    if index is None:
+        index = NearMatchIndex()
+    added, removed = index.update(cache.keys())
+    logger.info(f"  ✓ 近似匹配索引已更新：新增 {added} 个、删除 {removed} 个（共 {len(index)} 个）")
+    if stamp:
+        try:
+            index.save(path, stamp)
+        except OSError as e:
+            logger.warning(f"Warning: Failed to write near-match index: {e}")
+    return index
+
+
+def near_command(cache, argv: list[str]) -> None:
+    """translation_cache.py near 子命令"""
+    parser = argparse.ArgumentParser(prog='translation_cache.py near',
+                                     description='查找与单词拼写相近的已缓存单词（拼写或 OCR 错误）')
+    parser.add_argument('words', nargs='+', help='要查询的单词')
+    parser.add_argument('--distance', type=int, default=None,
+                        help=f'最大编辑距离（默认按单词长度决定，最大 {MAX_DISTANCE}）')
+    parser.add_argument('--limit', type=int, default=MATCH_LIMIT, help=f'每个单词最多显示的匹配数（默认 {MATCH_LIMIT}）')
+    args = parser.parse_args(argv)
+
+    index = load_near_index(cache)
+    for word in args.words:
+        if cache.get(word):
+            print(f"{word}\t（已缓存）")
+            continue
+        distance = None if args.distance is None else min(args.distance, MAX_DISTANCE)
+        matches = index.lookup(word, distance, args.limit)
+        if not matches:
+            print(f"{word}\t（没有拼写相近的已缓存单词）")
+        for match, match_distance in matches:
+            entry = cache.get(match) or {}
+            print(f"{word}\t→ {match}（距离 {match_distance}）\t{entry.get('translation', '')}")
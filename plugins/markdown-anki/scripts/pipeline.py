@@ -0,0 +1,973 @@
+#!/usr/bin/env python3
+"""
+可导入的处理流水线
+
+process_file.py、process_directory.py、process_library.py 共用同一套流程：
+
+1. 提取生词（多个文件时并行提取）
+2. 全局去重后查询缓存（布隆过滤器先排除一定未缓存的单词），
+   标记与已缓存单词拼写相近的未缓存单词（如 recieve），可选择沿用已有的翻译
+3. 认领未缓存的单词，分批写出待翻译文件（批次文件按内容寻址，重新运行时沿用）
+4. 保存翻译到缓存，所有批次完成后生成 Anki 文件
+
+第一步的提取结果保存在工作目录的 <key>_extract.json 中（按例句表压缩存储），
+第二步只检查源文件的修改时间和大小，重新提取有变化的文件，其余直接读取保存的结果。
+
+Pipeline 不向标准输出打印任何内容：缓存、工作目录和日志记录器都由调用方注入，
+每一步返回结构化的 PipelineResult。命令行脚本只负责解析参数和展示结果。
+在同一个进程中处理大量文件时，缓存只打开一次：
+
+    pipeline = Pipeline(work_dir='/var/tmp/anki')
+    for path in markdown_files:
+        result = pipeline.prepare_file(path)
+        print(result.status, result.output_files)
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from hashlib import blake2b
+from pathlib import Path
+from typing import Optional
+
+from batch_extract import discover_files
+from cache_io import PLAIN, read_json, write_json
+from config import get_near_match, get_output_dir, get_work_dir
+from extract_words import extract_words_from_file
+from generate_anki import write_anki_tsv
+from near_match import load_near_index
+from translation_cache import open_cache
+from sentence_memory import open_sentence_memory
+from translation_leases import (LeaseTable, claim_words, lease_file_for, load_pending,
+                                make_owner, pending_file_for, save_pending)
+from word_item import WordItem, as_word_item, normalize_word
+
+# 每批翻译的最大单词数
+BATCH_SIZE = 30
+
+# 处理结果状态
+EMPTY = 'empty'            # 没有找到标记的生词
+TRANSLATE = 'translate'    # 已写出待翻译的批次文件
+WAITING = 'waiting'        # 剩余单词正由其他任务翻译
+INCOMPLETE = 'incomplete'  # 还有批次未完成翻译
+DONE = 'done'              # 已生成 Anki 文件
+
+
+@dataclass(slots=True)
+class BatchInfo:
+    """一个待翻译的批次文件"""
+
+    path: str
+    number: int
+    total: int
+    words: int
+    batch_id: str = ''
+    reused: bool = False       # 沿用了上次第一步写出的批次文件
+
+
+@dataclass(slots=True)
+class NearMatch:
+    """与已缓存单词拼写相近的未缓存单词（可能是拼写或 OCR 错误）"""
+
+    word: str
+    match: str                 # 拼写最接近的已缓存单词
+    distance: int              # 编辑距离
+    translation: str           # 已缓存单词的翻译
+    reused: bool = False       # 已沿用该翻译，不再送去翻译
+
+
+@dataclass(slots=True)
+class SourceStats:
+    """单个来源（文件或目录）的提取统计"""
+
+    name: str
+    files: int
+    words: int
+
+
+@dataclass(slots=True)
+class PipelineResult:
+    """流水线一步的处理结果（to_dict 可直接序列化为 JSON）"""
+
+    status: str
+    name: str
+    job_file: str = ''
+    total: int = 0
+    unique: int = 0
+    cached: int = 0
+    new: int = 0
+    pending_elsewhere: int = 0
+    definite_misses: int = 0
+    sentences_reused: int = 0
+    reused_batches: int = 0
+    saved: int = 0
+    files_reused: int = 0        # 直接使用上次提取结果的文件数
+    files_extracted: int = 0     # 本次重新提取的文件数
+    sources: list[SourceStats] = field(default_factory=list)
+    near_matches: list[NearMatch] = field(default_factory=list)
+    batches: list[BatchInfo] = field(default_factory=list)
+    untranslated_batches: list[int] = field(default_factory=list)
+    waiting: dict[str, str] = field(default_factory=dict)
+    output_files: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class Job:
+    """
+    一次处理任务
+
+    第一步写入工作目录的 <key>_job.json，批次文件记录该路径，
+    第二步据此检查所有批次，读取保存的提取结果并生成 Anki 文件。
+    """
+
+    name: str
+    kind: str                    # 'file'、'directory' 或 'library'
+    sources: list[str]
+    discovery: dict = field(default_factory=dict)
+    output_dir: Optional[str] = None
+    output_file: Optional[str] = None
+    combined: bool = False
+    work_dir: str = ''
+    batch_files: list[str] = field(default_factory=list)
+
+    @property
+    def source_id(self) -> str:
+        """来源标识：任务类型和来源绝对路径的哈希（不同剧集下同名的 S01 互不冲突）"""
+        return content_hash([self.kind, *self.sources], digest_size=4)
+
+    @property
+    def key(self) -> str:
+        """任务文件、待定单词文件的文件名前缀"""
+        return f"{self.name}_{self.source_id}"
+
+
+def content_hash(parts: list[str], digest_size: int = 6) -> str:
+    """字符串列表的哈希（十六进制，长度为 digest_size 的两倍）"""
+    return blake2b('\0'.join(parts).encode('utf-8'), digest_size=digest_size).hexdigest()
+
+
+def batch_id(source_id: str, words: list[str]) -> str:
+    """
+    批次标识：来源标识和排序后单词集合的哈希
+
+    输入不变时重新运行第一步得到相同的批次标识，从而找到并沿用已有的批次文件
+
+    Args:
+        source_id: 任务的来源标识（Job.source_id）
+        words: 批次中的单词（小写）
+    """
+    return content_hash([source_id, *sorted(words)])
+
+
+def deck_names(directories: list[str]) -> dict:
+    """
+    每个目录的牌组名：默认使用目录名，重名时（如不同剧集的 S01）带上父目录名
+
+    Returns:
+        目录 -> 牌组名
+    """
+    basenames = [Path(directory).name for directory in directories]
+    names = {}
+    for directory, basename in zip(directories, basenames):
+        if basenames.count(basename) > 1:
+            names[directory] = f"{Path(directory).parent.name}_{basename}"
+        else:
+            names[directory] = basename
+    return names
+
+
+# 写在批次文件中的返回格式说明（批次文件交给 Claude Code 翻译）
+REPLY_FORMAT = (
+    '返回 JSON：{"words": [{"word": 单词, "translation": 全部常用词义}], '
+    '"sentences": [{"id": 例句 id, "sentence_translation": 例句翻译}]}；'
+    'sentence_translation 已填写的例句无需翻译'
+)
+
+
+def plan_batches(words: list, batch_size: int = BATCH_SIZE) -> list[list]:
+    """
+    把单词分批：同一例句的单词放进同一批（按例句分组后首次适应装箱）
+
+    Args:
+        words: 待翻译的单词条目
+        batch_size: 每批最多的单词数（超过该数量的例句组会被拆开）
+
+    Returns:
+        批次列表，每批为单词条目列表
+    """
+    groups = {}
+    for word_item in words:
+        groups.setdefault(word_item.sentence, []).append(word_item)
+
+    batches = []
+    for group in groups.values():
+        while len(group) > batch_size:
+            batches.append(group[:batch_size])
+            group = group[batch_size:]
+        for batch in batches:
+            if len(batch) + len(group) <= batch_size:
+                batch.extend(group)
+                break
+        else:
+            batches.append(list(group))
+    return batches
+
+
+def batch_to_json(words: list) -> dict:
+    """
+    批次内容的规范化形式：例句只在 sentences 表中出现一次，单词通过 sentence_id 引用
+
+    Returns:
+        {'sentences': [...], 'words': [...]}
+    """
+    sentence_ids = {}
+    sentences = []
+    items = []
+    for word_item in words:
+        sentence_id = sentence_ids.get(word_item.sentence)
+        if sentence_id is None:
+            sentence_id = sentence_ids[word_item.sentence] = len(sentences) + 1
+            sentences.append({
+                'id': sentence_id,
+                'sentence': word_item.sentence,
+                'sentence_translation': word_item.sentence_translation,
+            })
+        item = {'word': word_item.word, 'word_lower': word_item.word_lower, 'sentence_id': sentence_id}
+        if word_item.deck_name:
+            item['deck_name'] = word_item.deck_name
+        items.append(item)
+    return {'sentences': sentences, 'words': items}
+
+
+def batch_words(batch_data: dict) -> list[WordItem]:
+    """从批次数据还原单词条目（例句和预填的例句翻译按 sentence_id 展开）"""
+    sentences = {entry['id']: entry for entry in batch_data.get('sentences', [])}
+    words = []
+    for item in batch_data['words']:
+        word_item = as_word_item(item)
+        sentence = sentences.get(item.get('sentence_id'))
+        if sentence is not None:
+            word_item.sentence = sentence['sentence']
+            word_item.sentence_translation = sentence.get('sentence_translation', '')
+        words.append(word_item)
+    return words
+
+
+def parse_translations(data) -> tuple[list[dict], dict[int, str]]:
+    """
+    解析翻译结果，兼容两种格式
+
+    - {"words": [...], "sentences": [{"id": 1, "sentence_translation": ...}]}（规范化格式）
+    - [{"word": ..., "translation": ..., "sentence_translation": ...}]（逐词格式）
+
+    Returns:
+        (单词翻译列表, 例句 id -> 例句翻译)
+    """
+    if isinstance(data, dict) and 'words' in data:
+        sentences = data.get('sentences') or []
+        if isinstance(sentences, dict):
+            # 也接受 {"1": "例句翻译"} 形式
+            pairs = sentences.items()
+        else:
+            pairs = ((entry.get('id'), entry.get('sentence_translation', '')) for entry in sentences)
+        sentence_translations = {}
+        for sentence_id, translation in pairs:
+            if sentence_id is not None and translation:
+                sentence_translations[int(sentence_id)] = translation
+        return data['words'], sentence_translations
+    if isinstance(data, dict):
+        data = [data]
+    return data, {}
+
+
+# 提取结果文件格式版本（格式或提取规则变化时旧文件作废，重新提取）
+# 2: 提取标记的短语
+EXTRACTION_VERSION = 2
+
+
+def encode_extraction(result: dict) -> dict:
+    """
+    单个文件提取结果的紧凑形式：例句只保存一次，单词为 [原始形式, 小写形式, 例句序号]
+
+    Args:
+        result: extract_words_from_file 的返回值
+    """
+    sentence_ids = {}
+    words = []
+    for word_item in result['words']:
+        sentence_id = sentence_ids.setdefault(word_item.sentence, len(sentence_ids))
+        words.append([word_item.word, word_item.word_lower, sentence_id])
+    return {'deck_name': result['deck_name'], 'sentences': list(sentence_ids), 'words': words}
+
+
+def decode_extraction(entry: dict, path: str) -> dict:
+    """从紧凑形式还原 extract_words_from_file 的返回值"""
+    sentences = entry['sentences']
+    words = [WordItem(word=word, word_lower=word_lower, sentence=sentences[sentence_id])
+             for word, word_lower, sentence_id in entry['words']]
+    return {
+        'deck_name': entry['deck_name'],
+        'file_path': path,
+        'word_count': len(words),
+        'words': words,
+    }
+
+
+def _extract_safely(path: str) -> dict | str:
+    """提取单个文件（子进程中执行），失败时返回错误信息"""
+    try:
+        return extract_words_from_file(path)
+    except Exception as e:
+        return str(e)
+
+
+def _apply_translation(word_item, cached_translation: dict, sentence_translation: str = '') -> None:
+    """
+    用缓存的翻译填充单词
+
+    例句翻译优先使用例句翻译记忆中卡片例句本身的翻译，否则使用缓存的第一个例句
+    """
+    word_item.translation = cached_translation['translation']
+    examples = cached_translation.get('sentence_examples', [])
+    if sentence_translation:
+        word_item.sentence_translation = sentence_translation
+    elif examples:
+        word_item.sentence_translation = examples[0]['sentence_translation']
+
+
+class Pipeline:
+    """生词处理流水线"""
+
+    def __init__(self, cache=None, work_dir: str = None, logger: logging.Logger = None,
+                 jobs: int = None, batch_size: int = BATCH_SIZE, sentence_memory=None,
+                 reuse_near_matches=None):
+        """
+        初始化流水线
+
+        Args:
+            cache: 翻译缓存，默认在第一次使用时调用 open_cache() 打开
+            work_dir: 批次文件、任务状态等中间文件的目录，默认读取配置 work_dir（/tmp）
+            logger: 进度日志记录器，默认为本模块的 logger（不配置时不输出）
+            jobs: 并行提取的进程数，默认为 CPU 核数，1 表示不使用子进程
+            batch_size: 每批翻译的最大单词数
+            sentence_memory: 例句翻译记忆，默认打开与缓存同目录的 sentence_memory.json
+                （配置 sentence_memory: false 时不使用）
+            reuse_near_matches: 拼写相近的未缓存单词直接沿用已缓存单词的翻译，不送去翻译；
+                True 表示全部沿用，单词集合表示只沿用其中的单词，默认只标记
+        """
+        self._cache = cache
+        self.work_dir = Path(work_dir) if work_dir else get_work_dir()
+        self.logger = logger or logging.getLogger(__name__)
+        self.jobs = jobs
+        self.batch_size = batch_size
+        self._sentence_memory = sentence_memory
+        self._sentence_memory_opened = sentence_memory is not None
+        self.reuse_near_matches = reuse_near_matches
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = open_cache(logger=self.logger)
+        return self._cache
+
+    @property
+    def sentence_memory(self):
+        if not self._sentence_memory_opened:
+            self._sentence_memory = open_sentence_memory(self.cache, logger=self.logger)
+            self._sentence_memory_opened = True
+        return self._sentence_memory
+
+    def _job_file(self, job: Job) -> Path:
+        return self.work_dir / f"{job.key}_job.json"
+
+    def _batch_file(self, job: Job, words: list[str]) -> Path:
+        return self.work_dir / f"{job.name}_to_translate_{batch_id(job.source_id, words)}.json"
+
+    def _read_job(self, job: Job) -> Optional[Job]:
+        """读取同一来源上次第一步保存的任务，没有时返回 None"""
+        try:
+            return Job(**read_json(self._job_file(job)))
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+
+    def directory_job(self, directory: str) -> Optional[Job]:
+        """
+        目录上次第一步保存的任务（process_directory.py 第二步据此按批次号找到批次文件）
+
+        Returns:
+            任务；没有运行过第一步时返回 None
+        """
+        path = Path(directory).resolve()
+        return self._read_job(Job(name=path.name, kind='directory', sources=[str(path)]))
+
+    # ------------------------------------------------------------------
+    # 第一步：提取、查询缓存、写出批次
+    # ------------------------------------------------------------------
+
+    def prepare_file(self, markdown_file: str, output_dir: str = None) -> PipelineResult:
+        """
+        处理单个 Markdown 文件
+
+        Args:
+            markdown_file: Markdown 文件路径
+            output_dir: Anki 文件输出目录，默认读取配置
+
+        Returns:
+            处理结果（所有单词已缓存时直接生成 Anki 文件）
+        """
+        path = Path(markdown_file).resolve()
+        job = Job(name=path.stem, kind='file', sources=[str(path)],
+                  output_dir=str(output_dir) if output_dir else None)
+        return self._prepare(job)
+
+    def prepare_directory(self, directory: str, output_file: str = None,
+                          discovery: dict = None, output_dir: str = None) -> PipelineResult:
+        """
+        处理整个目录的 Markdown 文件，生成一个合并的 Anki 文件
+
+        Args:
+            directory: 包含 Markdown 文件的目录
+            output_file: 输出的 Anki 文件路径，默认为 <输出目录>/<目录名>.txt
+            discovery: 文件发现参数，见 batch_extract.discover_files
+            output_dir: Anki 文件输出目录，默认读取配置
+
+        Returns:
+            处理结果
+        """
+        path = Path(directory).resolve()
+        job = Job(name=path.name, kind='directory', sources=[str(path)],
+                  discovery=dict(discovery or {}),
+                  output_dir=str(output_dir) if output_dir else None,
+                  output_file=str(output_file) if output_file else None)
+        return self._prepare(job)
+
+    def prepare_library(self, directories: list[str], name: str = 'library',
+                        discovery: dict = None, combined: bool = False,
+                        output_dir: str = None) -> PipelineResult:
+        """
+        处理多个目录，为每个目录生成一个 Anki 文件
+
+        Args:
+            directories: 目录列表
+            name: 剧集库名称（用于批次文件和合并文件命名）
+            discovery: 文件发现参数
+            combined: 是否额外生成合并所有目录的 Anki 文件
+            output_dir: Anki 文件输出目录，默认读取配置
+
+        Returns:
+            处理结果
+        """
+        job = Job(name=name, kind='library',
+                  sources=[str(Path(directory).resolve()) for directory in directories],
+                  discovery=dict(discovery or {}), combined=combined,
+                  output_dir=str(output_dir) if output_dir else None)
+        return self._prepare(job)
+
+    def extract(self, job: Job) -> dict:
+        """
+        提取任务所有来源的生词（多个文件时并行）
+
+        Returns:
+            来源 -> 该来源下各文件的提取结果列表（跳过没有生词的文件）
+        """
+        library, _ = self._extract(job)
+        return library
+
+    def _extraction_file(self, job: Job) -> Path:
+        return self.work_dir / f"{job.key}_extract.json"
+
+    def _load_extraction(self, job: Job) -> dict:
+        """读取上次保存的提取结果（文件路径 -> 条目），没有或格式不符时返回空字典"""
+        try:
+            data = read_json(self._extraction_file(job))
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            self.logger.warning(f"  ⚠️  提取结果无法读取，重新提取：{e}")
+            return {}
+        if data.get('version') != EXTRACTION_VERSION:
+            return {}
+        return data.get('files', {})
+
+    def _extract(self, job: Job, previous: dict = None,
+                 result: PipelineResult = None) -> tuple[dict, dict]:
+        """
+        提取任务的生词，修改时间和大小都没有变化的文件直接使用上次的提取结果
+
+        Args:
+            job: 任务
+            previous: 上次保存的提取结果（文件路径 -> 条目）
+            result: 记录复用和重新提取的文件数
+
+        Returns:
+            (来源 -> 提取结果列表, 本次的提取结果条目)
+        """
+        previous = previous or {}
+        discovery = dict(job.discovery)
+        include = discovery.pop('pattern', '*.md')
+
+        files = []
+        for source in job.sources:
+            if job.kind == 'file':
+                files.append((source, source))
+                continue
+            for path in discover_files(source, include, **discovery):
+                files.append((source, str(path)))
+
+        # 先记录文件状态再提取：提取期间被修改的文件下次会重新提取
+        entries = {}
+        changed = []
+        for source, path in files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            entry = previous.get(path)
+            if (stat is not None and entry is not None and entry['source'] == source
+                    and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size):
+                entries[path] = entry
+            else:
+                changed.append((source, path, stat))
+
+        jobs = self.jobs if self.jobs is not None else (os.cpu_count() or 1)
+        paths = [path for _, path, _ in changed]
+        if jobs > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(_extract_safely, paths, chunksize=8))
+        else:
+            results = [_extract_safely(path) for path in paths]
+
+        extracted = {}
+        for (source, path, stat), file_result in zip(changed, results):
+            if isinstance(file_result, str):
+                self.logger.warning(f"  ⚠️  {path}: Error - {file_result}")
+                continue
+            extracted[path] = file_result
+            if stat is not None:
+                entries[path] = {'source': source, 'mtime_ns': stat.st_mtime_ns,
+                                 'size': stat.st_size, **encode_extraction(file_result)}
+
+        if result is not None:
+            result.files_extracted = len(changed)
+            result.files_reused = len(files) - len(changed)
+
+        library = {source: [] for source in job.sources}
+        for source, path in files:
+            file_result = extracted.get(path)
+            if file_result is None and path in entries:
+                file_result = decode_extraction(entries[path], path)
+            if file_result is not None and file_result['word_count'] > 0:
+                library[source].append(file_result)
+        return library, entries
+
+    def _save_extraction(self, job: Job, entries: dict) -> None:
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        write_json({'version': EXTRACTION_VERSION, 'files': entries}, self._extraction_file(job),
+                   pretty=False)
+
+    def _extract_incremental(self, job: Job, result: PipelineResult) -> dict:
+        """读取保存的提取结果，只重新提取有变化的文件，有变化时写回"""
+        previous = self._load_extraction(job)
+        library, entries = self._extract(job, previous, result)
+        if result.files_extracted or entries.keys() != previous.keys():
+            self._save_extraction(job, entries)
+        return library
+
+    def _source_names(self, job: Job) -> dict:
+        if job.kind == 'library':
+            return deck_names(job.sources)
+        return {job.sources[0]: job.name}
+
+    def _prepare(self, job: Job) -> PipelineResult:
+        job_file = self._job_file(job)
+        result = PipelineResult(status=EMPTY, name=job.name, job_file=str(job_file))
+
+        # 1. 提取生词
+        self.logger.info(f"[1/5] 提取生词：{', '.join(job.sources)}")
+        library = self._extract_incremental(job, result)
+        if result.files_reused:
+            self.logger.info(f"  ✓ {result.files_reused} 个文件没有变化，使用上次的提取结果")
+
+        names = self._source_names(job)
+        for source, all_data in library.items():
+            words = sum(data['word_count'] for data in all_data)
+            result.sources.append(SourceStats(names[source], len(all_data), words))
+            result.total += words
+            if job.kind == 'library':
+                self.logger.info(f"  {names[source]}: {len(all_data)} 个文件，{words} 个生词")
+
+        if result.total == 0:
+            self.logger.info("  没有找到标记的生词")
+            return result
+
+        total_files = sum(source.files for source in result.sources)
+        self.logger.info(f"  ✓ 从 {total_files} 个文件中提取到 {result.total} 个生词（已去重）")
+
+        # 2. 查询缓存（全局去重）
+        self.logger.info("[2/5] 查询翻译缓存并全局去重")
+        cache = self.cache
+
+        seen_words = set()
+        uncached_words = []
+        for all_data in library.values():
+            for file_data in all_data:
+                for word_item in file_data['words']:
+                    word = word_item.word_lower
+                    if word in seen_words:
+                        continue
+                    seen_words.add(word)
+
+                    # 布隆过滤器判定一定未缓存的单词，不需要加载或查询缓存
+                    if not cache.might_contain(word):
+                        result.definite_misses += 1
+                    elif cache.get(word):
+                        result.cached += 1
+                        continue
+
+                    word_item.deck_name = file_data['deck_name']
+                    uncached_words.append(word_item)
+
+        # 与已缓存单词拼写相近的单词（如 recieve）：标记出来，按需沿用已有的翻译
+        if uncached_words and get_near_match():
+            uncached_words = self._check_near_matches(uncached_words, result)
+
+        # 认领未缓存的单词：其他任务（如并行处理的另一集）正在翻译的单词不再放进批次
+        owner = make_owner(job_file)
+        leases = LeaseTable(lease_file_for(cache.cache_file), logger=self.logger)
+        uncached_words, pending_words = claim_words(leases, uncached_words, owner)
+        save_pending(pending_file_for(job.key, self.work_dir), owner, pending_words)
+
+        result.unique = len(seen_words)
+        result.new = len(uncached_words)
+        result.pending_elsewhere = len(pending_words)
+        self.logger.info(f"  ✓ 全局去重后：{result.unique} 个唯一单词")
+        self.logger.info(f"  ✓ 找到 {result.cached} 个已缓存的单词")
+        self.logger.info(f"  ✓ 需要翻译 {result.new} 个新单词")
+        if result.definite_misses:
+            self.logger.info(f"  ✓ 布隆过滤器直接判定 {result.definite_misses} 个单词未缓存（无需查询缓存）")
+        if pending_words:
+            self.logger.info(f"  ✓ {len(pending_words)} 个单词正由其他任务翻译，合并时自动取回")
+        if result.near_matches:
+            reused = sum(1 for near in result.near_matches if near.reused)
+            detail = f"，{reused} 个已沿用缓存的翻译" if reused else "，需确认后才会沿用缓存的翻译"
+            self.logger.info(f"  ⚠️  {len(result.near_matches)} 个单词与已缓存单词拼写相近{detail}")
+
+        # 已有翻译的例句直接填入，翻译时无需再翻译例句
+        memory = self.sentence_memory
+        if memory is not None:
+            for word_item in uncached_words:
+                word_item.sentence_translation = memory.get(word_item.sentence)
+                if word_item.sentence_translation:
+                    result.sentences_reused += 1
+            if result.sentences_reused:
+                self.logger.info(f"  ✓ 例句翻译记忆填入 {result.sentences_reused} 个例句翻译")
+
+        if not uncached_words and pending_words:
+            result.status = WAITING
+            result.waiting = leases.holders(item.word_lower for item in pending_words)
+            return result
+
+        if not uncached_words:
+            self.logger.info("[3/5] 所有单词都已缓存，无需翻译")
+            self.logger.info("[4/5] 填充翻译")
+            self._fill_translations(library)
+            self.logger.info("[5/5] 生成 Anki 文件")
+            result.output_files = self._generate(job, library)
+            result.status = DONE
+            return result
+
+        # 3. 分批写出待翻译的单词（同一例句的单词放进同一批）
+        #    上次第一步写出、仍未翻译的批次原样沿用，只有其余单词重新分批
+        batches, remaining = self._reusable_batches(job, uncached_words)
+        for words in plan_batches(remaining, self.batch_size):
+            batch_file = self._batch_file(job, [item.word_lower for item in words])
+            if batch_file.exists():
+                # 内容寻址：同一来源的同一组单词，批次文件已经写过
+                try:
+                    batches.append((batch_file, read_json(batch_file), True))
+                    continue
+                except ValueError:
+                    pass
+            batch_data = {
+                'job': str(job_file),
+                'owner': owner,
+                'batch_info': '',
+                'reply_format': REPLY_FORMAT,
+                **batch_to_json(words),
+            }
+            batches.append((batch_file, batch_data, False))
+
+        total_batches = len(batches)
+        result.reused_batches = sum(1 for _, _, reused in batches if reused)
+        self.logger.info(f"[3/5] {len(uncached_words)} 个新单词分成 {total_batches} 批"
+                         f"（每批最多 {self.batch_size} 个）")
+        if result.reused_batches:
+            self.logger.info(f"  ✓ 沿用 {result.reused_batches} 个上次写出、尚未翻译的批次文件")
+
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        for number, (batch_file, batch_data, reused) in enumerate(batches, 1):
+            batch_info = f"批次 {number}/{total_batches}"
+            if not reused or batch_data.get('batch_info') != batch_info:
+                batch_data['batch_info'] = batch_info
+                # 待翻译文件要交给 Claude Code 阅读，不压缩
+                write_json(batch_data, batch_file, compression=PLAIN)
+            words = [item['word_lower'] for item in batch_data['words']]
+            job.batch_files.append(str(batch_file))
+            result.batches.append(BatchInfo(str(batch_file), number, total_batches, len(words),
+                                            batch_id(job.source_id, words), reused))
+
+        job.work_dir = str(self.work_dir)
+        write_json(asdict(job), job_file)
+        result.status = TRANSLATE
+        return result
+
+    def _check_near_matches(self, words: list, result: PipelineResult) -> list:
+        """
+        标记与已缓存单词拼写相近的未缓存单词，需要沿用翻译的直接写入缓存
+
+        Args:
+            words: 未缓存的单词条目
+            result: 记录标记的单词（near_matches），沿用的单词计入 cached
+
+        Returns:
+            仍需翻译的单词条目
+        """
+        cache = self.cache
+        index = load_near_index(cache, logger=self.logger)
+        reuse = self.reuse_near_matches
+        memory = self.sentence_memory
+        remaining = []
+        for word_item in words:
+            matches = index.lookup(word_item.word_lower, limit=1)
+            entry = cache.get(matches[0][0]) if matches else None
+            if not entry:
+                remaining.append(word_item)
+                continue
+
+            match, distance = matches[0]
+            near = NearMatch(word_item.word_lower, match, distance, entry.get('translation', ''))
+            result.near_matches.append(near)
+            if reuse is True or (reuse and word_item.word_lower in reuse):
+                sentence_translation = memory.get(word_item.sentence) if memory is not None else ''
+                cache.add(word_item.word_lower, near.translation,
+                          word_item.sentence, sentence_translation)
+                near.reused = True
+                result.cached += 1
+            else:
+                remaining.append(word_item)
+
+        if any(near.reused for near in result.near_matches):
+            cache.flush()
+        return remaining
+
+    def _reusable_batches(self, job: Job, words: list) -> tuple[list, list]:
+        """
+        找出上次第一步写出、单词全部仍待本任务翻译的批次
+
+        已保存翻译的单词在缓存中，不再出现在 words 里，所以已完成的批次不会被沿用；
+        部分完成的批次中剩余的单词和新增的单词一起重新分批。
+
+        Args:
+            job: 当前任务
+            words: 本次需要翻译的单词条目
+
+        Returns:
+            (沿用的批次 [(批次文件, 批次数据, True)], 需要重新分批的单词条目)
+        """
+        previous = self._read_job(job)
+        if previous is None:
+            return [], words
+
+        remaining = {item.word_lower for item in words}
+        reused = []
+        for batch_file in previous.batch_files:
+            try:
+                batch_data = read_json(Path(batch_file))
+            except (FileNotFoundError, ValueError):
+                continue
+            batch = [item['word_lower'] for item in batch_data.get('words', [])]
+            if batch and all(word in remaining for word in batch):
+                remaining.difference_update(batch)
+                reused.append((Path(batch_file), batch_data, True))
+        return reused, [item for item in words if item.word_lower in remaining]
+
+    # ------------------------------------------------------------------
+    # 第二步：保存翻译、合并批次、生成 Anki 文件
+    # ------------------------------------------------------------------
+
+    def load_job(self, batch_file: str) -> Job:
+        """
+        读取批次文件所属的任务
+
+        Raises:
+            ValueError: 批次文件不是由 Pipeline 生成的（缺少任务信息）
+        """
+        batch_data = read_json(Path(batch_file))
+        if 'job' not in batch_data:
+            raise ValueError(f"批次文件缺少任务信息，请重新运行第一步：{batch_file}")
+        return Job(**read_json(Path(batch_data['job'])))
+
+    def save_translations(self, batch_file: str, translation_file: str,
+                          output_dir: str = None, output_file: str = None) -> PipelineResult:
+        """
+        保存一批翻译到缓存，所有批次完成后生成 Anki 文件
+
+        Args:
+            batch_file: 第一步写出的批次文件
+            translation_file: 翻译后的 JSON 文件
+            output_dir: 覆盖第一步指定的输出目录
+            output_file: 覆盖第一步指定的输出文件（单个牌组时有效）
+
+        Returns:
+            处理结果
+        """
+        batch_data = read_json(Path(batch_file))
+        job = self.load_job(batch_file)
+        if output_dir:
+            job.output_dir = str(output_dir)
+        if output_file:
+            job.output_file = str(output_file)
+
+        translations, sentence_translations = parse_translations(read_json(Path(translation_file)))
+
+        # 4. 保存翻译到缓存（只保存本批次的单词）
+        self.logger.info("[4/5] 保存翻译到缓存")
+        cache = self.cache
+        memory = self.sentence_memory
+        words = {item.word_lower: item for item in batch_words(batch_data)}
+        sentence_ids = {item['word_lower']: item.get('sentence_id') for item in batch_data['words']}
+        translated_words = []
+        for trans in translations:
+            word_item = words.get(normalize_word(trans['word']))
+            if word_item is None:
+                continue
+            # 例句翻译按 sentence_id 分发给同一例句的每个单词；都没有时使用预填的或记忆中的翻译
+            sentence_translation = (trans.get('sentence_translation')
+                                    or sentence_translations.get(sentence_ids[word_item.word_lower])
+                                    or word_item.sentence_translation)
+            if memory is not None:
+                sentence_translation = sentence_translation or memory.get(word_item.sentence)
+                memory.add(word_item.sentence, sentence_translation)
+            cache.add(
+                word=trans['word'],
+                translation=trans['translation'],
+                sentence=trans.get('sentence', word_item.sentence),
+                sentence_translation=sentence_translation
+            )
+            translated_words.append(word_item.word_lower)
+
+        cache.flush()  # 分层模式下写回磁盘层，其他进程合并批次时才能读到
+        if memory is not None:
+            memory.save()
+        self.logger.info(f"  ✓ 已保存 {len(translated_words)} 个翻译到缓存")
+        ignored = len(translations) - len(translated_words)
+        if ignored:
+            self.logger.warning(f"  ⚠️  翻译文件中有 {ignored} 个单词不在本批次中，已忽略")
+
+        # 已翻译的单词释放租约
+        LeaseTable(lease_file_for(cache.cache_file), logger=self.logger).release(translated_words)
+        self.logger.info(f"  当前批次：{batch_data.get('batch_info', '')}")
+
+        result = self.finish(job)
+        result.saved = len(translated_words)
+        return result
+
+    def finish(self, job: Job) -> PipelineResult:
+        """
+        检查任务的所有批次，全部翻译完成后生成 Anki 文件（只重新提取有变化的源文件）
+
+        Returns:
+            处理结果（status 为 INCOMPLETE、WAITING 或 DONE）
+        """
+        cache = self.cache
+        work_dir = Path(job.work_dir) if job.work_dir else self.work_dir
+        result = PipelineResult(status=INCOMPLETE, name=job.name,
+                                job_file=str(work_dir / f"{job.key}_job.json"))
+
+        for number, batch_file in enumerate(job.batch_files, 1):
+            try:
+                words = read_json(Path(batch_file))['words']
+            except FileNotFoundError:
+                self.logger.warning(f"  ⚠️  批次文件不存在，跳过检查：{batch_file}")
+                continue
+            if not all(cache.get(item['word_lower']) for item in words):
+                result.untranslated_batches.append(number)
+
+        if result.untranslated_batches:
+            return result
+
+        # 其他任务翻译的单词必须已保存到缓存
+        waiting = [item.word_lower for item in load_pending(pending_file_for(job.key, work_dir))
+                   if not cache.get(item.word_lower)]
+        if waiting:
+            holders = LeaseTable(lease_file_for(cache.cache_file), logger=self.logger).holders(waiting)
+            result.status = WAITING
+            result.waiting = {word: holders.get(word, '') for word in waiting}
+            return result
+
+        self.logger.info(f"  ✓ 所有 {len(job.batch_files)} 个批次都已完成翻译")
+        self.logger.info("[5/5] 生成 Anki 文件")
+        # 使用第一步保存的提取结果，只重新提取有变化的文件
+        library = self._extract_incremental(job, result)
+        self.logger.info(f"  ✓ {result.files_reused} 个文件使用第一步的提取结果，"
+                         f"重新提取 {result.files_extracted} 个有变化的文件")
+        result.total = sum(data['word_count'] for all_data in library.values() for data in all_data)
+        self._fill_translations(library)
+        result.output_files = self._generate(job, library)
+        result.status = DONE
+        return result
+
+    def _fill_translations(self, library: dict) -> None:
+        """为所有单词填充缓存的翻译（每个唯一单词只查询一次）"""
+        memory = self.sentence_memory
+        translations = {}
+        for all_data in library.values():
+            for file_data in all_data:
+                for word_item in file_data['words']:
+                    word = word_item.word_lower
+                    if word not in translations:
+                        translations[word] = self.cache.get(word)
+                    if translations[word]:
+                        sentence_translation = memory.get(word_item.sentence) if memory else ''
+                        _apply_translation(word_item, translations[word], sentence_translation)
+
+    def _generate(self, job: Job, library: dict) -> list[str]:
+        """
+        生成 Anki 文件：单个文件或目录生成一个牌组；剧集库为每个目录生成一个，可选合并文件
+
+        Returns:
+            生成的文件路径列表
+        """
+        output_dir = Path(job.output_dir) if job.output_dir else get_output_dir()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_files = []
+
+        if job.kind != 'library':
+            all_data = library[job.sources[0]]
+            output_file = job.output_file or str(output_dir / f"{job.name}.txt")
+            cards = write_anki_tsv(all_data, output_file, deck_name=job.name)
+            self.logger.info(f"  ✓ 已生成：{output_file}（{cards} 张卡片）")
+            return [output_file]
+
+        names = deck_names(job.sources)
+        for directory, all_data in library.items():
+            if not all_data:
+                continue
+            output_file = str(output_dir / f"{names[directory]}.txt")
+            cards = write_anki_tsv(all_data, output_file, deck_name=names[directory])
+            self.logger.info(f"  ✓ 已生成：{output_file}（{cards} 张卡片）")
+            output_files.append(output_file)
+
+        if job.combined:
+            combined = [file_data for all_data in library.values() for file_data in all_data]
+            if combined:
+                output_file = str(output_dir / f"{job.name}.txt")
+                cards = write_anki_tsv(combined, output_file, deck_name=job.name)
+                self.logger.info(f"  ✓ 已生成：{output_file}（{cards} 张卡片）")
+                output_files.append(output_file)
+
+        return output_files
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+流水线命令行脚本的公共部分
+
+process_file.py、process_directory.py、process_library.py 只负责解析参数，
+处理交给 pipeline.Pipeline，结果由这里统一展示：
+
+- 默认：进度信息和操作提示输出到标准输出（与原来的交互式输出一致）
+- --json：标准输出只有 JSON 结果（每个结果一行），进度和警告输出到标准错误
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Callable
+
+from pipeline import (BATCH_SIZE, DONE, INCOMPLETE, TRANSLATE, WAITING, BatchInfo,
+                      Pipeline, PipelineResult)
+from word_item import normalize_word
+
+
+def add_pipeline_arguments(parser: argparse.ArgumentParser) -> None:
+    """添加流水线公共参数（输出格式、工作目录、拼写相近单词的处理）"""
+    parser.add_argument('--json', action='store_true',
+                        help='以 JSON 输出处理结果（每个结果一行），进度信息输出到标准错误')
+    parser.add_argument('--work-dir', default=None,
+                        help='批次文件等中间文件的目录（默认读取配置 work_dir，否则为 /tmp）')
+    parser.add_argument('--reuse-near-matches', nargs='?', const=True, default=None, metavar='WORDS',
+                        help='与已缓存单词拼写相近的单词（如 recieve）直接沿用已缓存单词的翻译，不送去翻译；'
+                             '可用逗号分隔只指定其中一部分单词')
+
+
+def make_pipeline(args: argparse.Namespace, jobs: int = None) -> Pipeline:
+    """
+    按命令行参数创建流水线，并配置进度日志的输出位置
+
+    Args:
+        args: 包含 add_pipeline_arguments 参数的解析结果
+        jobs: 并行提取的进程数
+    """
+    logger = logging.getLogger('pipeline')
+    logger.handlers.clear()
+    logger.propagate = False
+    handler = logging.StreamHandler(sys.stderr if args.json else sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING if args.json else logging.INFO)
+    reuse = args.reuse_near_matches
+    if isinstance(reuse, str):
+        reuse = {normalize_word(word) for word in reuse.split(',') if word.strip()}
+    return Pipeline(work_dir=args.work_dir, logger=logger, jobs=jobs, reuse_near_matches=reuse)
+
+
+def emit_json(result: PipelineResult) -> None:
+    """输出一行 JSON 结果"""
+    print(json.dumps(result.to_dict(), ensure_ascii=False))
+
+
+def _print_waiting(result: PipelineResult) -> None:
+    print(f"\n  ⚠️  还有 {len(result.waiting)} 个单词正由其他任务翻译：{', '.join(result.waiting)}")
+    for holder in sorted({holder for holder in result.waiting.values() if holder}):
+        print(f"    - {holder}")
+
+
+def _print_near_matches(result: PipelineResult) -> None:
+    flagged = [near for near in result.near_matches if not near.reused]
+    reused = [near for near in result.near_matches if near.reused]
+    if reused:
+        print(f"\n  ✓ {len(reused)} 个单词沿用了拼写相近的已缓存单词的翻译：")
+        for near in reused:
+            print(f"    {near.word} → {near.match}  {near.translation}")
+    if flagged:
+        print(f"\n  ⚠️  {len(flagged)} 个单词与已缓存单词拼写相近（可能是拼写或 OCR 错误），仍会送去翻译：")
+        for near in flagged:
+            print(f"    {near.word} → {near.match}（距离 {near.distance}）  {near.translation}")
+        words = ','.join(near.word for near in flagged)
+        print("  💡 确认是拼写错误时，重新运行第一步并加上 --reuse-near-matches 沿用已缓存的翻译"
+              f"（或 --reuse-near-matches {words} 只沿用其中一部分）")
+
+
+def report_prepare(result: PipelineResult, save_command: Callable[[BatchInfo], str]) -> None:
+    """
+    展示第一步的结果
+
+    Args:
+        result: Pipeline.prepare_* 的返回值
+        save_command: 生成每个批次第二步命令的函数
+    """
+    if result.status == WAITING:
+        print("\n[3/5] 剩余单词都在其他任务中翻译")
+        _print_waiting(result)
+        print("  请等待其他任务保存翻译后，重新运行第一步生成 Anki 文件")
+        _print_near_matches(result)
+
+    elif result.status == TRANSLATE:
+        print("\n需要翻译的单词列表：")
+        print("─" * 60)
+        for batch in result.batches:
+            reused = "（沿用上次的批次文件）" if batch.reused else ""
+            print(f"\n批次 {batch.number}/{batch.total}：{batch.words} 个单词 -> {batch.path}{reused}")
+        _print_near_matches(result)
+
+        print("\n" + "─" * 60)
+        print("\n📝 使用 Claude Code 翻译单词：")
+        print("\n对于每个批次文件，请执行以下步骤：")
+        print("\n1. 在 Claude Code 中输入：")
+        print("   \"请帮我翻译这个文件中的单词，按照文件中提供的格式返回翻译结果\"")
+        print("\n2. 将翻译结果保存为 JSON 文件（例如：translation_batch_1.json）")
+        print("\n3. 运行以下命令保存翻译：")
+        for batch in result.batches:
+            print(f"   {save_command(batch)}")
+
+        print("\n" + "─" * 60)
+        print("\n翻译格式示例（需列出单词的所有常用词义，与词典一致；例句按 id 只翻译一次）：")
+        print('{')
+        print('  "words": [')
+        print('    {"word": "example", "translation": "n. 例子；范例；榜样 v. 作为...的例子"}')
+        print('  ],')
+        print('  "sentences": [')
+        print('    {"id": 1, "sentence_translation": "这是一个例子。"}')
+        print('  ]')
+        print('}')
+
+        print("\n💡 提示：")
+        print(f"  - 每批最多 {BATCH_SIZE} 个单词，确保不超过 Claude Code 的上下文限制")
+        print("  - 翻译完一批后再处理下一批")
+        if result.reused_batches:
+            print(f"  - {result.reused_batches} 个批次沿用上次第一步写出的文件，已有的翻译结果可以直接保存")
+        if result.sentences_reused:
+            print(f"  - {result.sentences_reused} 个单词的 sentence_translation 已由例句翻译记忆填写，"
+                  "可直接沿用，无需重新翻译例句")
+        print("  - 所有批次处理完成后，会自动合并生成最终的 Anki 文件")
+
+    elif result.status == DONE:
+        print("\n完成！")
+        print(f"  总单词数：{result.total}")
+        print(f"  唯一单词：{result.unique}")
+        print(f"  使用缓存：{result.cached}")
+        print("  新翻译：0")
+        _print_near_matches(result)
+
+
+def report_save(result: PipelineResult) -> None:
+    """展示第二步（保存翻译）的结果"""
+    if result.status == INCOMPLETE:
+        batches = ', '.join(str(number) for number in result.untranslated_batches)
+        print(f"\n  ⚠️  还有 {len(result.untranslated_batches)} 个批次未完成翻译：批次 {batches}")
+        print("\n  请继续翻译剩余批次，然后运行对应的保存命令")
+
+    elif result.status == WAITING:
+        _print_waiting(result)
+        print("\n  其他任务保存翻译后，重新运行本批次的保存命令即可生成 Anki 文件")
+
+    elif result.status == DONE:
+        print("\n完成！所有批次已合并并生成 Anki 文件")
+        print(f"  总单词数：{result.total}")
+        work_dir = Path(result.job_file).parent
+        print(f"\n💡 提示：临时批次文件位于 {work_dir}/{result.name}_to_translate*.json")
+        print("  可以手动删除这些临时文件")
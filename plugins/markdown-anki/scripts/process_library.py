@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+多目录（剧集库）处理集成脚本
+
+一次处理多个目录（例如十季剧集），包括：
+1. 并行提取所有目录中文件的生词
+2. 只加载一次缓存，全局去重后查询
+3. 生成统一的待翻译队列（每批最多30个）
+4. 使用 Claude Code 翻译每批单词
+5. 保存翻译到缓存
+6. 为每个目录生成一个 Anki 文件，可选生成合并文件
+
+同一个单词即使出现在多个目录中也只翻译一次，工作量只与唯一单词数相关。
+
+处理逻辑在 pipeline.Pipeline 中，本脚本只解析参数并展示结果。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from batch_extract import add_discovery_arguments, discovery_options
+from pipeline import Pipeline, PipelineResult
+from pipeline_cli import add_pipeline_arguments, emit_json, make_pipeline, report_prepare, report_save
+
+
+def read_manifest(manifest_file: str) -> list[str]:
+    """
+    读取目录清单文件：每行一个目录，# 开头为注释，相对路径相对于清单文件所在目录
+
+    Args:
+        manifest_file: 清单文件路径
+
+    Returns:
+        目录路径列表
+    """
+    manifest = Path(manifest_file)
+    directories = []
+    for line in manifest.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        path = Path(line).expanduser()
+        if not path.is_absolute():
+            path = manifest.parent / path
+        directories.append(str(path))
+    return directories
+
+
+def process_library(directories: list[str], name: str = 'library', discovery: dict = None,
+                    combined: bool = False, output_dir: str = None,
+                    pipeline: Pipeline = None) -> PipelineResult:
+    """
+    处理多个目录的 Markdown 文件并在控制台展示结果
+
+    Args:
+        directories: 目录列表
+        name: 剧集库名称（用于批次文件和合并文件命名）
+        discovery: 文件发现参数
+        combined: 是否额外生成合并所有目录的 Anki 文件
+        output_dir: Anki 文件输出目录，默认读取配置
+        pipeline: 使用的流水线，默认新建
+
+    Returns:
+        处理结果
+    """
+    pipeline = pipeline or Pipeline()
+    result = pipeline.prepare_library(directories, name, discovery, combined, output_dir)
+    report_prepare(result, lambda batch: (
+        f"python3 scripts/process_library.py {batch.path} translation_batch_{batch.number}.json"))
+    return result
+
+
+def save_and_generate(temp_file: str, translation_file: str,
+                      pipeline: Pipeline = None) -> PipelineResult:
+    """
+    保存一批翻译，所有批次完成后为每个目录生成 Anki 文件
+
+    Args:
+        temp_file: 待翻译单词的批次文件
+        translation_file: 翻译后的 JSON 文件
+        pipeline: 使用的流水线，默认新建
+
+    Returns:
+        处理结果
+    """
+    pipeline = pipeline or Pipeline()
+    result = pipeline.save_translations(temp_file, translation_file)
+    report_save(result)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='多目录（剧集库）处理：一次加载缓存、全局去重、统一翻译队列，'
+                    '为每个目录生成 Anki 文件',
+        epilog='第二步：python3 process_library.py <batch_file> <translation.json>',
+    )
+    parser.add_argument('paths', nargs='*',
+                        help='第一步：目录列表；第二步：批次文件和翻译 JSON 文件')
+    parser.add_argument('--manifest', help='目录清单文件（每行一个目录）')
+    parser.add_argument('--name', default=None,
+                        help='剧集库名称，默认为清单文件名或 library')
+    parser.add_argument('--combined', action='store_true',
+                        help='额外生成合并所有目录的 Anki 文件')
+    parser.add_argument('--output-dir', default=None, help='Anki 文件输出目录')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='并行提取的进程数（默认 CPU 核数）')
+    add_discovery_arguments(parser)
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    pipeline = make_pipeline(args, args.jobs)
+
+    paths = args.paths
+    if len(paths) == 2 and Path(paths[0]).is_file() and Path(paths[1]).is_file():
+        # 第二步：保存翻译并生成
+        if args.json:
+            emit_json(pipeline.save_translations(paths[0], paths[1]))
+        else:
+            save_and_generate(paths[0], paths[1], pipeline)
+        return
+
+    directories = list(paths)
+    if args.manifest:
+        directories.extend(read_manifest(args.manifest))
+
+    if not directories:
+        parser.print_usage()
+        print("Error: 请指定目录或 --manifest 清单文件")
+        sys.exit(1)
+
+    for directory in directories:
+        if not Path(directory).is_dir():
+            print(f"Error: Directory not found: {directory}")
+            sys.exit(1)
+
+    name = args.name or (Path(args.manifest).stem if args.manifest else 'library')
+    if args.json:
+        emit_json(pipeline.prepare_library(directories, name, discovery_options(args),
+                                           args.combined, args.output_dir))
+    else:
+        process_library(directories, name, discovery_options(args), args.combined,
+                        args.output_dir, pipeline)
+
+
+if __name__ == '__main__':
+    main()
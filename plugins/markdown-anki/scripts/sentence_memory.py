@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+例句翻译记忆
+
+同一句中标记了多个生词时，每个生词都带着同一个例句；剧集中反复出现的台词也会
+在不同集中再次出现。例句翻译记忆（sentence_memory.json，与缓存放在同一目录）
+以规范化例句的哈希为键保存例句翻译：
+
+- 生成批次前，已有翻译的例句直接填入 sentence_translation，无需再次翻译
+- 保存翻译时记录新的例句翻译；同一例句的其他生词从记忆中取得例句翻译
+- 生成 Anki 文件时优先使用卡片例句本身的翻译
+
+规范化：Unicode NFKC、统一弯引号、合并空白、忽略大小写。
+保存时持有文件锁并与磁盘上的记录合并，多个任务同时保存不会互相覆盖。
+"""
+
+import fcntl
+import logging
+import re
+import sys
+import unicodedata
+from hashlib import blake2b
+from pathlib import Path
+from typing import Optional
+
+from cache_io import iter_json_object, read_json, write_json
+from config import get_sentence_memory
+from translation_cache import open_cache
+
+_QUOTES = str.maketrans({'‘': "'", '’': "'", '“': '"', '”': '"'})
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sentence(sentence: str) -> str:
+    """规范化例句（NFKC、统一引号、合并空白、忽略大小写）"""
+    sentence = unicodedata.normalize('NFKC', sentence).translate(_QUOTES)
+    return _WHITESPACE.sub(' ', sentence).strip().casefold()
+
+
+def sentence_key(sentence: str) -> str:
+    """规范化例句的哈希（32 位十六进制）"""
+    return blake2b(normalize_sentence(sentence).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def memory_path_for(cache_file: Path) -> Path:
+    """缓存文件对应的例句翻译记忆路径（同一目录）"""
+    return Path(cache_file).with_name('sentence_memory.json')
+
+
+class SentenceMemory:
+    """例句翻译记忆"""
+
+    def __init__(self, memory_file: str = None, logger: logging.Logger = None):
+        """
+        初始化例句翻译记忆（第一次查询时才读取文件）
+
+        Args:
+            memory_file: 记忆文件路径，默认为 skill 目录下的 sentence_memory.json
+            logger: 警告信息的日志记录器，默认为本模块的 logger
+        """
+        if memory_file is None:
+            memory_file = Path(__file__).parent.parent / 'sentence_memory.json'
+
+        self.memory_file = Path(memory_file)
+        self.lock_file = self.memory_file.with_name(self.memory_file.name + '.lock')
+        self.logger = logger or logging.getLogger(__name__)
+        self._entries: Optional[dict] = None
+        self._new: dict = {}
+        self.hits = 0
+
+    def _read(self) -> dict:
+        if not self.memory_file.exists():
+            return {}
+        try:
+            return read_json(self.memory_file)
+        except (ValueError, OSError) as e:
+            self.logger.warning(f"Warning: Failed to load sentence memory: {e}")
+            return {}
+
+    @property
+    def entries(self) -> dict:
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def get(self, sentence: str) -> str:
+        """
+        查询例句翻译
+
+        Returns:
+            例句翻译，没有记录时返回空字符串
+        """
+        if not sentence:
+            return ''
+        entry = self.entries.get(sentence_key(sentence))
+        if entry is None:
+            return ''
+        self.hits += 1
+        return entry['translation']
+
+    def add(self, sentence: str, translation: str) -> None:
+        """记录例句翻译（调用 save 后写入文件）"""
+        if not sentence or not translation:
+            return
+        entry = {'sentence': sentence, 'translation': translation}
+        key = sentence_key(sentence)
+        self.entries[key] = entry
+        self._new[key] = entry
+
+    def save(self) -> int:
+        """
+        持有文件锁，将新记录合并到磁盘上的记忆文件
+
+        Returns:
+            写入的新记录数
+        """
+        if not self._new:
+            return 0
+        self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # 其他任务可能已写入新记录，合并后再写回
+                entries = self._read()
+                entries.update(self._new)
+                write_json(entries, self.memory_file)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        self._entries = entries
+        count = len(self._new)
+        self._new = {}
+        return count
+
+    def seed_from_cache(self, cache_file: Path) -> int:
+        """
+        从翻译缓存的例句中导入例句翻译（流式读取 translation_cache.json）
+
+        Returns:
+            新增的记录数
+        """
+        count = 0
+        for _, entry in iter_json_object(cache_file):
+            for example in entry.get('sentence_examples', []):
+                sentence = example.get('sentence', '')
+                translation = example.get('sentence_translation', '')
+                if sentence and translation and sentence_key(sentence) not in self.entries:
+                    self.add(sentence, translation)
+                    count += 1
+        self.save()
+        return count
+
+
+def open_sentence_memory(cache, logger: logging.Logger = None) -> Optional[SentenceMemory]:
+    """
+    打开与翻译缓存同目录的例句翻译记忆
+
+    Args:
+        cache: 翻译缓存（TranslationCache 或 TieredTranslationCache）
+        logger: 警告信息的日志记录器，默认为本模块的 logger
+
+    Returns:
+        SentenceMemory；配置 sentence_memory: false 时返回 None
+    """
+    if not get_sentence_memory():
+        return None
+    return SentenceMemory(memory_path_for(cache.cache_file), logger=logger)
+
+
+def main():
+    """命令行工具：查看、查询和导入例句翻译记忆"""
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  python sentence_memory.py stats             # 查看记忆统计")
+        print("  python sentence_memory.py get <sentence>    # 查询例句翻译")
+        print("  python sentence_memory.py seed              # 从翻译缓存的例句导入")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    cache = open_cache()
+    memory = SentenceMemory(memory_path_for(cache.cache_file))
+    command = sys.argv[1]
+
+    if command == 'stats':
+        print(f"Total sentences: {len(memory.entries)}")
+        print(f"Memory file: {memory.memory_file}")
+
+    elif command == 'get':
+        if len(sys.argv) < 3:
+            print("Error: sentence required")
+            sys.exit(1)
+        translation = memory.get(sys.argv[2])
+        print(translation if translation else "Sentence not found in memory")
+
+    elif command == 'seed':
+        if not Path(cache.cache_file).exists():
+            print(f"Error: cache file not found: {cache.cache_file}")
+            sys.exit(1)
+        count = memory.seed_from_cache(cache.cache_file)
+        print(f"Imported {count} sentences from {cache.cache_file}")
+
+    else:
+        print(f"Unknown command: {command}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+分层翻译缓存
+
+TranslationCache 把整个词表放在一个字典里，内存占用随词表增长。分层模式下：
+
+    内存层  固定容量的 LRU，只保留最近使用的单词
+    磁盘层  SQLite 数据库（translation_cache.db，与 JSON 放在同一目录），按单词点查
+
+- 新增或更新的单词先写入内存层并标记为脏，被淘汰或 flush() 时写回磁盘层
+- 进程退出时自动 flush()
+- 首次打开时把 translation_cache.json 流式导入数据库；JSON 之后被修改
+  （如其他任务在内存模式下添加了单词）时，下次打开自动合并新增的条目
+- export_json() 把数据库流式导出为 translation_cache.json，供内存模式使用
+- 布隆过滤器（translation_cache.db.bloom）判定一定未缓存的单词，不查询数据库；
+  写回时与其他任务写入的过滤器合并，数据库中的版本标记不一致时从数据库重建
+
+在 config.json 中设置 "cache_mode": "tiered" 启用，"cache_memory_entries" 控制内存层容量。
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from bloom_filter import BloomFilter, load_fresh_bloom
+from cache_io import iter_json_object, write_json_object
+from config import get_cache_bloom, get_cache_bloom_fp_rate
+from translation_cache import merge_entry
+from word_item import normalize_word
+
+# 内存层默认容量（单词数）
+DEFAULT_MEMORY_ENTRIES = 10000
+
+
+def store_path_for(cache_file: Path) -> Path:
+    """返回缓存 JSON 对应的磁盘层数据库路径"""
+    return Path(cache_file).with_suffix('.db')
+
+
+def _merge_entries(stored: dict, incoming: dict) -> dict:
+    """合并同一单词的两个条目：使用 incoming 的翻译，例句取并集"""
+    entry = merge_entry(stored, incoming.get('translation') or stored.get('translation', ''))
+    for example in incoming.get('sentence_examples', []):
+        merge_entry(entry, entry['translation'],
+                    example.get('sentence', ''), example.get('sentence_translation', ''))
+    return entry
+
+
+class TieredTranslationCache:
+    """内存 LRU + 磁盘数据库的翻译缓存，接口与 TranslationCache 相同"""
+
+    def __init__(self, cache_file: str = None, memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 store_file: str = None, use_bloom: bool = None, logger: logging.Logger = None):
+        """
+        初始化分层缓存
+
+        Args:
+            cache_file: 缓存 JSON 路径，默认为 skill 目录下的 translation_cache.json
+                        （用于首次导入和导出，租约表等也以它定位）
+            memory_entries: 内存层最多保留的单词数
+            store_file: 磁盘层数据库路径，默认为 JSON 同目录下的 translation_cache.db
+            use_bloom: 是否使用布隆过滤器。默认读取配置 cache_bloom
+            logger: 导入进度和警告信息的日志记录器，默认为本模块的 logger
+        """
+        if cache_file is None:
+            cache_file = Path(__file__).parent.parent / 'translation_cache.json'
+
+        self.cache_file = Path(cache_file)
+        self.logger = logger or logging.getLogger(__name__)
+        self.store_file = Path(store_file) if store_file else store_path_for(self.cache_file)
+        self.memory_entries = max(1, memory_entries)
+
+        # 内存层：单词 -> 条目，按最近使用排序；dirty 记录尚未写回的单词，
+        # new_words 记录其中数据库里还没有的单词（写回时需要同步布隆过滤器）
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._new_words: set[str] = set()
+
+        self.hits = 0             # 内存层命中
+        self.store_hits = 0       # 内存层未命中，磁盘层命中
+        self.misses = 0           # 两层都没有
+        self.bloom_negatives = 0  # 其中由布隆过滤器直接判定的次数
+
+        self.bloom_file = self.store_file.with_name(self.store_file.name + '.bloom')
+        self.use_bloom = get_cache_bloom() if use_bloom is None else use_bloom
+        self.bloom_fp_rate = get_cache_bloom_fp_rate()
+        self._bloom: Optional[BloomFilter] = None
+
+        self.store_file.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.store_file, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS entries (word TEXT PRIMARY KEY, data TEXT NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._db.commit()
+        self._import_json_if_changed()
+        if self.use_bloom:
+            self._open_bloom()
+
+        atexit.register(self.close)
+
+    # ---------- 磁盘层 ----------
+
+    def _source_stamp(self) -> str:
+        """JSON 文件的 mtime 和大小，用于判断是否需要重新导入"""
+        try:
+            stat = self.cache_file.stat()
+        except FileNotFoundError:
+            return ''
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _import_json_if_changed(self) -> None:
+        """JSON 自上次导入或导出后有变化时，流式合并到数据库"""
+        stamp = self._source_stamp()
+        if not stamp:
+            return
+        if self._get_meta('source_stamp') == stamp:
+            return
+
+        try:
+            count = 0
+            for word, entry in iter_json_object(self.cache_file):
+                stored = self._read(word)
+                if stored is not None:
+                    entry = _merge_entries(stored, entry)
+                self._write(word, entry)
+                count += 1
+        except (ValueError, OSError) as e:
+            self._db.rollback()
+            self.logger.warning(f"Warning: Failed to import cache file: {e}")
+            return
+
+        self._set_meta('source_stamp', stamp)
+        self._set_meta('bloom_token', '')  # 数据库已变化，过滤器需要重建
+        self._db.commit()
+        self.logger.info(f"  ✓ 已将 {count} 个单词从 {self.cache_file.name} 导入 {self.store_file.name}")
+
+    def _get_meta(self, key: str) -> str:
+        row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else ''
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def _read(self, word: str) -> Optional[dict]:
+        row = self._db.execute('SELECT data FROM entries WHERE word = ?', (word,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, word: str, entry: dict) -> None:
+        self._db.execute('INSERT OR REPLACE INTO entries (word, data) VALUES (?, ?)',
+                         (word, json.dumps(entry, ensure_ascii=False)))
+
+    def _write_back(self, items: list[tuple[str, dict]]) -> None:
+        """在一个写事务中写回条目；有新单词时同步布隆过滤器"""
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            for word, entry in items:
+                self._write(word, entry)
+            new_words = self._new_words.intersection(word for word, _ in items)
+            if new_words and self._bloom is not None:
+                self._sync_bloom()
+            self._new_words -= new_words
+            self._db.commit()
+        except BaseException:
+            self._db.rollback()
+            raise
+
+    def _iter_store(self) -> Iterator[tuple[str, dict]]:
+        """按单词顺序遍历磁盘层（逐行读取，不整体加载）"""
+        for word, data in self._db.execute('SELECT word, data FROM entries ORDER BY word'):
+            yield word, json.loads(data)
+
+    # ---------- 布隆过滤器 ----------
+
+    def _open_bloom(self) -> None:
+        """读取与数据库版本标记一致的过滤器，没有时从数据库重建"""
+        self._bloom = load_fresh_bloom(self.bloom_file, self._get_meta('bloom_token'))
+        if self._bloom is None:
+            self._rebuild_bloom()
+            self._save_bloom()
+            self._db.commit()
+
+    def _rebuild_bloom(self) -> None:
+        """按数据库中的单词重建过滤器（容量为单词数的两倍），并加入尚未写回的新单词"""
+        (count,) = self._db.execute('SELECT COUNT(*) FROM entries').fetchone()
+        words = (row[0] for row in self._db.execute('SELECT word FROM entries'))
+        self._bloom = BloomFilter.build(words, count + len(self._new_words), self.bloom_fp_rate)
+        for word in self._new_words:
+            self._bloom.add(word)
+
+    def _save_bloom(self) -> None:
+        """用新的版本标记保存过滤器，并记录到数据库（调用方负责提交）"""
+        if self._bloom.overloaded:
+            self._rebuild_bloom()
+        token = os.urandom(8).hex()
+        self._bloom.save(self.bloom_file, token)
+        self._set_meta('bloom_token', token)
+
+    def _sync_bloom(self) -> None:
+        """写事务中调用：合并其他任务保存的过滤器后保存"""
+        current = self._get_meta('bloom_token')
+        if current != self._bloom.stamp:
+            # 打开后其他任务写入过新单词：合并它们的过滤器，无法合并时从数据库重建
+            other = load_fresh_bloom(self.bloom_file, current)
+            if other is None or not self._bloom.union(other):
+                self._rebuild_bloom()
+        self._save_bloom()
+
+    def might_contain(self, word: str) -> bool:
+        """
+        单词是否可能已缓存（不查询数据库）
+
+        Returns:
+            False 表示一定未缓存；True 表示可能已缓存（没有布隆过滤器时总是 True）
+        """
+        word_lower = normalize_word(word)
+        if word_lower in self._memory:
+            return True
+        return self._bloom is None or self._bloom.might_contain(word_lower)
+
+    # ---------- 内存层 ----------
+
+    def _remember(self, word: str, entry: dict) -> None:
+        """放入内存层，超出容量时淘汰最久未使用的单词（脏条目写回磁盘层）"""
+        self._memory[word] = entry
+        self._memory.move_to_end(word)
+        if len(self._memory) <= self.memory_entries:
+            return
+
+        # 一次淘汰十分之一，合并写回（和过滤器同步）的次数
+        target = self.memory_entries - self.memory_entries // 10
+        evicted = []
+        while len(self._memory) > target:
+            old_word, old_entry = self._memory.popitem(last=False)
+            if old_word in self._dirty:
+                self._dirty.discard(old_word)
+                evicted.append((old_word, old_entry))
+        if evicted:
+            self._write_back(evicted)
+
+    def flush(self) -> None:
+        """将内存层中所有修改写回磁盘层"""
+        if not self._dirty or self._db is None:
+            return
+        self._write_back([(word, self._memory[word]) for word in self._dirty])
+        self._dirty.clear()
+
+    def close(self) -> None:
+        """写回修改并关闭数据库"""
+        if self._db is None:
+            return
+        self.flush()
+        self._db.close()
+        self._db = None
+        atexit.unregister(self.close)
+
+    # ---------- 与 TranslationCache 相同的接口 ----------
+
+    def get(self, word: str) -> Optional[dict]:
+        """
+        查询单词翻译（先查内存层，再查磁盘层）
+
+        Args:
+            word: 单词
+
+        Returns:
+            翻译信息字典，如果不存在则返回 None
+        """
+        word_lower = normalize_word(word)
+        entry = self._memory.get(word_lower)
+        if entry is not None:
+            self._memory.move_to_end(word_lower)
+            self.hits += 1
+            return entry
+
+        if self._bloom is not None and not self._bloom.might_contain(word_lower):
+            self.misses += 1
+            self.bloom_negatives += 1
+            return None
+
+        entry = self._read(word_lower)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.store_hits += 1
+        self._remember(word_lower, entry)
+        return entry
+
+    def add(self, word: str, translation: str,
+            sentence: str = '', sentence_translation: str = '') -> None:
+        """
+        添加或更新单词翻译（写入内存层，淘汰或 flush 时写回磁盘层）
+
+        Args:
+            word: 单词
+            translation: 中文翻译（包含词性）
+            sentence: 例句（可选）
+            sentence_translation: 例句翻译（可选）
+        """
+        word_lower = normalize_word(word)
+        entry = self._memory.get(word_lower)
+        if entry is None:
+            entry = self._read(word_lower)
+            if entry is None:
+                self._new_words.add(word_lower)
+                if self._bloom is not None:
+                    self._bloom.add(word_lower)
+
+        self._dirty.add(word_lower)
+        self._remember(word_lower, merge_entry(entry, translation, sentence, sentence_translation))
+
+    def batch_get(self, words: List[str]) -> Dict[str, dict]:
+        """
+        批量查询单词翻译
+
+        Args:
+            words: 单词列表
+
+        Returns:
+            字典，key 为单词，value 为翻译信息（如果存在）
+        """
+        result = {}
+        for word in words:
+            translation = self.get(word)
+            if translation:
+                result[normalize_word(word)] = translation
+        return result
+
+    def batch_add(self, word_data: List[dict]) -> None:
+        """
+        批量添加单词翻译
+
+        Args:
+            word_data: 单词数据列表，格式同 TranslationCache.batch_add
+        """
+        for item in word_data:
+            self.add(
+                word=item['word'],
+                translation=item.get('translation', ''),
+                sentence=item.get('sentence', ''),
+                sentence_translation=item.get('sentence_translation', '')
+            )
+
+    def keys(self) -> Iterator[str]:
+        """所有已缓存的小写单词（先写回修改，只读取单词列，不解码条目）"""
+        self.flush()
+        return (row[0] for row in self._db.execute('SELECT word FROM entries'))
+
+    def keys_stamp(self) -> str:
+        """
+        单词集合的版本标记：数据库的行数和最大 rowid
+
+        INSERT OR REPLACE 每次写入都会分配新的 rowid，因此标记不变时单词集合一定没有变化
+        （更新已有单词也会改变标记，调用方比对单词后会发现没有增删）
+        """
+        self.flush()
+        count, max_rowid = self._db.execute('SELECT COUNT(*), MAX(rowid) FROM entries').fetchone()
+        return f"db:{count}:{max_rowid or 0}"
+
+    def get_stats(self) -> dict:
+        """获取缓存统计信息（包括内存层命中情况）"""
+        self.flush()
+        total_words = 0
+        total_examples = 0
+        for _, entry in self._iter_store():
+            total_words += 1
+            total_examples += len(entry.get('sentence_examples', []))
+
+        lookups = self.hits + self.store_hits + self.misses
+        stats = {
+            'total_words': total_words,
+            'total_examples': total_examples,
+            'memory_entries': len(self._memory),
+            'memory_limit': self.memory_entries,
+            'hits': self.hits,
+            'store_hits': self.store_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+        if self._bloom is not None:
+            stats.update({
+                'bloom_fp_rate': self._bloom.fp_rate,
+                'bloom_estimated_fp_rate': self._bloom.estimated_fp_rate(),
+                'bloom_negatives': self.bloom_negatives,
+            })
+        return stats
+
+    def clear(self) -> None:
+        """清空缓存（谨慎使用）"""
+        self._memory.clear()
+        self._dirty.clear()
+        self._new_words.clear()
+        self._db.execute('DELETE FROM entries')
+        if self.use_bloom:
+            self._rebuild_bloom()
+            self._save_bloom()
+        self._db.commit()
+
+    def compact(self) -> int:
+        """
+        整理缓存：写回修改，压缩数据库，按当前单词数重建布隆过滤器
+
+        Returns:
+            缓存中的单词数量
+        """
+        self.flush()
+        self._db.execute('VACUUM')
+        if self.use_bloom:
+            self._rebuild_bloom()
+            self._save_bloom()
+            self._db.commit()
+        (count,) = self._db.execute('SELECT COUNT(*) FROM entries').fetchone()
+        return count
+
+    def export_json(self, output_file: str = None) -> int:
+        """
+        将磁盘层流式导出为 JSON（格式与内存模式的 translation_cache.json 相同）
+
+        Args:
+            output_file: 输出路径，默认覆盖 cache_file
+
+        Returns:
+            导出的单词数量
+        """
+        self.flush()
+        output_file = Path(output_file) if output_file else self.cache_file
+        count = write_json_object(self._iter_store(), output_file)
+
+        # 导出的就是数据库内容，下次打开无需重新导入
+        if output_file == self.cache_file:
+            self._set_meta('source_stamp', self._source_stamp())
+            self._db.commit()
+        return count
@@ -7,22 +7,71 @@
 2. 保存新翻译的单词到缓存
 3. 确保缓存中不存在重复单词
 4. 提供批量查询和更新接口
+5. 可选的二进制快照（translation_cache.snap），加快启动和单词查询
+6. 可选的分层模式（见 tiered_cache.py），内存占用有固定上限
+7. 布隆过滤器（translation_cache.bloom），未缓存的单词无需加载缓存即可判定
+8. 多词短语（如 figure out）与单词一样缓存，键为规范化的小写形式（见 word_item.normalize_word）
 """
 
+import gc
 import json
+import logging
+import sys
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+
+from bloom_filter import BloomFilter, bloom_path_for, load_fresh_bloom
+from cache_io import read_json, write_json
+from cache_snapshot import open_fresh_snapshot, snapshot_path_for, write_snapshot
+from config import (get_cache_bloom, get_cache_bloom_fp_rate, get_cache_memory_entries,
+                    get_cache_mode, get_cache_snapshot)
+from word_item import normalize_word
+
+
+def merge_entry(entry: Optional[dict], translation: str,
+                sentence: str = '', sentence_translation: str = '') -> dict:
+    """
+    将一次翻译合并到缓存条目（保留最新的翻译，追加不重复的例句）
+
+    Args:
+        entry: 已有的缓存条目，新单词为 None
+        translation: 中文翻译（包含词性）
+        sentence: 例句（可选）
+        sentence_translation: 例句翻译（可选）
+
+    Returns:
+        合并后的条目（已有条目原地修改）
+    """
+    if entry is None:
+        entry = {'translation': translation, 'sentence_examples': []}
+    else:
+        entry['translation'] = translation
+
+    if sentence and sentence_translation:
+        example = {
+            'sentence': sentence,
+            'sentence_translation': sentence_translation
+        }
+        examples = entry.setdefault('sentence_examples', [])
+        if example not in examples:
+            examples.append(example)
+    return entry
 
 
 class TranslationCache:
     """单词翻译缓存管理器"""
 
-    def __init__(self, cache_file: str = None):
+    def __init__(self, cache_file: str = None, use_snapshot: bool = None,
+                 use_bloom: bool = None, logger: logging.Logger = None):
         """
         初始化缓存管理器
 
         Args:
             cache_file: 缓存文件路径，默认为 skill 目录下的 translation_cache.json
+            use_snapshot: 是否使用二进制快照。默认读取配置 cache_snapshot，
+                          快照文件已存在时也会启用
+            use_bloom: 是否使用布隆过滤器。默认读取配置 cache_bloom
+            logger: 警告信息的日志记录器，默认为本模块的 logger
         """
         if cache_file is None:
             # 默认路径：skill 目录下的 translation_cache.json
@@ -31,35 +80,128 @@ class TranslationCache:
             cache_file = skill_dir / 'translation_cache.json'
 
         self.cache_file = Path(cache_file)
-        self.cache: Dict[str, dict] = {}
-        self._load_cache()
+        self.logger = logger or logging.getLogger(__name__)
+        self.snapshot_file = snapshot_path_for(self.cache_file)
+        if use_snapshot is None:
+            use_snapshot = get_cache_snapshot() or self.snapshot_file.exists()
+        self.use_snapshot = use_snapshot
+
+        self.bloom_file = bloom_path_for(self.cache_file)
+        self.use_bloom = get_cache_bloom() if use_bloom is None else use_bloom
+        self.bloom_fp_rate = get_cache_bloom_fp_rate()
+        self.bloom_negatives = 0  # 由布隆过滤器直接判定为未缓存的查询次数
+
+        # 完整缓存按需加载：未缓存的单词由布隆过滤器判定，其余单词直接从快照按偏移读取
+        self._cache: Optional[Dict[str, dict]] = None
+        self._bloom = load_fresh_bloom(self.bloom_file, self._source_stamp()) if self.use_bloom else None
+        self._snapshot = open_fresh_snapshot(self.cache_file) if use_snapshot else None
+        if self._snapshot is None and self._bloom is None:
+            self._load_cache()
+
+    def _source_stamp(self) -> str:
+        """缓存 JSON 的 mtime 和大小，作为布隆过滤器的版本标记"""
+        try:
+            stat = self.cache_file.stat()
+        except FileNotFoundError:
+            return ''
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    @property
+    def cache(self) -> Dict[str, dict]:
+        """完整的缓存字典（首次访问时加载）"""
+        if self._cache is None:
+            self._load_cache()
+        return self._cache
+
+    @cache.setter
+    def cache(self, value: Dict[str, dict]) -> None:
+        self._cache = value
 
     def _load_cache(self) -> None:
-        """从文件加载缓存"""
-        if self.cache_file.exists():
+        """从文件加载缓存（优先使用未过期的快照）"""
+        if self._snapshot is not None:
+            self._cache = self._snapshot.load_all()
+            self._snapshot.close()
+            self._snapshot = None
+        elif self.cache_file.exists():
             try:
-                content = self.cache_file.read_text(encoding='utf-8')
-                self.cache = json.loads(content)
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    # 自动识别压缩格式，边读边解压
+                    self._cache = read_json(self.cache_file)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
             except Exception as e:
-                print(f"Warning: Failed to load cache file: {e}")
-                self.cache = {}
+                self.logger.warning(f"Warning: Failed to load cache file: {e}")
+                self._cache = {}
+                return
+
+            # JSON 比快照新（或还没有快照），重新生成
+            if self.use_snapshot:
+                self.save_snapshot()
         else:
-            self.cache = {}
+            self._cache = {}
+
+        # 过滤器不存在或与 JSON 不一致（如其他任务更新了缓存）时重建
+        stamp = self._source_stamp()
+        if self.use_bloom and stamp and (self._bloom is None or self._bloom.stamp != stamp):
+            self._rebuild_bloom()
+            self._save_bloom(stamp)
+
+    def _rebuild_bloom(self) -> None:
+        """按当前缓存重建布隆过滤器（容量为单词数的两倍）"""
+        self._bloom = BloomFilter.build(self.cache.keys(), len(self.cache), self.bloom_fp_rate)
+
+    def _save_bloom(self, stamp: str) -> None:
+        try:
+            self._bloom.save(self.bloom_file, stamp)
+        except Exception as e:
+            self.logger.warning(f"Warning: Failed to write bloom filter: {e}")
+
+    def save_snapshot(self) -> int:
+        """
+        根据当前缓存重新生成二进制快照
+
+        Returns:
+            快照中的单词数量
+        """
+        try:
+            return write_snapshot(self.cache, self.snapshot_file, self.cache_file)
+        except Exception as e:
+            self.logger.warning(f"Warning: Failed to write cache snapshot: {e}")
+            return 0
 
     def _save_cache(self) -> None:
-        """保存缓存到文件"""
+        """保存缓存到文件（同时更新布隆过滤器）"""
         try:
-            content = json.dumps(self.cache, ensure_ascii=False, indent=2)
-            self.cache_file.write_text(content, encoding='utf-8')
+            # 按配置压缩，分块写出，不在内存中拼出整个 JSON 字符串
+            write_json(self.cache, self.cache_file)
         except Exception as e:
-            print(f"Error: Failed to save cache file: {e}")
+            self.logger.error(f"Error: Failed to save cache file: {e}")
+            return
+
+        if self.use_bloom:
+            if self._bloom is None or self._bloom.overloaded:
+                self._rebuild_bloom()
+            self._save_bloom(self._source_stamp())
+
+    def might_contain(self, word: str) -> bool:
+        """
+        单词是否可能已缓存（不加载缓存）
+
+        Returns:
+            False 表示一定未缓存；True 表示可能已缓存（没有布隆过滤器时总是 True）
+        """
+        return self._bloom is None or self._bloom.might_contain(normalize_word(word))
 
     def get(self, word: str) -> Optional[dict]:
         """
         查询单词翻译
 
         Args:
-            word: 单词（小写）
+            word: 单词或短语（按 normalize_word 规范化后查询）
 
         Returns:
             翻译信息字典，如果不存在则返回 None
@@ -73,7 +215,12 @@ class TranslationCache:
                 ]
             }
         """
-        word_lower = word.lower()
+        word_lower = normalize_word(word)
+        if self._bloom is not None and not self._bloom.might_contain(word_lower):
+            self.bloom_negatives += 1
+            return None
+        if self._cache is None and self._snapshot is not None:
+            return self._snapshot.get(word_lower)
         return self.cache.get(word_lower)
 
     def add(self, word: str, translation: str,
@@ -82,43 +229,18 @@ class TranslationCache:
         添加或更新单词翻译
 
         Args:
-            word: 单词
+            word: 单词或短语（按 normalize_word 规范化后保存）
             translation: 中文翻译（包含词性）
             sentence: 例句（可选）
             sentence_translation: 例句翻译（可选）
         """
-        word_lower = word.lower()
+        word_lower = normalize_word(word)
 
         # 如果单词已存在，更新翻译并添加新的例句
-        if word_lower in self.cache:
-            # 更新翻译（保留最新的翻译）
-            self.cache[word_lower]['translation'] = translation
-
-            # 添加例句（如果提供了且不重复）
-            if sentence and sentence_translation:
-                example = {
-                    'sentence': sentence,
-                    'sentence_translation': sentence_translation
-                }
-
-                # 检查是否已存在相同例句
-                examples = self.cache[word_lower].get('sentence_examples', [])
-                if example not in examples:
-                    examples.append(example)
-                    self.cache[word_lower]['sentence_examples'] = examples
-        else:
-            # 新增单词
-            self.cache[word_lower] = {
-                'translation': translation,
-                'sentence_examples': []
-            }
-
-            if sentence and sentence_translation:
-                self.cache[word_lower]['sentence_examples'].append({
-                    'sentence': sentence,
-                    'sentence_translation': sentence_translation
-                })
-
+        self.cache[word_lower] = merge_entry(self.cache.get(word_lower), translation,
+                                             sentence, sentence_translation)
+        if self._bloom is not None:
+            self._bloom.add(word_lower)
         self._save_cache()
 
     def batch_get(self, words: List[str]) -> Dict[str, dict]:
@@ -133,7 +255,7 @@ class TranslationCache:
         """
         result = {}
         for word in words:
-            word_lower = word.lower()
+            word_lower = normalize_word(word)
             translation = self.get(word_lower)
             if translation:
                 result[word_lower] = translation
@@ -160,6 +282,16 @@ class TranslationCache:
                 sentence_translation=item.get('sentence_translation', '')
             )
 
+    def keys(self) -> Iterator[str]:
+        """所有已缓存的小写单词（有快照时只读取索引，不解码条目）"""
+        if self._cache is None and self._snapshot is not None:
+            return self._snapshot.keys()
+        return iter(self.cache)
+
+    def keys_stamp(self) -> str:
+        """单词集合的版本标记：缓存 JSON 的 mtime 和大小（每次添加后立即保存）"""
+        return self._source_stamp()
+
     def get_stats(self) -> dict:
         """获取缓存统计信息"""
         total_words = len(self.cache)
@@ -167,35 +299,97 @@ class TranslationCache:
             len(word_data.get('sentence_examples', []))
             for word_data in self.cache.values()
         )
-        return {
+        stats = {
             'total_words': total_words,
             'total_examples': total_examples
         }
+        if self._bloom is not None:
+            stats.update({
+                'bloom_fp_rate': self._bloom.fp_rate,
+                'bloom_estimated_fp_rate': self._bloom.estimated_fp_rate(),
+                'bloom_negatives': self.bloom_negatives,
+            })
+        return stats
 
     def clear(self) -> None:
         """清空缓存（谨慎使用）"""
         self.cache = {}
+        self._bloom = None
         self._save_cache()
 
+    def compact(self) -> int:
+        """
+        整理缓存：重写 JSON，按当前单词数重建布隆过滤器和快照
+
+        Returns:
+            缓存中的单词数量
+        """
+        self._bloom = None
+        self._save_cache()
+        if self.use_snapshot:
+            self.save_snapshot()
+        return len(self.cache)
+
+    def flush(self) -> None:
+        """写回未保存的修改（内存模式每次添加后已立即保存，这里无需操作）"""
+
+    def close(self) -> None:
+        """关闭缓存"""
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+
+def open_cache(cache_file: str = None, logger: logging.Logger = None):
+    """
+    按配置 cache_mode 打开翻译缓存
+
+    Args:
+        cache_file: 缓存文件路径，默认为 skill 目录下的 translation_cache.json
+        logger: 导入进度和警告信息的日志记录器，默认为缓存模块的 logger
+
+    Returns:
+        TranslationCache（memory 模式）或 TieredTranslationCache（tiered 模式），
+        两者接口相同
+    """
+    if get_cache_mode() == 'tiered':
+        from tiered_cache import TieredTranslationCache
+        return TieredTranslationCache(cache_file, memory_entries=get_cache_memory_entries(),
+                                      logger=logger)
+    return TranslationCache(cache_file, logger=logger)
+
 
 def main():
     """命令行工具：查询和管理翻译缓存"""
-    import sys
-
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python translation_cache.py stats              # 查看缓存统计")
         print("  python translation_cache.py get <word>         # 查询单词")
         print("  python translation_cache.py add <word> <translation> [sentence] [sentence_translation]")
+        print("  python translation_cache.py snapshot           # 生成二进制快照（加快加载）")
+        print("  python translation_cache.py export [file]      # 分层模式：导出数据库为 JSON")
+        print("  python translation_cache.py compact            # 整理缓存，重建布隆过滤器")
+        print("  python translation_cache.py list [--offset N] [--limit N]   # 按顺序分页列出单词")
+        print("  python translation_cache.py find <prefix|glob> [--offset N] [--limit N]")
+        print("                                                 # 按前缀或模式查找（如 over、*ness）")
+        print("  python translation_cache.py near <word> [...]  # 查找拼写相近的已缓存单词（如 recieve）")
+        print("  python translation_cache.py merge <file> [...] [--output FILE] [--dry-run] [--report FILE]")
+        print("                                                 # 合并其他机器的缓存")
         sys.exit(1)
 
-    cache = TranslationCache()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    cache = open_cache()
     command = sys.argv[1]
 
     if command == 'stats':
         stats = cache.get_stats()
         print(f"Total words: {stats['total_words']}")
         print(f"Total examples: {stats['total_examples']}")
+        if 'memory_limit' in stats:
+            print(f"Memory entries: {stats['memory_entries']}/{stats['memory_limit']}")
+        if 'bloom_fp_rate' in stats:
+            print(f"Bloom filter FP rate: {stats['bloom_estimated_fp_rate']:.2%} "
+                  f"(configured {stats['bloom_fp_rate']:.2%})")
 
     elif command == 'get':
         if len(sys.argv) < 3:
@@ -222,6 +416,37 @@ def main():
         cache.add(word, translation, sentence, sentence_translation)
         print(f"Added/updated word: {word}")
 
+    elif command == 'snapshot':
+        if not isinstance(cache, TranslationCache):
+            print("Error: snapshot is only used in memory cache mode")
+            sys.exit(1)
+        count = cache.save_snapshot()
+        print(f"Snapshot written: {cache.snapshot_file} ({count} words)")
+
+    elif command == 'compact':
+        count = cache.compact()
+        print(f"Compacted cache: {count} words")
+
+    elif command == 'export':
+        if not hasattr(cache, 'export_json'):
+            print("Error: export is only needed in tiered cache mode")
+            sys.exit(1)
+        output_file = sys.argv[2] if len(sys.argv) > 2 else None
+        count = cache.export_json(output_file)
+        print(f"Exported {count} words to {output_file or cache.cache_file}")
+
+    elif command in ('list', 'find'):
+        from key_index import query_command
+        query_command(cache, command, sys.argv[2:])
+
+    elif command == 'near':
+        from near_match import near_command
+        near_command(cache, sys.argv[2:])
+
+    elif command == 'merge':
+        from cache_merge import merge_command
+        merge_command(cache, sys.argv[2:])
+
     else:
         print(f"Unknown command: {command}")
         sys.exit(1)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+跨任务的翻译租约
+
+多个任务并行处理不同剧集时，同一个未缓存的单词可能被放进多个批次、翻译多次。
+租约表（translation_leases.json）与缓存放在同一目录：
+
+1. 任务把单词放进批次前先认领（owner + 过期时间）
+2. 已被其他任务认领且未过期的单词标记为"其他任务翻译中"，不再放进批次
+3. 翻译保存到缓存后释放租约；合并生成 Anki 文件时从缓存取回其他任务的翻译
+
+读写租约表时持有文件锁（fcntl），多个进程同时认领不会互相覆盖。
+"""
+
+import fcntl
+import json
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+
+from cache_io import read_json, write_json
+from word_item import as_word_item, words_to_json
+
+# 默认租约有效期：6 小时（一轮人工翻译的时间上限）
+DEFAULT_TTL = 6 * 3600
+
+
+def make_owner(source: str) -> str:
+    """
+    生成租约持有者标识：主机名 + 源文件/目录的绝对路径
+
+    第一步和第二步是不同的进程，标识必须由输入决定而不是进程号。
+    """
+    return f"{socket.gethostname()}:{Path(source).resolve()}"
+
+
+def lease_file_for(cache_file: Path) -> Path:
+    """缓存文件对应的租约表路径（同一目录）"""
+    return Path(cache_file).with_name('translation_leases.json')
+
+
+class LeaseTable:
+    """翻译租约表"""
+
+    def __init__(self, lease_file: str = None, ttl: int = DEFAULT_TTL,
+                 logger: logging.Logger = None):
+        """
+        初始化租约表
+
+        Args:
+            lease_file: 租约文件路径，默认为 skill 目录下的 translation_leases.json
+            ttl: 租约有效期（秒）
+            logger: 警告信息的日志记录器，默认为本模块的 logger
+        """
+        if lease_file is None:
+            lease_file = Path(__file__).parent.parent / 'translation_leases.json'
+
+        self.lease_file = Path(lease_file)
+        self.lock_file = self.lease_file.with_name(self.lease_file.name + '.lock')
+        self.ttl = ttl
+        self.logger = logger or logging.getLogger(__name__)
+
+    @contextmanager
+    def _locked(self):
+        """持有排他锁期间读取租约表，退出时写回（过期租约自动清理）"""
+        self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                leases = self._read()
+                now = time.time()
+                leases = {word: lease for word, lease in leases.items()
+                          if lease.get('expires', 0) > now}
+                yield leases
+                self._write(leases)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        if not self.lease_file.exists():
+            return {}
+        try:
+            return json.loads(self.lease_file.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, OSError) as e:
+            self.logger.warning(f"Warning: Failed to load lease file: {e}")
+            return {}
+
+    def _write(self, leases: dict) -> None:
+        temp_file = self.lease_file.with_name(f"{self.lease_file.name}.tmp.{os.getpid()}")
+        temp_file.write_text(json.dumps(leases, ensure_ascii=False), encoding='utf-8')
+        os.replace(temp_file, self.lease_file)
+
+    def claim(self, words: Iterable[str], owner: str,
+              ttl: Optional[int] = None) -> dict[str, str]:
+        """
+        认领单词（已由同一持有者认领的单词会续期）
+
+        Args:
+            words: 小写单词列表
+            owner: 持有者标识
+            ttl: 有效期（秒），默认使用表的有效期
+
+        Returns:
+            被其他任务认领的单词 -> 持有者
+        """
+        expires = time.time() + (ttl if ttl is not None else self.ttl)
+        held_elsewhere = {}
+        with self._locked() as leases:
+            for word in words:
+                lease = leases.get(word)
+                if lease and lease['owner'] != owner:
+                    held_elsewhere[word] = lease['owner']
+                else:
+                    leases[word] = {'owner': owner, 'expires': expires}
+        return held_elsewhere
+
+    def release(self, words: Iterable[str], owner: Optional[str] = None) -> None:
+        """
+        释放租约
+
+        Args:
+            words: 小写单词列表
+            owner: 只释放该持有者的租约；None 表示无论持有者都释放（单词已翻译）
+        """
+        with self._locked() as leases:
+            for word in words:
+                lease = leases.get(word)
+                if lease and (owner is None or lease['owner'] == owner):
+                    del leases[word]
+
+    def holders(self, words: Iterable[str]) -> dict[str, str]:
+        """查询单词的当前持有者（只返回有未过期租约的单词）"""
+        with self._locked() as leases:
+            return {word: leases[word]['owner'] for word in words if word in leases}
+
+
+def pending_file_for(name: str, work_dir: str = '/tmp') -> Path:
+    """记录"其他任务翻译中"单词的文件路径"""
+    return Path(work_dir) / f"{name}_pending_elsewhere.json"
+
+
+def claim_words(lease_table: LeaseTable, words: list, owner: str) -> tuple[list, list]:
+    """
+    认领待翻译的单词
+
+    Args:
+        lease_table: 租约表
+        words: 未缓存的单词条目列表
+        owner: 持有者标识
+
+    Returns:
+        (本任务负责翻译的单词, 其他任务翻译中的单词)
+    """
+    held_elsewhere = lease_table.claim([item.word_lower for item in words], owner)
+    claimed = [item for item in words if item.word_lower not in held_elsewhere]
+    pending = [item for item in words if item.word_lower in held_elsewhere]
+    return claimed, pending
+
+
+def save_pending(pending_file: Path, owner: str, words: list) -> None:
+    """记录其他任务翻译中的单词（没有时删除旧记录）"""
+    if not words:
+        pending_file.unlink(missing_ok=True)
+        return
+    write_json({'owner': owner, 'words': words_to_json(words)}, pending_file)
+
+
+def load_pending(pending_file: Path) -> list:
+    """读取其他任务翻译中的单词"""
+    if not pending_file.exists():
+        return []
+    data = read_json(pending_file)
+    return [as_word_item(item) for item in data['words']]
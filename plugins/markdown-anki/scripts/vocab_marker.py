@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+自动标记已缓存的单词
+
+extract_words 只提取人工用 **word** 标记的生词。本模块用翻译缓存中的所有单词构建
+Aho-Corasick 自动机，一次线性扫描任意 Markdown 文本，找出其中所有已缓存单词的出现位置：
+
+- 输出命中列表（单词、出现次数、所在句子、缓存中的翻译），可直接生成复习牌组
+- 或者改写文件，给命中的单词加上 **word** 标记
+
+自动机以单词而不是字符为转移单位：文本先切分为单词（字母，中间可以有撇号或连字符），
+单词边界由切分保证，"scared" 中不会匹配到 "scare"。缓存中有多词短语时，同一次扫描
+按最左最长原则匹配短语。已有的 **word** 标记、代码和链接地址不参与匹配。
+
+自动机保存在缓存旁边的 translation_cache.marker（marshal 格式，文件头记录缓存单词集合的
+版本标记）。缓存变化后只插入新增的单词、删除已移除的单词，再重新计算短语节点的失败链接，
+不从头重建。
+
+用法：
+    python vocab_marker.py <input_file> [--json FILE] [--output FILE | --in-place] [--first]
+"""
+
+import argparse
+import logging
+import marshal
+import os
+import re
+import struct
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Optional
+
+from cache_io import write_json
+from extract_words import get_sentence_context
+from word_item import WordItem, deck_to_json
+
+MAGIC = b'TCMARK\x00\x01'
+VERSION = 1
+
+# magic, version, 版本标记长度
+_HEADER = struct.Struct('<8sHH')
+
+# 文本中的单词：字母，中间可以有撇号（包括 ’）或连字符
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+(?:['’-][A-Za-z]+)*")
+
+# 扫描时跳过的区域：代码块、行内代码、已有的 **word** 标记、链接地址、HTML 标签、URL
+_SCAN_PATTERN = re.compile(
+    r"(?P<skip>```.*?(?:```|\Z)|`[^`\n]*`|\*\*[^*]+\*\*|\]\([^)\n]*\)|<[^>\n]*>|https?://\S+)"
+    r"|[A-Za-z]+(?:['’-][A-Za-z]+)*",
+    re.S,
+)
+
+ROOT = 0
+_NO_EDGES: dict[str, int] = {}
+
+
+def marker_path_for(cache_file: Path) -> Path:
+    """返回缓存 JSON 对应的自动机文件路径"""
+    return Path(cache_file).with_suffix('.marker')
+
+
+def _normalize(token: str) -> str:
+    return token.lower().replace('’', "'")
+
+
+def key_tokens(key: str) -> Optional[list[str]]:
+    """
+    将缓存词条切分为单词序列
+
+    Returns:
+        单词列表；词条无法按单词边界匹配（如 "'em"、带标点的词条）时返回 None
+    """
+    tokens = [_normalize(token) for token in TOKEN_PATTERN.findall(key)]
+    if not tokens or ' '.join(tokens) != key:
+        return None
+    return tokens
+
+
+class VocabularyMarker:
+    """以单词为转移单位的 Aho-Corasick 自动机"""
+
+    def __init__(self):
+        self.stamp = ''
+        # 内部节点的转移：节点 -> {单词: 子节点}（叶子节点没有记录）
+        self._children: dict[int, dict[str, int]] = {ROOT: {}}
+        # 失败链接：只记录深度 >= 2 且不指向根节点的节点
+        self._fail: dict[int, int] = {}
+        # 在节点处结束的所有词条的单词数（从长到短），包括经失败链接到达的较短词条
+        self._outputs: dict[int, tuple[int, ...]] = {}
+        # 词条 -> 终止节点
+        self._terminals: dict[str, int] = {}
+        self._next_node = 1
+        self.max_tokens = 0     # 最长词条的单词数
+        self._stale = False     # 短语节点的失败链接需要重新计算
+
+    def __len__(self) -> int:
+        return len(self._terminals)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._terminals
+
+    def add(self, key: str) -> bool:
+        """
+        添加词条（小写）
+
+        Returns:
+            是否添加（已存在或无法按单词匹配时返回 False）
+        """
+        if key in self._terminals:
+            return False
+        tokens = key_tokens(key)
+        if tokens is None:
+            return False
+
+        children = self._children
+        node = ROOT
+        for token in tokens:
+            edges = children.get(node)
+            if edges is None:
+                edges = children[node] = {}
+            child = edges.get(token)
+            if child is None:
+                child = edges[token] = self._next_node
+                self._next_node += 1
+            node = child
+
+        depth = len(tokens)
+        self._terminals[key] = node
+        self._outputs[node] = (depth,) + self._outputs.get(node, ())
+        self.max_tokens = max(self.max_tokens, depth)
+        if depth > 1 or len(children) > 1:
+            self._stale = True
+        return True
+
+    def remove(self, key: str) -> bool:
+        """
+        删除词条，并删除不再属于任何词条的节点
+
+        Returns:
+            词条是否存在
+        """
+        node = self._terminals.pop(key, None)
+        if node is None:
+            return False
+
+        tokens = key.split(' ')
+        path = [ROOT]
+        for token in tokens:
+            path.append(self._children[path[-1]][token])
+
+        rest = self._outputs[node][1:]
+        if rest:
+            self._outputs[node] = rest
+        else:
+            del self._outputs[node]
+
+        # 从最深的节点向上删除：没有子节点、也不是其他词条的终止节点
+        for depth in range(len(tokens), 0, -1):
+            current = path[depth]
+            own = self._outputs.get(current)
+            if self._children.get(current) or (own and own[0] == depth):
+                break
+            del self._children[path[depth - 1]][tokens[depth - 1]]
+            self._children.pop(current, None)
+            self._fail.pop(current, None)
+            self._outputs.pop(current, None)
+        if len(self._children) > 1 or self.max_tokens > 1:
+            self._stale = True
+        return True
+
+    def update(self, keys: Iterable[str]) -> tuple[int, int]:
+        """
+        与缓存的单词集合同步（只插入新增的、删除已移除的词条）
+
+        Args:
+            keys: 缓存中的所有小写单词
+
+        Returns:
+            (新增数, 删除数)
+        """
+        wanted = set(keys)
+        removed = [key for key in self._terminals if key not in wanted]
+        for key in removed:
+            self.remove(key)
+        added = sum(self.add(key) for key in wanted if key not in self._terminals)
+        return added, len(removed)
+
+    def _link(self) -> None:
+        """
+        重新计算失败链接和输出（广度优先）
+
+        深度为 1 的节点总是失败到根节点、输出只有自身，因此只遍历多词短语的节点，
+        耗时与短语数成正比，与单词数无关。
+        """
+        children = self._children
+        outputs = self._outputs
+        fail: dict[int, int] = {}
+        queue = deque((node, 1) for node in children[ROOT].values() if node in children)
+        max_tokens = 1 if children[ROOT] else 0
+
+        while queue:
+            parent, depth = queue.popleft()
+            parent_fail = fail.get(parent, ROOT)
+            for token, child in children[parent].items():
+                # 沿父节点的失败链接找到最长的、能接受该单词的后缀
+                state = parent_fail
+                while True:
+                    target = children.get(state, _NO_EDGES).get(token)
+                    if target is not None or state == ROOT:
+                        break
+                    state = fail.get(state, ROOT)
+                target = target if target is not None else ROOT
+                if target != ROOT:
+                    fail[child] = target
+
+                child_depth = depth + 1
+                current = outputs.get(child, ())
+                own = current[:1] if current and current[0] == child_depth else ()
+                merged = own + outputs.get(target, ())
+                if merged:
+                    outputs[child] = merged
+                    max_tokens = max(max_tokens, merged[0])
+                else:
+                    outputs.pop(child, None)
+                if child in children:
+                    queue.append((child, child_depth))
+
+        self._fail = fail
+        self.max_tokens = max_tokens
+        self._stale = False
+
+    def find(self, text: str) -> list[tuple[int, int, str]]:
+        """
+        一次扫描文本，找出所有已缓存的单词（最左最长匹配，互不重叠）
+
+        Args:
+            text: Markdown 文本
+
+        Returns:
+            按位置排序的 (开始位置, 结束位置, 词条) 列表
+        """
+        if self._stale:
+            self._link()
+        root_edges = self._children[ROOT]
+        outputs = self._outputs
+
+        if self.max_tokens <= 1:
+            # 只有单个单词：每个单词就是一次字典查询
+            hits = []
+            for match in _SCAN_PATTERN.finditer(text):
+                if match.lastgroup is None:
+                    token = _normalize(match.group())
+                    if token in root_edges:
+                        hits.append((match.start(), match.end(), token))
+            return hits
+
+        children = self._children
+        fail = self._fail
+        starts: deque[int] = deque(maxlen=self.max_tokens)
+        tokens: deque[str] = deque(maxlen=self.max_tokens)
+        candidates = []
+        state = ROOT
+        previous_end = 0
+        for match in _SCAN_PATTERN.finditer(text):
+            if match.lastgroup is not None:
+                state = ROOT
+                continue
+            start = match.start()
+            # 短语中的单词之间只能有空白（换行也可以）
+            if state != ROOT and not text[previous_end:start].isspace():
+                state = ROOT
+            previous_end = match.end()
+            token = _normalize(match.group())
+            starts.append(start)
+            tokens.append(token)
+
+            while True:
+                target = children.get(state, _NO_EDGES).get(token)
+                if target is not None:
+                    state = target
+                    break
+                if state == ROOT:
+                    break
+                state = fail.get(state, ROOT)
+
+            for length in outputs.get(state, ()):
+                key = token if length == 1 else ' '.join(list(tokens)[-length:])
+                candidates.append((starts[-length], previous_end, key))
+
+        # 最左最长：按开始位置、长度排序后依次选取不重叠的匹配
+        candidates.sort(key=lambda hit: (hit[0], -hit[1]))
+        hits = []
+        last_end = -1
+        for hit in candidates:
+            if hit[0] >= last_end:
+                hits.append(hit)
+                last_end = hit[1]
+        return hits
+
+    def save(self, path: Path, stamp: str) -> None:
+        """
+        写入文件（先写临时文件再原子替换）
+
+        Args:
+            path: 自动机文件路径
+            stamp: 缓存单词集合的版本标记
+        """
+        if self._stale:
+            self._link()
+        path = Path(path)
+        self.stamp = stamp
+        stamp_bytes = stamp.encode('utf-8')
+        data = marshal.dumps((self._children, self._fail, self._outputs, self._terminals,
+                              self._next_node, self.max_tokens))
+        temp_file = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+        with open(temp_file, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(stamp_bytes)))
+            f.write(stamp_bytes)
+            f.write(data)
+        os.replace(temp_file, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['VocabularyMarker']:
+        """读取自动机文件，不存在或格式不正确时返回 None"""
+        try:
+            data = Path(path).read_bytes()
+            magic, version, stamp_length = _HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != VERSION:
+            return None
+
+        body_offset = _HEADER.size + stamp_length
+        try:
+            (children, fail, outputs, terminals,
+             next_node, max_tokens) = marshal.loads(data[body_offset:])
+        except (ValueError, EOFError, TypeError):
+            return None
+
+        marker = cls()
+        marker.stamp = data[_HEADER.size:body_offset].decode('utf-8')
+        marker._children = children
+        marker._fail = fail
+        marker._outputs = outputs
+        marker._terminals = terminals
+        marker._next_node = next_node
+        marker.max_tokens = max_tokens
+        return marker
+
+
+def load_marker(cache, rebuild: bool = False, logger: logging.Logger = None) -> VocabularyMarker:
+    """
+    读取与缓存一致的自动机，缓存变化后增量更新并保存
+
+    Args:
+        cache: TranslationCache 或 TieredTranslationCache
+        rebuild: 忽略已保存的自动机，从头构建
+        logger: 更新信息和警告的日志记录器，默认为本模块的 logger
+
+    Returns:
+        VocabularyMarker
+    """
+    logger = logger or logging.getLogger(__name__)
+    path = marker_path_for(cache.cache_file)
+    stamp = cache.keys_stamp()
+    marker = None if rebuild else VocabularyMarker.load(path)
+    if marker is not None and stamp and marker.stamp == stamp:
+        return marker
+
+    if marker is None:
+        marker = VocabularyMarker()
+    added, removed = marker.update(cache.keys())
+    logger.info(f"  ✓ 自动机已更新：新增 {added} 个、删除 {removed} 个词条（共 {len(marker)} 个）")
+    if stamp:
+        try:
+            marker.save(path, stamp)
+        except OSError as e:
+            logger.warning(f"Warning: Failed to write vocabulary marker: {e}")
+    return marker
+
+
+def mark_text(text: str, hits: list[tuple[int, int, str]], first_only: bool = False) -> str:
+    """
+    给命中的单词加上 **word** 标记
+
+    Args:
+        text: 原文
+        hits: find() 的结果
+        first_only: 每个单词只标记第一次出现
+
+    Returns:
+        标记后的文本
+    """
+    parts = []
+    position = 0
+    seen = set()
+    for start, end, key in hits:
+        if first_only:
+            if key in seen:
+                continue
+            seen.add(key)
+        parts.append(text[position:start])
+        parts.append(f"**{text[start:end]}**")
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def collect_words(text: str, hits: list[tuple[int, int, str]], cache=None) -> tuple[list[WordItem], dict[str, int]]:
+    """
+    按单词汇总命中结果（句子取第一次出现的位置）
+
+    Args:
+        text: 原文
+        hits: find() 的结果
+        cache: 翻译缓存，给出时填入缓存中的翻译
+
+    Returns:
+        (WordItem 列表, 单词 -> 出现次数)
+    """
+    words: dict[str, WordItem] = {}
+    counts: dict[str, int] = {}
+    for start, end, key in hits:
+        if key in counts:
+            counts[key] += 1
+            continue
+        counts[key] = 1
+        original = ' '.join(text[start:end].split())
+        item = WordItem(word=original, word_lower=key,
+                        sentence=get_sentence_context(text, original, start, end))
+        if cache is not None:
+            entry = cache.get(key)
+            if entry:
+                item.translation = entry.get('translation', '')
+        words[key] = item
+    return list(words.values()), counts
+
+
+def mark_file(file_path: str, marker: VocabularyMarker, cache=None) -> dict:
+    """
+    找出文件中所有已缓存的单词
+
+    Returns:
+        与 extract_words_from_file 格式相同的结果，另有 occurrences（单词 -> 出现次数）
+        和 hits（find() 的结果）
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    content = path.read_text(encoding='utf-8')
+    hits = marker.find(content)
+    words, counts = collect_words(content, hits, cache)
+    return {
+        'deck_name': path.stem,
+        'file_path': str(path.absolute()),
+        'word_count': len(words),
+        'words': words,
+        'occurrences': counts,
+        'hits': hits,
+    }
+
+
+def main():
+    from translation_cache import open_cache
+
+    parser = argparse.ArgumentParser(description='自动标记 Markdown 中已缓存的单词')
+    parser.add_argument('input_file', help='Markdown 文件')
+    parser.add_argument('--json', metavar='FILE', help='将命中的单词写为 JSON（与 extract_words 格式相同，含翻译）')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--output', metavar='FILE', help='写出加上 **word** 标记的文件')
+    output.add_argument('--in-place', action='store_true', help='直接改写输入文件')
+    parser.add_argument('--first', action='store_true', help='每个单词只标记第一次出现')
+    parser.add_argument('--rebuild', action='store_true', help='从头重建自动机')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    cache = open_cache()
+    marker = load_marker(cache, rebuild=args.rebuild)
+    try:
+        result = mark_file(args.input_file, marker, cache)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    hits = result.pop('hits')
+    counts = result.pop('occurrences')
+    print(f"✓ 找到 {result['word_count']} 个已缓存的单词，共 {len(hits)} 处")
+
+    if args.output or args.in_place:
+        path = Path(args.input_file)
+        marked = mark_text(path.read_text(encoding='utf-8'), hits, args.first)
+        output_file = path if args.in_place else Path(args.output)
+        output_file.write_text(marked, encoding='utf-8')
+        print(f"✓ 已写出标记后的文件: {output_file}")
+    if args.json:
+        write_json(deck_to_json(result), args.json)
+        print(f"✓ 已写出命中列表: {args.json}")
+    if not (args.output or args.in_place or args.json):
+        for item in result['words']:
+            print(f"  {item.word} ×{counts[item.word_lower]}  {item.translation}")
+            print(f"      {item.sentence}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+生词条目数据结构
+
+提取出的每个生词在流水线内部都用紧凑的 WordItem 表示（__slots__，无实例字典），
+相同的例句和牌组名会被驻留（intern），多个单词共享同一个字符串对象。
+
+只有在写出 JSON 文件（批次文件、提取结果）时才转换为字典。
+"""
+
+import sys
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class WordItem:
+    """单个生词及其上下文"""
+
+    word: str
+    word_lower: str
+    sentence: str = ''
+    translation: str = ''
+    sentence_translation: str = ''
+    deck_name: str = ''
+
+    def __post_init__(self):
+        # 同一句子中的多个生词、同一文件中的所有生词共享字符串
+        self.sentence = sys.intern(self.sentence)
+        self.deck_name = sys.intern(self.deck_name)
+
+    def to_dict(self) -> dict:
+        """转换为 JSON 字典（deck_name 为空时不输出，保持原有文件格式）"""
+        item = {
+            'word': self.word,
+            'word_lower': self.word_lower,
+            'sentence': self.sentence,
+            'translation': self.translation,
+            'sentence_translation': self.sentence_translation,
+        }
+        if self.deck_name:
+            item['deck_name'] = self.deck_name
+        return item
+
+    @classmethod
+    def from_dict(cls, item: dict) -> 'WordItem':
+        """从 JSON 字典创建（兼容缺少 word_lower 等字段的翻译结果）"""
+        word = item['word']
+        return cls(
+            word=word,
+            word_lower=item.get('word_lower') or normalize_word(word),
+            sentence=item.get('sentence', ''),
+            translation=item.get('translation', ''),
+            sentence_translation=item.get('sentence_translation', ''),
+            deck_name=item.get('deck_name', ''),
+        )
+
+
+def normalize_word(word: str) -> str:
+    """
+    单词或短语的缓存键：小写，连续空白（包括换行）合并为一个空格，弯撇号 ’ 替换为 '
+
+    如 "Figure  out" 和 "figure\nout" 都对应 "figure out"
+    """
+    return ' '.join(word.lower().replace('’', "'").split())
+
+
+def as_word_item(item: 'WordItem | dict') -> WordItem:
+    """统一转换为 WordItem（JSON 文件读入的是字典）"""
+    if isinstance(item, WordItem):
+        return item
+    return WordItem.from_dict(item)
+
+
+def words_to_json(words: list) -> list[dict]:
+    """将单词列表转换为可序列化的字典列表"""
+    return [as_word_item(item).to_dict() for item in words]
+
+
+def deck_to_json(data: dict) -> dict:
+    """将提取结果/批次数据转换为可序列化的字典（仅转换 words 字段）"""
+    result = dict(data)
+    result['words'] = words_to_json(data['words'])
+    return result
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+性能基准测试
+
+在合成数据上测量 Stop Hook 各环节的耗时，用于验证优化效果。
+
+用法：
+    python3 benchmark.py transcript [--sizes 10,100,300]
+    python3 benchmark.py hook [--runs N] [--legacy-hook stop-hook.sh]
+    python3 benchmark.py plan [--tasks N]
+    python3 benchmark.py notes [--iterations N] [--keep N]
+"""
+
+import argparse
+import json
+import random
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from notes_archive import compact_notes, lookup
+from task_plan import cache_path_for, load_summary, parse_task_plan
+from transcript_tail import read_last_assistant
+
+SCRIPT_DIR = Path(__file__).parent
+
+# 原来 stop-hook.sh 中的做法：grep 整个文件，tail 取最后一行，再交给 jq
+LEGACY_COMMAND = (
+    'grep \'"role":"assistant"\' "$0" | tail -1 | '
+    'jq -r \'.message.content | if type == "array" then map(select(.type == "text")) | '
+    'map(.text) | join("\\n") else . end\''
+)
+
+
+# 原来 stop-hook.sh 读写状态的做法：每个值一次 grep | sed | sed，每次修改一次 sed + mv
+LEGACY_STATE_COMMAND = r'''
+STATE_FILE="$0"
+parse_yaml_value() {
+    grep "^${1}:" "$STATE_FILE" 2>/dev/null | sed "s/^${1}: *//" | sed 's/^"\(.*\)"$/\1/'
+}
+update_yaml_value() {
+    sed "s/^${1}: .*/${1}: ${2}/" "$STATE_FILE" > "${STATE_FILE}.tmp.$$"
+    mv "${STATE_FILE}.tmp.$$" "$STATE_FILE"
+}
+ACTIVE=$(parse_yaml_value "active")
+ITERATION=$(parse_yaml_value "current_iteration")
+MAX_ITERATIONS=$(parse_yaml_value "max_iterations")
+COMPLETION_PROMISE=$(parse_yaml_value "completion_promise")
+CONSECUTIVE_ERRORS=$(parse_yaml_value "consecutive_errors")
+MAX_CONSECUTIVE_ERRORS=$(parse_yaml_value "max_consecutive_errors")
+HUMAN_INTERVENTION=$(parse_yaml_value "human_intervention_requested")
+update_yaml_value "current_iteration" "$((ITERATION + 1))"
+update_yaml_value "consecutive_errors" "0"
+'''
+
+# 完成标志与合成会话记录不一致：每次停止都走完整的继续循环流程
+STATE_TEMPLATE = '''# Ralph-Planning 循环状态
+active: true
+started_at: "2026-01-01T00:00:00+00:00"
+current_iteration: 1
+max_iterations: 0
+completion_promise: "BENCHMARK_NOT_DONE"
+prompt: |
+  benchmark
+error_count: 0
+consecutive_errors: 0
+max_consecutive_errors: 3
+human_intervention_requested: false
+pause_reason: null
+'''
+
+
+# 原来 ralph-status.sh 和 stop-hook.sh 查询任务计划的做法
+LEGACY_PLAN_COMMAND = r'''
+TASK_PLAN="$0"
+TOTAL_TASKS=$(grep -c '^\- \[' "$TASK_PLAN")
+COMPLETED_TASKS=$(grep -c '^\- \[x\]' "$TASK_PLAN")
+COMPLETION_SECTION=$(sed -n '/^## 完成标准/,/^---/p' "$TASK_PLAN" | head -n -1)
+TOTAL_CRITERIA=$(echo "$COMPLETION_SECTION" | grep -c '\- \[')
+COMPLETED_CRITERIA=$(echo "$COMPLETION_SECTION" | grep -c '\- \[x\]')
+CURRENT=$(grep -m1 '← \*\*当前任务\*\*' "$TASK_PLAN" | sed 's/← \*\*当前任务\*\*//' | sed 's/^- \[ \] //')
+echo "$TOTAL_TASKS $COMPLETED_TASKS $TOTAL_CRITERIA $COMPLETED_CRITERIA $CURRENT"
+'''
+
+
+def make_task_plan(path: Path, tasks: int, seed: int = 0) -> None:
+    """生成包含 tasks 个任务的任务计划（前 60% 已完成，当前任务位于中间）"""
+    rng = random.Random(seed)
+    lines = ['# 项目：基准测试', '', '## 目标', '合成任务计划', '', '## 完成标准']
+    lines += [f"- [{'x' if i < 3 else ' '}] 标准{i + 1}" for i in range(5)]
+    lines += ['', '---', '']
+    done = int(tasks * 0.6)
+    per_phase = 25
+    for number in range(tasks):
+        if number % per_phase == 0:
+            lines += ['', f"## Phase {number // per_phase + 1}: 阶段 {'✅' if number + per_phase <= done else '⏳'}", '']
+        mark = 'x' if number < done else ' '
+        text = ''.join(rng.choice(string.ascii_lowercase + ' ') for _ in range(rng.randint(20, 60)))
+        current = ' ← **当前任务**' if number == done else ''
+        lines.append(f"- [{mark}] 任务 {number + 1}: {text}{current}")
+    lines += ['', '---', '', '## 关键决策', '| 决策 | 理由 | 迭代 |', '|------|------|------|', '']
+    path.write_text('\n'.join(lines), encoding='utf-8')
+
+
+def make_transcript(path: Path, size_mb: int, seed: int = 0) -> int:
+    """
+    生成合成会话记录：user、assistant（文本 + 工具调用）、tool_result 交替出现，
+    最后一条 assistant 消息包含 <promise> 标签
+
+    Returns:
+        记录条数
+    """
+    rng = random.Random(seed)
+    target = size_mb * 2**20
+    filler = ''.join(rng.choice(string.ascii_letters + ' ') for _ in range(4096))
+    records = 0
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            n = records
+            entries = [
+                {'type': 'user', 'message': {'role': 'user', 'content': f"继续执行任务 {n}"}},
+                {'type': 'assistant', 'message': {'role': 'assistant', 'content': [
+                    {'type': 'text', 'text': f"迭代 {n}：{filler[:rng.randint(200, 2000)]}"},
+                    {'type': 'tool_use', 'id': f"tool_{n}", 'name': 'Bash',
+                     'input': {'command': 'pytest -q'}},
+                ]}},
+                {'type': 'user', 'message': {'role': 'user', 'content': [
+                    {'type': 'tool_result', 'tool_use_id': f"tool_{n}",
+                     'content': filler[:rng.randint(500, 4096)] * rng.randint(1, 8)},
+                ]}},
+            ]
+            for entry in entries:
+                line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+                f.write(line)
+                written += len(line.encode('utf-8'))
+                records += 1
+        last = {'type': 'assistant', 'message': {'role': 'assistant', 'content': [
+            {'type': 'text', 'text': '所有完成标准已满足。\n<promise>ALL_PHASES_COMPLETE</promise>'},
+        ]}}
+        f.write(json.dumps(last, ensure_ascii=False, separators=(',', ':')) + '\n')
+    return records + 1
+
+
+def make_note_entry(iteration: int, rng: random.Random) -> str:
+    """生成一条迭代记录（约 1-2 KB）"""
+    words = lambda count: ' '.join(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+                                   for _ in range(count))
+    steps = '\n'.join(f"{i + 1}. {words(12)}" for i in range(rng.randint(3, 6)))
+    return (f"---\n## 迭代 {iteration} | 2026-01-01 {iteration % 24:02d}:00\n"
+            f"**阶段**: Phase {iteration // 10 + 1}\n**任务**: {words(8)}\n\n"
+            f"### 执行步骤\n{steps}\n\n### 发现\n- {words(20)}\n\n### 下一步\n- {words(10)}\n\n")
+
+
+def _best_of(func, repeat: int = 3) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_transcript(args) -> None:
+    """最后一条 assistant 消息的读取耗时：grep | tail | jq 与按块逆序读取"""
+    sizes = [int(size) for size in args.sizes.split(',')]
+    has_legacy = shutil.which('jq') is not None
+    work_dir = Path(tempfile.mkdtemp(prefix='ralph_bench_'))
+    try:
+        print(f"{'size MB':>8}{'records':>10}{'grep|tail|jq s':>16}{'helper s':>10}{'in-process ms':>15}")
+        for size in sizes:
+            path = work_dir / f"transcript_{size}.jsonl"
+            records = make_transcript(path, size)
+            assert read_last_assistant(path)['promise'] == 'ALL_PHASES_COMPLETE'
+
+            legacy = ''
+            if has_legacy:
+                elapsed = _best_of(lambda: subprocess.run(
+                    ['bash', '-c', LEGACY_COMMAND, str(path)], capture_output=True, check=True))
+                legacy = f"{elapsed:.3f}"
+            helper = _best_of(lambda: subprocess.run(
+                [sys.executable, str(SCRIPT_DIR / 'transcript_tail.py'), str(path)],
+                capture_output=True, check=True))
+            in_process = _best_of(lambda: read_last_assistant(path), repeat=5)
+            print(f"{size:>8}{records:>10}{legacy or 'n/a':>16}{helper:>10.3f}{in_process * 1000:>15.2f}")
+            path.unlink()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_hook(args) -> None:
+    """每次停止的状态读写耗时：shell 逐项解析与 ralph_state.py 一次读写"""
+    work_dir = Path(tempfile.mkdtemp(prefix='ralph_bench_'))
+    try:
+        claude_dir = work_dir / '.claude'
+        claude_dir.mkdir()
+        state_file = claude_dir / 'ralph-state.yaml'
+        state_file.write_text(STATE_TEMPLATE, encoding='utf-8')
+        transcript = work_dir / 'transcript.jsonl'
+        make_transcript(transcript, 1)
+        hook_input = json.dumps({'transcript_path': str(transcript)}).encode('utf-8')
+
+        def legacy():
+            for _ in range(args.runs):
+                subprocess.run(['bash', '-c', LEGACY_STATE_COMMAND, str(state_file)],
+                               capture_output=True, check=True)
+
+        def run_hook(hook: Path):
+            for _ in range(args.runs):
+                subprocess.run(['bash', str(hook)], input=hook_input, cwd=work_dir,
+                               capture_output=True, check=True)
+
+        cases = [('shell state parsing (state only)', legacy)]
+        if args.legacy_hook:
+            # 旧版 stop-hook.sh（例如 git show <commit>:hooks/stop-hook.sh 导出的文件）
+            cases.append(('legacy stop-hook.sh (full hook)', lambda: run_hook(Path(args.legacy_hook))))
+        cases.append(('ralph_state.py (full hook)',
+                      lambda: run_hook(SCRIPT_DIR.parent / 'hooks' / 'stop-hook.sh')))
+
+        print(f"{'stop hook':<34}{'ms/stop':>10}")
+        for label, func in cases:
+            state_file.write_text(STATE_TEMPLATE, encoding='utf-8')
+            print(f"{label:<34}{_best_of(func) / args.runs * 1000:>10.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_plan(args) -> None:
+    """任务计划查询耗时：grep/sed 逐项解析、结构化解析与缓存读取"""
+    work_dir = Path(tempfile.mkdtemp(prefix='ralph_bench_'))
+    try:
+        task_plan = work_dir / 'task_plan.md'
+        make_task_plan(task_plan, args.tasks)
+        text = task_plan.read_text(encoding='utf-8')
+        plan = load_summary(task_plan)
+
+        legacy = subprocess.run(['bash', '-c', LEGACY_PLAN_COMMAND, str(task_plan)],
+                                capture_output=True, text=True, check=True).stdout.split(' ', 4)
+        assert [int(value) for value in legacy[:4]] == [
+            plan.total, plan.completed, plan.criteria_total, plan.criteria_completed]
+        assert legacy[4].strip() == plan.current_task
+
+        def uncached():
+            cache_path_for(task_plan).unlink(missing_ok=True)
+            load_summary(task_plan)
+
+        print(f"Task plan: {plan.total} tasks in {len(plan.phases)} phases, {len(text.encode('utf-8')) / 1024:.0f} KB")
+        print(f"{'query':<28}{'ms':>10}")
+        cases = (
+            ('grep/sed pipeline', lambda: subprocess.run(
+                ['bash', '-c', LEGACY_PLAN_COMMAND, str(task_plan)], capture_output=True, check=True)),
+            ('task_plan.py summary', lambda: subprocess.run(
+                [sys.executable, str(SCRIPT_DIR / 'task_plan.py'), 'summary', str(task_plan)],
+                capture_output=True, check=True)),
+            ('parse (in-process)', lambda: parse_task_plan(text)),
+            ('parse + write cache', uncached),
+            ('cache hit (in-process)', lambda: load_summary(task_plan)),
+        )
+        for label, func in cases:
+            print(f"{label:<28}{_best_of(func, repeat=5) * 1000:>10.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_notes(args) -> None:
+    """notes.md 的大小和每次停止的压缩耗时：每次迭代在顶部添加一条记录"""
+    rng = random.Random(0)
+    entries = [make_note_entry(iteration, rng) for iteration in range(1, args.iterations + 1)]
+    header = '# 工作日志\n\n<!-- 最新的迭代记录在最前面 -->\n\n'
+    print(f"{'iterations':>10}{'uncompacted KB':>16}{'compacted KB':>14}{'compact ms':>12}")
+    work_dir = Path(tempfile.mkdtemp(prefix='ralph_bench_'))
+    try:
+        notes = work_dir / 'notes.md'
+        notes.write_text(header, encoding='utf-8')
+        uncompacted = len(header.encode('utf-8'))
+        report = {args.iterations // 10 * k for k in (1, 2, 5, 10)} | {args.iterations}
+        slowest = 0.0
+        for iteration, entry in enumerate(entries, 1):
+            text = notes.read_text(encoding='utf-8')
+            position = text.find('---\n## 迭代')
+            position = len(text) if position == -1 else position
+            notes.write_text(text[:position] + entry + text[position:], encoding='utf-8')
+            uncompacted += len(entry.encode('utf-8'))
+
+            start = time.perf_counter()
+            compact_notes(notes, args.keep)
+            elapsed = time.perf_counter() - start
+            slowest = max(slowest, elapsed)
+            if iteration in report:
+                print(f"{iteration:>10}{uncompacted / 1024:>16.0f}{notes.stat().st_size / 1024:>14.1f}"
+                      f"{elapsed * 1000:>12.2f}")
+        assert lookup(1, notes) == entries[0]
+        print(f"slowest compaction: {slowest * 1000:.2f} ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ralph-planning 性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    transcript = subparsers.add_parser('transcript', help='Stop Hook 读取最后一条 assistant 消息的耗时')
+    transcript.add_argument('--sizes', default='10,100,300', help='会话记录大小（MB，逗号分隔）')
+    transcript.set_defaults(func=bench_transcript)
+
+    hook = subparsers.add_parser('hook', help='Stop Hook 每次停止的状态读写耗时')
+    hook.add_argument('--runs', type=int, default=20, help='每轮运行次数')
+    hook.add_argument('--legacy-hook', default=None, help='对比用的旧版 stop-hook.sh')
+    hook.set_defaults(func=bench_hook)
+
+    plan = subparsers.add_parser('plan', help='task_plan.md 查询耗时')
+    plan.add_argument('--tasks', type=int, default=500, help='任务数')
+    plan.set_defaults(func=bench_plan)
+
+    notes = subparsers.add_parser('notes', help='notes.md 压缩后的大小和耗时')
+    notes.add_argument('--iterations', type=int, default=500, help='迭代次数')
+    notes.add_argument('--keep', type=int, default=10, help='notes.md 中保留的迭代记录数')
+    notes.set_defaults(func=bench_notes)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+notes.md 的滚动压缩
+
+每次迭代都要读取 .claude/notes.md，而每次迭代都会在顶部添加一条记录，从不删除。
+这里在 Stop Hook 中压缩 notes.md，让每次迭代读取的内容保持在固定大小：
+
+- notes.md 只保留最近 N 条迭代记录（默认 10 条，状态文件中的 notes_keep）
+- 更早的记录按时间顺序追加到 .claude/notes.archive.md（只追加，不修改）
+- 每条归档记录的位置（迭代序号、偏移、长度）追加到 .claude/notes.archive.idx，
+  按迭代序号查找时直接定位，不需要读取整个归档
+- notes.md 顶部保留一段简短的归档摘要（归档的迭代和日期范围、查找方法）
+
+每次压缩只读写 notes.md 本身、索引的第一行和新追加的内容，耗时与循环运行了多久无关。
+
+迭代记录以 "## 迭代 N" 开头，前面的 "---" 分隔线属于该记录。
+
+用法：
+    python3 notes_archive.py compact [--keep N]   # 立即压缩 .claude/notes.md
+    python3 notes_archive.py show <迭代序号>       # 输出归档中的一条记录
+"""
+
+import os
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+NOTES_FILE = Path('.claude') / 'notes.md'
+
+# notes.md 中默认保留的迭代记录数
+DEFAULT_KEEP = 10
+
+SUMMARY_BEGIN = '<!-- ralph-notes-archive -->'
+SUMMARY_END = '<!-- /ralph-notes-archive -->'
+
+_ENTRY_HEADING = re.compile(r'^## 迭代\s*(\d+)')
+
+
+@dataclass(slots=True)
+class NoteEntry:
+    """一条迭代记录"""
+
+    iteration: int
+    title: str      # 标题行（"## 迭代 N | 日期"）
+    text: str       # 完整内容（包括前面的分隔线）
+
+    @property
+    def date(self) -> str:
+        """标题中 "|" 之后的日期，没有时为空字符串"""
+        return self.title.partition('|')[2].strip()
+
+
+@dataclass(slots=True)
+class IndexEntry:
+    """归档索引中的一项"""
+
+    iteration: int
+    offset: int
+    length: int
+    date: str = ''
+
+
+def archive_path_for(notes: Path) -> Path:
+    return Path(notes).with_name('notes.archive.md')
+
+
+def index_path_for(notes: Path) -> Path:
+    return Path(notes).with_name('notes.archive.idx')
+
+
+def split_notes(text: str) -> tuple[str, list[NoteEntry]]:
+    """
+    拆分 notes.md
+
+    Args:
+        text: 文件内容
+
+    Returns:
+        (头部（第一条记录之前的内容，不含归档摘要）, 迭代记录（按文件中的顺序）)
+    """
+    lines = text.splitlines(keepends=True)
+    starts = []
+    for number, line in enumerate(lines):
+        match = _ENTRY_HEADING.match(line)
+        if match is None:
+            continue
+        # 向前跳过空行，紧挨着的 "---" 分隔线属于这条记录
+        start = number
+        previous = number - 1
+        while previous >= 0 and not lines[previous].strip():
+            previous -= 1
+        if previous >= 0 and lines[previous].strip() == '---' and (not starts or previous > starts[-1][0]):
+            start = previous
+        starts.append((start, number, int(match.group(1))))
+
+    if not starts:
+        return _strip_summary(text), []
+
+    header = ''.join(lines[:starts[0][0]])
+    entries = []
+    for position, (start, heading, iteration) in enumerate(starts):
+        end = starts[position + 1][0] if position + 1 < len(starts) else len(lines)
+        entries.append(NoteEntry(iteration=iteration, title=lines[heading].strip(),
+                                 text=''.join(lines[start:end])))
+    return _strip_summary(header), entries
+
+
+def _strip_summary(header: str) -> str:
+    """去掉头部中旧的归档摘要"""
+    begin = header.find(SUMMARY_BEGIN)
+    end = header.find(SUMMARY_END)
+    if begin == -1 or end == -1:
+        return header
+    end += len(SUMMARY_END)
+    if header[end:end + 1] == '\n':
+        end += 1
+    while header[end:end + 1] == '\n':
+        end += 1
+    return header[:begin] + header[end:]
+
+
+def read_index(index_file: Path) -> list[IndexEntry]:
+    """读取归档索引（每行：迭代序号 偏移 长度 日期）"""
+    entries = []
+    try:
+        with open(index_file, encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split(' ', 3)
+                if len(parts) < 3:
+                    continue  # 写入中断的行
+                try:
+                    entries.append(IndexEntry(int(parts[0]), int(parts[1]), int(parts[2]),
+                                              parts[3] if len(parts) > 3 else ''))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def first_index_entry(index_file: Path) -> Optional[IndexEntry]:
+    """索引的第一项（最早归档的记录）"""
+    try:
+        with open(index_file, encoding='utf-8') as f:
+            parts = f.readline().rstrip('\n').split(' ', 3)
+        return IndexEntry(int(parts[0]), int(parts[1]), int(parts[2]), parts[3] if len(parts) > 3 else '')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def archive_entries(entries: list[NoteEntry], archive_file: Path, index_file: Path) -> list[IndexEntry]:
+    """
+    把记录按时间顺序追加到归档，并追加索引
+
+    Args:
+        entries: 要归档的记录（按时间顺序，最早的在前）
+        archive_file: 归档文件
+        index_file: 索引文件
+
+    Returns:
+        新增的索引项
+    """
+    added = []
+    with open(archive_file, 'ab') as archive:
+        offset = archive.seek(0, os.SEEK_END)
+        for entry in entries:
+            data = entry.text.encode('utf-8')
+            archive.write(data)
+            added.append(IndexEntry(entry.iteration, offset, len(data), entry.date))
+            offset += len(data)
+        archive.flush()
+        os.fsync(archive.fileno())
+    with open(index_file, 'a', encoding='utf-8') as index:
+        for item in added:
+            index.write(f"{item.iteration} {item.offset} {item.length} {item.date}\n")
+    return added
+
+
+def render_summary(first: IndexEntry, last: IndexEntry, notes: Path) -> str:
+    """
+    归档摘要（大小与归档的记录数无关）
+
+    Args:
+        first: 最早归档的记录
+        last: 最近归档的记录
+        notes: notes.md 路径
+    """
+    command = f"python3 {Path(__file__).resolve()}"
+    if Path(notes) != NOTES_FILE:
+        command = f"{command} --notes {notes}"
+    dates = f"，{first.date} 至 {last.date}" if first.date and last.date else ''
+    return (
+        f"{SUMMARY_BEGIN}\n"
+        f"> 📦 较早的迭代记录已归档（迭代 {first.iteration}-{last.iteration}{dates}），"
+        f"保存在 {archive_path_for(notes).name}。\n"
+        f"> 查看某次迭代：`{command} show <迭代序号>`\n"
+        f"{SUMMARY_END}\n\n"
+    )
+
+
+def compact_notes(notes: Path = NOTES_FILE, keep: int = DEFAULT_KEEP) -> int:
+    """
+    压缩 notes.md：保留最近 keep 条记录，其余归档
+
+    Args:
+        notes: notes.md 路径
+        keep: 保留的记录数（小于 1 时不压缩）
+
+    Returns:
+        本次归档的记录数
+    """
+    notes = Path(notes)
+    if keep < 1:
+        return 0
+    try:
+        text = notes.read_text(encoding='utf-8')
+    except OSError:
+        return 0
+    header, entries = split_notes(text)
+    if len(entries) <= keep:
+        return 0
+
+    # 按迭代序号（而不是文件中的位置）保留最新的 keep 条：新记录被追加到末尾时也不会误归档。
+    # 保留的记录从新到旧写回，其余按时间顺序归档
+    entries.sort(key=lambda entry: entry.iteration, reverse=True)
+    kept, old = entries[:keep], entries[keep:]
+    old.reverse()
+    archive_file, index_file = archive_path_for(notes), index_path_for(notes)
+    added = archive_entries(old, archive_file, index_file)
+
+    summary = render_summary(first_index_entry(index_file) or added[0], added[-1], notes)
+    # 原来在文件末尾的记录可能不以空行结尾，重新排列后统一用空行隔开
+    body = ''.join(entry.text.rstrip('\n') + '\n\n' for entry in kept)
+    temp_file = notes.with_name(f"{notes.name}.tmp.{os.getpid()}")
+    temp_file.write_text(header + summary + body, encoding='utf-8')
+    os.replace(temp_file, notes)
+    return len(old)
+
+
+def lookup(iteration: int, notes: Path = NOTES_FILE) -> Optional[str]:
+    """按迭代序号读取归档中的记录（同一序号归档过多次时取最后一次）"""
+    found = None
+    for item in read_index(index_path_for(notes)):
+        if item.iteration == iteration:
+            found = item
+    if found is None:
+        return None
+    with open(archive_path_for(notes), 'rb') as archive:
+        archive.seek(found.offset)
+        return archive.read(found.length).decode('utf-8')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='notes.md 的滚动压缩')
+    parser.add_argument('--notes', type=Path, default=NOTES_FILE, help='notes.md 路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compact = subparsers.add_parser('compact', help='保留最近的记录，其余归档')
+    compact.add_argument('--keep', type=int, default=DEFAULT_KEEP, help='保留的迭代记录数')
+
+    show = subparsers.add_parser('show', help='输出归档中的一条记录')
+    show.add_argument('iteration', type=int, help='迭代序号')
+
+    args = parser.parse_args()
+    if args.command == 'compact':
+        count = compact_notes(args.notes, args.keep)
+        print(f"✓ 已归档 {count} 条迭代记录" if count else "notes.md 无需压缩")
+    else:
+        text = lookup(args.iteration, args.notes)
+        if text is None:
+            print(f"❌ 归档中没有迭代 {args.iteration}", file=sys.stderr)
+            sys.exit(1)
+        print(text, end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,27 +2,59 @@
 # ralph-status.sh
 # 显示 Ralph-Planning 循环状态
 
-STATE_FILE=".claude/ralph-state.yaml"
-TASK_PLAN=".claude/task_plan.md"
+# 用法: ralph-status.sh [循环名]
+
+PLUGIN_ROOT="$(dirname "$(dirname "$(readlink -f "$0")")")"
+RALPH_STATE="$PLUGIN_ROOT/scripts/ralph_state.py"
+
+# 选择循环（只有一个循环或一个活跃循环时可以省略循环名）
+LOOP_ARGS=()
+if [[ -n "$1" ]]; then
+    LOOP_ARGS=(--loop "$1")
+fi
+LOOP_DIR=$(python3 "$RALPH_STATE" path "${LOOP_ARGS[@]}")
+case $? in
+    0)
+        ;;
+    2)
+        # 有多个循环：列出所有循环
+        echo "Ralph-Planning 循环:"
+        python3 "$RALPH_STATE" list
+        echo ""
+        echo "💡 使用 /ralph-status <循环名> 查看某个循环的详细状态"
+        exit 0
+        ;;
+    *)
+        if [[ -n "$1" ]]; then
+            echo "❌ 没有名为 $1 的 Ralph-Planning 循环"
+        else
+            echo "❌ 没有活跃的 Ralph-Planning 循环"
+        fi
+        exit 0
+        ;;
+esac
+
+STATE_FILE="$LOOP_DIR/ralph-state.yaml"
+TASK_PLAN="$LOOP_DIR/task_plan.md"
+METRICS_FILE="$LOOP_DIR/ralph-metrics.jsonl"
 
 if [[ ! -f "$STATE_FILE" ]]; then
     echo "❌ 没有活跃的 Ralph-Planning 循环"
     exit 0
 fi
 
-# 解析状态
-parse_yaml() {
-    grep "^${1}:" "$STATE_FILE" 2>/dev/null | sed "s/^${1}: *//" | sed 's/^"\(.*\)"$/\1/'
-}
-
-ACTIVE=$(parse_yaml "active")
-ITERATION=$(parse_yaml "current_iteration")
-MAX_ITER=$(parse_yaml "max_iterations")
-STARTED=$(parse_yaml "started_at")
-ERRORS=$(parse_yaml "error_count")
-CONSECUTIVE=$(parse_yaml "consecutive_errors")
-INTERVENTION=$(parse_yaml "human_intervention_requested")
-PAUSE_REASON=$(parse_yaml "pause_reason")
+# 解析状态（ralph_state.py 一次读取所有字段，每行一个值）
+{
+    read -r ACTIVE
+    read -r ITERATION
+    read -r MAX_ITER
+    read -r STARTED
+    read -r ERRORS
+    read -r CONSECUTIVE
+    read -r INTERVENTION
+    read -r PAUSE_REASON
+} < <(python3 "$RALPH_STATE" get "${LOOP_ARGS[@]}" active current_iteration max_iterations \
+        started_at error_count consecutive_errors human_intervention_requested pause_reason)
 
 echo "╔══════════════════════════════════════════════════════════════╗"
 echo "║              Ralph-Planning 循环状态                          ║"
@@ -34,6 +66,9 @@ else
     echo "║  状态: 🔴 已停止                                             ║"
 fi
 
+if [[ "$LOOP_DIR" != ".claude" ]]; then
+    echo "║  循环: $(basename "$LOOP_DIR") ($LOOP_DIR)"
+fi
 printf "║  迭代: %d / %d                                              ║\n" "$ITERATION" "$MAX_ITER"
 echo "║  开始时间: $STARTED"
 printf "║  错误统计: 总计 %d, 连续 %d                                  ║\n" "$ERRORS" "$CONSECUTIVE"
@@ -42,15 +77,45 @@ if [[ "$INTERVENTION" == "true" ]]; then
     echo "║  ⚠️  人工介入已请求: $PAUSE_REASON"
 fi
 
+# 迭代指标（Stop Hook 每次停止时写入循环目录中的 ralph-metrics.jsonl）
+if [[ -f "$METRICS_FILE" ]]; then
+    {
+        read -r RECORDED
+        read -r AVG_TIME
+        read -r TASKS_PER_HOUR
+        read -r AVG_GROWTH
+        read -r STALLED
+        read -r SINCE_LAST
+    } < <(python3 "$PLUGIN_ROOT/scripts/ralph_metrics.py" summary "$STARTED" --file "$METRICS_FILE")
+
+    if [[ ${RECORDED:-0} -gt 0 ]]; then
+        echo "║  吞吐量: ${TASKS_PER_HOUR:-?} 任务/小时, 平均每次迭代 ${AVG_TIME:-?}"
+        if [[ -n "$AVG_GROWTH" ]]; then
+            echo "║  会话记录增长: 平均每次迭代 $AVG_GROWTH"
+        fi
+        if [[ ${STALLED:-0} -gt 0 ]]; then
+            echo "║  ⚠️  停滞: 最近 $STALLED 次迭代没有完成任务"
+        fi
+        if [[ "$ACTIVE" == "true" && -n "$SINCE_LAST" ]]; then
+            echo "║  ⚠️  迭代过慢: 距上一次停止已 $SINCE_LAST"
+        fi
+    fi
+fi
+
 echo "╠══════════════════════════════════════════════════════════════╣"
 
 # 显示任务进度
 if [[ -f "$TASK_PLAN" ]]; then
     echo "║  任务进度:                                                   ║"
 
-    # 统计各阶段完成情况
-    TOTAL_TASKS=$(grep -c '^\- \[' "$TASK_PLAN" 2>/dev/null) || TOTAL_TASKS=0
-    COMPLETED_TASKS=$(grep -c '^\- \[x\]' "$TASK_PLAN" 2>/dev/null) || COMPLETED_TASKS=0
+    # 任务统计和当前任务来自 task_plan.py 的结构化索引（文件未变化时读取缓存）
+    {
+        read -r TOTAL_TASKS
+        read -r COMPLETED_TASKS
+        read -r TOTAL_CRITERIA
+        read -r COMPLETED_CRITERIA
+        read -r CURRENT
+    } < <(python3 "$PLUGIN_ROOT/scripts/task_plan.py" summary "$TASK_PLAN")
 
     # 确保是数字
     TOTAL_TASKS=${TOTAL_TASKS:-0}
@@ -70,12 +135,11 @@ if [[ -f "$TASK_PLAN" ]]; then
         printf "]  ║\n"
     fi
 
-    # 显示当前任务
-    CURRENT=$(grep -m1 '← \*\*当前任务\*\*' "$TASK_PLAN" 2>/dev/null | sed 's/← \*\*当前任务\*\*//' | sed 's/^- \[ \] //')
-    if [[ -z "$CURRENT" ]]; then
-        CURRENT=$(grep -m1 '^\- \[ \]' "$TASK_PLAN" 2>/dev/null | sed 's/^- \[ \] //')
+    if [[ ${TOTAL_CRITERIA:-0} -gt 0 ]]; then
+        echo "║  完成标准: $COMPLETED_CRITERIA/$TOTAL_CRITERIA"
     fi
 
+    # 显示当前任务
     if [[ -n "$CURRENT" ]]; then
         echo "║                                                              ║"
         echo "║  📌 当前任务: $CURRENT"
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Ralph-Planning 循环注册表
+
+同一个项目目录中可以同时运行多个循环（每个循环在各自的会话中）。每个循环的
+状态文件、任务计划、工作日志等都在自己的目录中：
+
+- default 循环使用 .claude/（与单循环时的路径相同）
+- 其他循环使用 .claude/ralph/<循环名>/
+
+注册表 .claude/ralph-loops.json 记录所有循环及其所属会话：/ralph-plan 注册循环并生成
+绑定标记（输出到启动循环的会话中，因此写入该会话的会话记录）。Stop Hook 只把尚未绑定的循环
+绑定给会话记录中出现过该标记的会话，之后每个会话只推进自己的循环；没有启动过循环的会话
+不会认领任何循环。/ralph-continue 解除原来的绑定并生成新的标记，由运行它的会话接管。
+注册表的读-改-写持有 fcntl 文件锁（ralph-loops.json.lock）。
+"""
+
+import fcntl
+import json
+import os
+import re
+import secrets
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+CLAUDE_DIR = Path('.claude')
+LOOPS_DIR = CLAUDE_DIR / 'ralph'
+REGISTRY_FILE = CLAUDE_DIR / 'ralph-loops.json'
+
+DEFAULT_LOOP = 'default'
+
+_LOOP_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+def loop_dir(loop_id: str) -> Path:
+    """循环的目录（default 循环为 .claude/）"""
+    return CLAUDE_DIR if loop_id == DEFAULT_LOOP else LOOPS_DIR / loop_id
+
+
+def valid_loop_id(loop_id: str) -> bool:
+    return bool(_LOOP_NAME.match(loop_id))
+
+
+@dataclass(slots=True)
+class Loop:
+    """一个循环"""
+
+    id: str
+    session_id: str = ''    # 所属会话（第一次停止时绑定）
+    started_at: str = ''
+    token: str = ''         # 绑定标记：出现在哪个会话的会话记录中，循环就绑定给哪个会话
+
+    @property
+    def dir(self) -> Path:
+        return loop_dir(self.id)
+
+    @property
+    def state_file(self) -> Path:
+        return self.dir / 'ralph-state.yaml'
+
+    @property
+    def task_plan(self) -> Path:
+        return self.dir / 'task_plan.md'
+
+    @property
+    def notes(self) -> Path:
+        return self.dir / 'notes.md'
+
+    @property
+    def metrics(self) -> Path:
+        return self.dir / 'ralph-metrics.jsonl'
+
+    def to_dict(self) -> dict:
+        return {'session_id': self.session_id, 'started_at': self.started_at, 'token': self.token}
+
+
+def new_token(loop_id: str) -> str:
+    """生成绑定标记（只含 ASCII 字符，在 JSON 格式的会话记录中原样出现）"""
+    return f"ralph-bind:{loop_id}:{secrets.token_hex(8)}"
+
+
+def _read_registry(path: Path) -> dict[str, Loop]:
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        data = {}
+    loops = {}
+    for loop_id, entry in (data.get('loops') or {}).items():
+        if isinstance(entry, dict) and valid_loop_id(loop_id):
+            loops[loop_id] = Loop(loop_id, entry.get('session_id') or '', entry.get('started_at') or '',
+                                  entry.get('token') or '')
+    # 注册表出现之前创建的单个循环
+    if DEFAULT_LOOP not in loops and loop_dir(DEFAULT_LOOP).joinpath('ralph-state.yaml').exists():
+        loops[DEFAULT_LOOP] = Loop(DEFAULT_LOOP)
+    return loops
+
+
+def _write_registry(path: Path, loops: dict[str, Loop]) -> None:
+    path = Path(path)
+    data = {'loops': {loop_id: loop.to_dict() for loop_id, loop in sorted(loops.items())}}
+    temp_file = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+    temp_file.write_text(json.dumps(data, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+    os.replace(temp_file, path)
+
+
+def load_registry(path: Path = REGISTRY_FILE) -> dict[str, Loop]:
+    """读取注册表（只读，不加锁；写入是原子替换，不会读到一半的文件）"""
+    return _read_registry(path)
+
+
+@contextmanager
+def locked_registry(path: Path = REGISTRY_FILE) -> Iterator[dict[str, Loop]]:
+    """
+    持有文件锁读取注册表，退出时如有修改则写回
+
+    Yields:
+        循环名 -> Loop
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            loops = _read_registry(path)
+            before = {loop_id: loop.to_dict() for loop_id, loop in loops.items()}
+            yield loops
+            if {loop_id: loop.to_dict() for loop_id, loop in loops.items()} != before:
+                _write_registry(path, loops)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def register(loop_id: str, started_at: str = '', path: Path = REGISTRY_FILE) -> Loop:
+    """
+    注册（或重新开始）一个循环，生成新的绑定标记；所属会话在第一次停止时按标记绑定
+
+    Args:
+        loop_id: 循环名
+        started_at: 开始时间
+        path: 注册表路径
+
+    Returns:
+        Loop
+    """
+    with locked_registry(path) as loops:
+        loop = Loop(loop_id, '', started_at, new_token(loop_id))
+        loops[loop_id] = loop
+    return loop
+
+
+def release(loop_id: str, path: Path = REGISTRY_FILE) -> str:
+    """
+    解除循环与会话的绑定并生成新的绑定标记，会话记录中出现新标记的会话接管该循环
+
+    /ralph-continue 调用：/clear、重启或换一个会话继续时，原来绑定的会话不会再推进循环。
+
+    Args:
+        loop_id: 循环名
+        path: 注册表路径
+
+    Returns:
+        新的绑定标记
+    """
+    with locked_registry(path) as loops:
+        loop = loops.get(loop_id)
+        if loop is None:
+            # 注册表出现之前创建的循环
+            loop = loops[loop_id] = Loop(loop_id)
+        loop.session_id = ''
+        loop.token = new_token(loop_id)
+        return loop.token
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Ralph-Planning 循环的迭代指标
+
+Stop Hook 每次停止时向 .claude/ralph-metrics.jsonl 追加一条记录：
+
+- 时间戳、本次迭代序号、距上一次停止的耗时
+- 会话记录的大小和增长量
+- 任务完成数及其变化
+- 本次停止的决定（继续循环，或停止的原因）
+
+/ralph-status 汇总当前循环的吞吐量（任务/小时、平均迭代耗时）并标记停滞：
+最近连续多次迭代没有完成任务，或者距上一次停止的时间远超平均迭代耗时。
+
+记录按循环的 started_at 区分，同一个文件可以包含多次循环的记录；
+读取时从文件末尾向前读，遇到其他循环的记录即停止。
+
+用法：
+    python3 ralph_metrics.py summary [started_at] [--file PATH]   # 每行一个值（供 ralph-status.sh 读取）
+    python3 ralph_metrics.py records [started_at] [--file PATH]   # 输出当前循环的全部记录（JSON Lines）
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from transcript_tail import iter_lines_reversed
+
+METRICS_FILE = Path('.claude') / 'ralph-metrics.jsonl'
+
+# 连续多少次迭代没有完成任务视为停滞
+STALL_ITERATIONS = 3
+# 距上一次停止的时间超过平均迭代耗时的多少倍视为迭代过慢
+SLOW_FACTOR = 3
+
+# 停止的决定
+DECISION_CONTINUE = 'continue'
+DECISION_HUMAN_INTERVENTION = 'human_intervention'
+DECISION_CONSECUTIVE_ERRORS = 'consecutive_errors'
+DECISION_MAX_ITERATIONS = 'max_iterations'
+DECISION_PROMISE = 'promise'
+
+
+@dataclass(slots=True)
+class IterationRecord:
+    """一次迭代（一次停止）的指标"""
+
+    time: str                                   # 停止时间（ISO 8601）
+    started_at: str                             # 所属循环的开始时间
+    iteration: int                              # 本次完成的迭代序号
+    decision: str                               # 停止的决定
+    seconds: Optional[float] = None             # 距上一次停止（第一次为距循环开始）的秒数
+    transcript: str = ''                        # 会话记录路径
+    transcript_bytes: Optional[int] = None      # 会话记录大小
+    transcript_growth: Optional[int] = None     # 会话记录较上一次停止的增长（会话变化时为 None）
+    tasks_completed: Optional[int] = None       # 已完成任务数
+    tasks_total: Optional[int] = None           # 任务总数
+    tasks_delta: Optional[int] = None           # 本次迭代完成的任务数（第一次为 None）
+
+
+@dataclass(slots=True)
+class MetricsSummary:
+    """当前循环的指标汇总"""
+
+    iterations: int = 0
+    average_seconds: Optional[float] = None     # 平均迭代耗时
+    tasks_per_hour: Optional[float] = None      # 吞吐量
+    average_growth: Optional[float] = None      # 平均每次迭代的会话记录增长（字节）
+    stalled_iterations: int = 0                 # 最近连续没有完成任务的迭代数
+    since_last: Optional[float] = None          # 距上一次停止的秒数
+
+    @property
+    def stalled(self) -> bool:
+        return self.stalled_iterations >= STALL_ITERATIONS
+
+    @property
+    def slow(self) -> bool:
+        """距上一次停止的时间远超平均迭代耗时（当前迭代可能卡住了）"""
+        return (self.average_seconds is not None and self.since_last is not None
+                and self.since_last > SLOW_FACTOR * self.average_seconds)
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).astimezone()
+
+
+def load_records(path: Path = METRICS_FILE, started_at: Optional[str] = None) -> list[dict]:
+    """
+    读取一次循环的记录（按时间顺序）
+
+    Args:
+        path: 指标文件路径
+        started_at: 循环的开始时间；为 None 时取最后一条记录所属的循环
+
+    Returns:
+        记录列表
+    """
+    if not Path(path).is_file():
+        return []
+    records = []
+    for line in iter_lines_reversed(path):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # 正在写入的最后一行可能不完整
+        if not isinstance(record, dict):
+            continue
+        if started_at is None:
+            started_at = record.get('started_at')
+        if record.get('started_at') != started_at:
+            break
+        records.append(record)
+    records.reverse()
+    return records
+
+
+def last_record(path: Path = METRICS_FILE) -> Optional[dict]:
+    """最后一条记录（只读取文件末尾）"""
+    if not Path(path).is_file():
+        return None
+    for line in iter_lines_reversed(path):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            return record
+    return None
+
+
+def build_record(previous: Optional[dict], *, started_at: str, iteration: int, decision: str,
+                 transcript_path: str = '', tasks_completed: Optional[int] = None,
+                 tasks_total: Optional[int] = None, now: Optional[datetime] = None) -> IterationRecord:
+    """
+    根据上一条记录计算本次迭代的指标
+
+    Args:
+        previous: 上一条记录（属于其他循环时只用于判断，不参与计算）
+        started_at: 当前循环的开始时间
+        iteration: 本次完成的迭代序号
+        decision: 停止的决定
+        transcript_path: 会话记录路径
+        tasks_completed: 已完成任务数
+        tasks_total: 任务总数
+        now: 停止时间（默认为当前时间）
+
+    Returns:
+        IterationRecord
+    """
+    now = now or _now()
+    if previous is not None and previous.get('started_at') != started_at:
+        previous = None
+
+    since = _parse_time(previous['time']) if previous else _parse_time(started_at)
+    seconds = round((now - since).total_seconds(), 3) if since else None
+
+    transcript_bytes = None
+    if transcript_path:
+        try:
+            transcript_bytes = os.stat(transcript_path).st_size
+        except OSError:
+            pass
+    transcript_growth = None
+    if (previous and transcript_bytes is not None and previous.get('transcript') == transcript_path
+            and previous.get('transcript_bytes') is not None):
+        transcript_growth = transcript_bytes - previous['transcript_bytes']
+
+    tasks_delta = None
+    if previous and tasks_completed is not None and previous.get('tasks_completed') is not None:
+        tasks_delta = tasks_completed - previous['tasks_completed']
+
+    return IterationRecord(
+        time=now.isoformat(timespec='milliseconds'),
+        started_at=started_at,
+        iteration=iteration,
+        decision=decision,
+        seconds=seconds,
+        transcript=transcript_path,
+        transcript_bytes=transcript_bytes,
+        transcript_growth=transcript_growth,
+        tasks_completed=tasks_completed,
+        tasks_total=tasks_total,
+        tasks_delta=tasks_delta,
+    )
+
+
+def append_record(record: IterationRecord, path: Path = METRICS_FILE) -> None:
+    """追加一条记录（一次写入一整行）"""
+    line = json.dumps(asdict(record), ensure_ascii=False) + '\n'
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+def summarize(records: list[dict], now: Optional[datetime] = None) -> MetricsSummary:
+    """
+    汇总一次循环的记录
+
+    Args:
+        records: load_records() 的结果
+        now: 当前时间（默认为当前时间）
+
+    Returns:
+        MetricsSummary
+    """
+    summary = MetricsSummary(iterations=len(records))
+    if not records:
+        return summary
+
+    durations = [record['seconds'] for record in records if record.get('seconds') is not None]
+    if durations:
+        summary.average_seconds = sum(durations) / len(durations)
+
+    # 吞吐量只统计能确定完成数变化的迭代
+    measured = [record for record in records
+                if record.get('seconds') is not None and record.get('tasks_delta') is not None]
+    hours = sum(record['seconds'] for record in measured) / 3600
+    if hours > 0:
+        summary.tasks_per_hour = sum(record['tasks_delta'] for record in measured) / hours
+
+    growth = [record['transcript_growth'] for record in records
+              if record.get('transcript_growth') is not None]
+    if growth:
+        summary.average_growth = sum(growth) / len(growth)
+
+    for record in reversed(records):
+        if record.get('tasks_delta') is None or record['tasks_delta'] > 0:
+            break
+        summary.stalled_iterations += 1
+
+    last_time = _parse_time(records[-1].get('time', ''))
+    if last_time is not None:
+        summary.since_last = ((now or _now()) - last_time).total_seconds()
+    return summary
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """格式化时长（例如 "4分12秒"、"1小时5分"）"""
+    if seconds is None:
+        return ''
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}秒"
+    if seconds < 3600:
+        return f"{seconds // 60}分{seconds % 60}秒"
+    return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+
+
+def format_size(size: Optional[float]) -> str:
+    """格式化字节数（例如 "120 KB"）"""
+    if size is None:
+        return ''
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Ralph-Planning 循环的迭代指标')
+    parser.add_argument('command', choices=('summary', 'records'))
+    parser.add_argument('started_at', nargs='?', default=None, help='循环的开始时间（默认为最后一次循环）')
+    parser.add_argument('--file', type=Path, default=METRICS_FILE, help='指标文件路径')
+    args = parser.parse_args()
+
+    records = load_records(args.file, args.started_at or None)
+    if args.command == 'records':
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False))
+        return
+
+    summary = summarize(records)
+    print(summary.iterations)
+    print(format_duration(summary.average_seconds))
+    print('' if summary.tasks_per_hour is None else f"{summary.tasks_per_hour:.1f}")
+    print(format_size(summary.average_growth))
+    print(summary.stalled_iterations if summary.stalled else 0)
+    print(format_duration(summary.since_last) if summary.slow else '')
+
+
+if __name__ == '__main__':
+    main()
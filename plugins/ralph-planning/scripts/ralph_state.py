@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+Ralph-Planning 循环状态引擎
+
+每个循环的 ralph-state.yaml（default 循环为 .claude/ralph-state.yaml，其他循环为
+.claude/ralph/<循环名>/ralph-state.yaml，见 ralph_loops.py）由 Stop Hook 和 /ralph-pause、
+/ralph-continue、/ralph-cancel、/ralph-status 共同读写。所有读写都经过本模块：
+
+- 状态文件只读取一次，所有判断和修改都在内存中完成，最后一次性写回
+- 写回时先写临时文件再原子替换，整个读-改-写过程持有 fcntl 文件锁
+  （锁加在 ralph-state.yaml.lock 上），并发的 /ralph-pause 不会被 Stop Hook 覆盖
+- 只修改顶层的 key: value 行，注释、prompt 多行文本等其余内容原样保留
+
+Stop Hook 的全部逻辑（人工介入、连续错误、最大迭代、完成标志、迭代计数）都在
+stop 子命令中完成，每次停止只启动一个解释器。每次停止还会向循环目录中的 ralph-metrics.jsonl
+追加一条迭代指标（见 ralph_metrics.py），继续循环时压缩 notes.md（见 notes_archive.py）。
+
+Stop Hook 按 hook 输入中的 session_id 找到当前会话的循环，只推进这一个循环；其他命令用
+--loop 指定循环，只有一个活跃循环时可以省略。循环只绑定给会话记录中出现过其绑定标记的会话
+（/ralph-plan 和 /ralph-continue 把标记输出到运行它们的会话中），其他会话不会认领循环。
+
+用法：
+    python3 ralph_state.py stop                           # Stop Hook（从标准输入读取 hook 输入）
+    python3 ralph_state.py get [--loop ID] <key>...       # 每行输出一个值（不存在时输出空行）
+    python3 ralph_state.py pause [--loop ID] [reason]     # 暂停循环
+    python3 ralph_state.py continue [--loop ID]           # 继续循环（由运行本命令的会话接管）
+    python3 ralph_state.py cancel [--loop ID]             # 取消循环
+    python3 ralph_state.py list                           # 列出所有循环
+    python3 ralph_state.py path [--loop ID]               # 输出循环目录（有多个循环且未指定时退出码为 2）
+    python3 ralph_state.py register <ID> [started_at]     # 注册新循环，输出绑定标记（由 setup-ralph-plan.sh 调用）
+"""
+
+import fcntl
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import notes_archive
+import ralph_metrics
+from ralph_loops import (DEFAULT_LOOP, REGISTRY_FILE, Loop, load_registry, locked_registry, register,
+                         release, valid_loop_id)
+from task_plan import PlanSummary, load_summary
+from transcript_tail import find_markers, read_last_assistant
+
+STATE_DIR = Path('.claude')
+STATE_FILE = STATE_DIR / 'ralph-state.yaml'
+
+# 默认值（状态文件中缺少对应项时使用）
+DEFAULT_MAX_ITERATIONS = 50
+DEFAULT_MAX_CONSECUTIVE_ERRORS = 3
+
+# 下一次迭代的 prompt
+NEXT_PROMPT = """继续执行任务。
+
+**重要 - 每次迭代必须执行以下步骤:**
+
+1. **恢复上下文**:
+   - 读取 {task_plan} 确认当前阶段和任务
+   - 读取 {notes} 查看最近的迭代记录
+
+2. **执行当前任务**:
+   - 找到第一个未完成的 [ ] 任务
+   - 专注完成这一个任务
+
+3. **更新状态文件**:
+   - 在 task_plan.md 中将完成的任务标记为 [x]
+   - 在 notes.md 顶部添加本次迭代记录
+
+4. **检查完成条件**:
+   - 如果"完成标准"中所有 [ ] 都变成 [x]
+   - 并且你确认工作真正完成
+   - 输出: <promise>ALL_PHASES_COMPLETE</promise>
+
+如需人工介入，在 task_plan.md 的"人工备注区"说明原因。"""
+
+_KEY_LINE = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*):[ \t]*(.*)$')
+
+
+def format_value(value) -> str:
+    """把 Python 值格式化为 YAML 标量（字符串加双引号）"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return str(value)
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+    return f'"{escaped}"'
+
+
+def parse_value(raw: str) -> str:
+    """去掉 YAML 标量两端的双引号（与原来 shell 中的 sed 解析一致）"""
+    raw = raw.strip()
+    if len(raw) >= 2 and raw.startswith('"') and raw.endswith('"'):
+        return raw[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return raw
+
+
+class RalphState:
+    """循环状态（保留原文件的行，只替换被修改的顶层键）"""
+
+    def __init__(self, path: Path, lines: list[str]):
+        self.path = Path(path)
+        self.lines = lines
+        self.dirty = False
+        self._index = {}
+        for number, line in enumerate(lines):
+            match = _KEY_LINE.match(line)
+            if match and match.group(1) not in self._index:
+                self._index[match.group(1)] = number
+
+    @classmethod
+    def load(cls, path: Path = STATE_FILE) -> 'RalphState':
+        return cls(path, Path(path).read_text(encoding='utf-8').splitlines())
+
+    def get(self, key: str, default: str = '') -> str:
+        """读取字符串值（去掉引号），不存在时返回 default"""
+        number = self._index.get(key)
+        if number is None:
+            return default
+        return parse_value(_KEY_LINE.match(self.lines[number]).group(2))
+
+    def get_int(self, key: str, default: int) -> int:
+        try:
+            return int(self.get(key))
+        except ValueError:
+            return default
+
+    def get_bool(self, key: str) -> bool:
+        return self.get(key) == 'true'
+
+    def set(self, key: str, value) -> None:
+        """修改（或追加）一个顶层键"""
+        line = f"{key}: {format_value(value)}"
+        number = self._index.get(key)
+        if number is None:
+            self._index[key] = len(self.lines)
+            self.lines.append(line)
+        elif self.lines[number] == line:
+            return
+        else:
+            self.lines[number] = line
+        self.dirty = True
+
+    def save(self) -> None:
+        """原子写回（先写临时文件再替换）"""
+        temp_file = self.path.with_name(f"{self.path.name}.tmp.{os.getpid()}")
+        temp_file.write_text('\n'.join(self.lines) + '\n', encoding='utf-8')
+        os.replace(temp_file, self.path)
+        self.dirty = False
+
+
+@contextmanager
+def locked_state(path: Path = STATE_FILE) -> Iterator[Optional[RalphState]]:
+    """
+    持有文件锁读取状态，退出时如有修改则写回
+
+    Yields:
+        RalphState；状态文件不存在时为 None
+    """
+    path = Path(path)
+    if not path.exists():
+        yield None
+        return
+    lock_file = path.with_name(path.name + '.lock')
+    with open(lock_file, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            state = RalphState.load(path)
+            yield state
+            if state.dirty:
+                state.save()
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def stop_decision(state: RalphState, transcript_path: str = '', plan: Optional[PlanSummary] = None,
+                  loop: Optional[Loop] = None) -> tuple[Optional[dict], str, list[str]]:
+    """
+    Stop Hook 的判断：在内存中修改状态，由调用方一次性写回
+
+    Args:
+        state: 循环状态
+        transcript_path: 会话记录路径（用于检测完成标志）
+        plan: 任务计划摘要（用于显示当前任务）
+        loop: 所属循环（用于 prompt 中的文件路径，默认为 default 循环）
+
+    Returns:
+        (阻止退出时返回给 Claude Code 的 JSON，否则为 None,
+         停止的决定（ralph_metrics.DECISION_*，循环未激活时为空字符串）, 输出到标准错误的提示)
+    """
+    if not state.get_bool('active'):
+        return None, '', []
+
+    iteration = state.get_int('current_iteration', 1)
+    max_iterations = state.get_int('max_iterations', DEFAULT_MAX_ITERATIONS)
+    consecutive_errors = state.get_int('consecutive_errors', 0)
+    max_consecutive_errors = state.get_int('max_consecutive_errors', DEFAULT_MAX_CONSECUTIVE_ERRORS)
+    completion_promise = state.get('completion_promise')
+
+    # 人工介入、连续错误、最大迭代、完成标志：停止循环，允许退出
+    if state.get_bool('human_intervention_requested'):
+        state.set('active', False)
+        return None, ralph_metrics.DECISION_HUMAN_INTERVENTION, ["⏸️  人工介入已请求，循环暂停"]
+
+    if consecutive_errors >= max_consecutive_errors:
+        state.set('human_intervention_requested', True)
+        state.set('pause_reason', 'consecutive_errors_exceeded')
+        state.set('active', False)
+        return None, ralph_metrics.DECISION_CONSECUTIVE_ERRORS, [
+            f"⚠️  连续错误次数过多 ({consecutive_errors})，暂停等待人工检查"]
+
+    if max_iterations > 0 and iteration >= max_iterations:
+        state.set('active', False)
+        return None, ralph_metrics.DECISION_MAX_ITERATIONS, [f"🛑 已达到最大迭代次数 ({max_iterations})"]
+
+    if completion_promise:
+        last = read_last_assistant(transcript_path)
+        if last['text'] and last['promise'] == completion_promise:
+            state.set('active', False)
+            return None, ralph_metrics.DECISION_PROMISE, [
+                f"✅ 检测到完成标志: <promise>{completion_promise}</promise>"]
+
+    # 继续循环：迭代计数加一，本次迭代成功完成，连续错误清零
+    next_iteration = iteration + 1
+    state.set('current_iteration', next_iteration)
+    state.set('consecutive_errors', 0)
+
+    loop = loop or Loop(DEFAULT_LOOP)
+    system_message = f"🔄 迭代 {next_iteration}/{max_iterations}"
+    if loop.id != DEFAULT_LOOP:
+        system_message = f"🔄 [{loop.id}] 迭代 {next_iteration}/{max_iterations}"
+    task = plan.current_task if plan else ''
+    if task:
+        system_message = f"{system_message} | 任务: {task}"
+    prompt = NEXT_PROMPT.format(task_plan=loop.task_plan, notes=loop.notes)
+    decision = {'decision': 'block', 'reason': prompt, 'systemMessage': system_message}
+    return decision, ralph_metrics.DECISION_CONTINUE, []
+
+
+def record_metrics(state: RalphState, outcome: str, transcript_path: str,
+                   plan: Optional[PlanSummary], metrics_file: Path = ralph_metrics.METRICS_FILE) -> None:
+    """
+    追加本次迭代的指标（写入失败不影响 Stop Hook 的判断）
+
+    Args:
+        state: 已经过 stop_decision 修改的循环状态
+        outcome: stop_decision 返回的决定
+        transcript_path: 会话记录路径
+        plan: 任务计划摘要
+        metrics_file: 指标文件路径
+    """
+    iteration = state.get_int('current_iteration', 1)
+    if outcome == ralph_metrics.DECISION_CONTINUE:
+        iteration -= 1  # stop_decision 已经把计数加一
+    try:
+        record = ralph_metrics.build_record(
+            ralph_metrics.last_record(metrics_file),
+            started_at=state.get('started_at'),
+            iteration=iteration,
+            decision=outcome,
+            transcript_path=transcript_path,
+            tasks_completed=plan.completed if plan else None,
+            tasks_total=plan.total if plan else None,
+        )
+        ralph_metrics.append_record(record, metrics_file)
+    except OSError:
+        pass
+
+
+def is_active(loop: Loop) -> bool:
+    try:
+        return RalphState.load(loop.state_file).get_bool('active')
+    except OSError:
+        return False
+
+
+def claim_loop(session_id: str, transcript_path: str = '') -> Optional[Loop]:
+    """
+    找到会话的循环：已绑定到该会话的活跃循环；没有时绑定会话记录中出现过绑定标记的、
+    尚未绑定会话的活跃循环（即这个会话启动或用 /ralph-continue 接管的循环）
+
+    只在需要绑定时才对注册表加锁写入。
+
+    Args:
+        session_id: hook 输入中的 session_id
+        transcript_path: hook 输入中的会话记录路径
+
+    Returns:
+        Loop；该会话没有循环时返回 None
+    """
+    if not REGISTRY_FILE.exists():
+        # 注册表出现之前创建的单个循环：与原来一样由任何会话推进
+        loop = load_registry().get(DEFAULT_LOOP)
+        return loop if loop is not None and is_active(loop) else None
+
+    active = [loop for loop in load_registry().values() if is_active(loop)]
+    if not session_id:
+        # hook 输入中没有 session_id 时只能处理单个循环
+        return active[0] if len(active) == 1 else None
+    own = [loop for loop in active if loop.session_id == session_id]
+    if own:
+        return max(own, key=lambda loop: loop.started_at)
+
+    unclaimed = {loop.token: loop for loop in active if not loop.session_id and loop.token}
+    found = find_markers(transcript_path, list(unclaimed))
+    if not found:
+        return None
+    with locked_registry() as loops:
+        # 加锁后重新确认：其他会话可能刚刚绑定了同一个循环
+        candidates = [loops[loop.id] for token, loop in unclaimed.items()
+                      if token in found and loop.id in loops
+                      and not loops[loop.id].session_id and loops[loop.id].token == token]
+        if not candidates:
+            return None
+        loop = max(candidates, key=lambda loop: loop.started_at)
+        loop.session_id = session_id
+        return loop
+
+
+class AmbiguousLoopError(Exception):
+    """有多个循环且没有指定 --loop"""
+
+    def __init__(self, loops: list[Loop]):
+        super().__init__(', '.join(loop.id for loop in loops))
+        self.loops = loops
+
+
+def select_loop(loop_id: Optional[str]) -> Optional[Loop]:
+    """
+    按循环名选择循环；未指定时选择唯一的循环（或唯一的活跃循环）
+
+    Returns:
+        Loop；没有对应的循环时返回 None
+
+    Raises:
+        AmbiguousLoopError: 有多个循环且无法确定
+    """
+    loops = {loop.id: loop for loop in load_registry().values() if loop.state_file.exists()}
+    if loop_id:
+        return loops.get(loop_id)
+    if len(loops) <= 1:
+        return next(iter(loops.values()), None)
+    active = [loop for loop in loops.values() if is_active(loop)]
+    if len(active) == 1:
+        return active[0]
+    raise AmbiguousLoopError(sorted(loops.values(), key=lambda loop: loop.id))
+
+
+def format_loop(loop: Loop) -> str:
+    """循环列表中的一行"""
+    try:
+        state = RalphState.load(loop.state_file)
+    except OSError:
+        return f"  ❔ {loop.id:<20} 状态文件不存在"
+    if state.get_bool('human_intervention_requested'):
+        icon = '⏸️ '
+    else:
+        icon = '🟢' if state.get_bool('active') else '🔴'
+    line = (f"  {icon} {loop.id:<20} 迭代 {state.get('current_iteration')}/{state.get('max_iterations')}")
+    plan = load_summary(loop.task_plan)
+    if plan is not None and plan.total:
+        line += f"  任务 {plan.completed}/{plan.total}"
+    line += f"  {loop.dir}"
+    if loop.session_id:
+        line += f"  会话 {loop.session_id[:8]}"
+    return line
+
+
+def _selected(loop_id: Optional[str], missing: str) -> Optional[Loop]:
+    """命令行选择循环，失败时输出提示并返回 None"""
+    try:
+        loop = select_loop(loop_id)
+    except AmbiguousLoopError as e:
+        print("⚠️  有多个 Ralph-Planning 循环，请使用 --loop 指定:")
+        for item in e.loops:
+            print(format_loop(item))
+        return None
+    if loop is None:
+        print(f"❌ 没有名为 {loop_id} 的 Ralph-Planning 循环" if loop_id else missing)
+    return loop
+
+
+def command_stop() -> int:
+    if not REGISTRY_FILE.exists() and not STATE_FILE.exists():
+        return 0  # 项目中没有循环：不读取 hook 输入，也不创建 .claude/
+    try:
+        hook_input = json.loads(sys.stdin.read() or '{}')
+    except ValueError:
+        hook_input = {}
+    transcript_path = hook_input.get('transcript_path') or ''
+    loop = claim_loop(hook_input.get('session_id') or '', transcript_path)
+    if loop is None:
+        return 0  # 当前会话没有活跃循环，允许退出
+    with locked_state(loop.state_file) as state:
+        if state is None:
+            return 0
+        plan = load_summary(loop.task_plan)
+        decision, outcome, messages = stop_decision(state, transcript_path, plan, loop)
+        if outcome:
+            record_metrics(state, outcome, transcript_path, plan, loop.metrics)
+        if outcome == ralph_metrics.DECISION_CONTINUE:
+            try:
+                notes_archive.compact_notes(loop.notes,
+                                            state.get_int('notes_keep', notes_archive.DEFAULT_KEEP))
+            except OSError:
+                pass  # 压缩失败不影响循环，下次停止时重试
+    for message in messages:
+        print(message, file=sys.stderr)
+    if decision is not None:
+        print(json.dumps(decision, ensure_ascii=False, indent=2))
+    return 0
+
+
+def command_get(loop_id: Optional[str], keys: list[str]) -> int:
+    try:
+        loop = select_loop(loop_id)
+    except AmbiguousLoopError:
+        return 2
+    if loop is None:
+        return 1
+    state = RalphState.load(loop.state_file)
+    for key in keys:
+        print(state.get(key))
+    return 0
+
+
+def command_path(loop_id: Optional[str]) -> int:
+    try:
+        loop = select_loop(loop_id)
+    except AmbiguousLoopError:
+        return 2
+    if loop is None:
+        return 1
+    print(loop.dir)
+    return 0
+
+
+def command_list() -> int:
+    loops = [loop for loop in load_registry().values() if loop.state_file.exists()]
+    if not loops:
+        print("❌ 没有 Ralph-Planning 循环")
+        return 0
+    for loop in sorted(loops, key=lambda loop: loop.id):
+        print(format_loop(loop))
+    return 0
+
+
+def command_register(loop_id: str, started_at: str) -> int:
+    if not valid_loop_id(loop_id):
+        print(f"❌ 无效的循环名: {loop_id}（只能包含字母、数字、_、- 和 .）", file=sys.stderr)
+        return 1
+    # 输出绑定标记：setup-ralph-plan.sh 把它显示在启动循环的会话中
+    print(register(loop_id, started_at).token)
+    return 0
+
+
+def command_pause(loop_id: Optional[str], reason: str) -> int:
+    loop = _selected(loop_id, "❌ 没有活跃的 Ralph-Planning 循环")
+    if loop is None:
+        return 1
+    with locked_state(loop.state_file) as state:
+        if state is None:
+            print("❌ 没有活跃的 Ralph-Planning 循环")
+            return 1
+        state.set('human_intervention_requested', True)
+        state.set('pause_reason', reason)
+
+    print(f"⏸️  Ralph-Planning 循环已暂停{_loop_suffix(loop)}")
+    print(f"原因: {reason}")
+    print("")
+    print("使用 /ralph-continue 继续循环")
+    return 0
+
+
+def command_continue(loop_id: Optional[str]) -> int:
+    loop = _selected(loop_id, "❌ 没有 Ralph-Planning 循环可以继续")
+    if loop is None:
+        return 1
+    with locked_state(loop.state_file) as state:
+        if state is None:
+            print("❌ 没有 Ralph-Planning 循环可以继续")
+            return 1
+        paused = state.get_bool('human_intervention_requested')
+        if not paused and not state.get_bool('active'):
+            print("ℹ️  循环未处于暂停状态")
+            return 0
+        if paused:
+            state.set('human_intervention_requested', False)
+            state.set('pause_reason', None)
+            state.set('consecutive_errors', 0)
+            state.set('active', True)
+
+    # 原来绑定的会话可能已经不存在（/clear、重启或换了会话）：生成新的绑定标记，
+    # 标记输出到运行本命令的会话中，由这个会话接管循环
+    token = release(loop.id)
+
+    if paused:
+        print(f"▶️  Ralph-Planning 循环已继续{_loop_suffix(loop)}")
+    else:
+        print(f"ℹ️  循环未处于暂停状态，已改由当前会话接管{_loop_suffix(loop)}")
+    print(f"🔑 会话绑定标记: {token}")
+    print("")
+    print("循环将在当前会话下次停止时恢复执行")
+    return 0
+
+
+def command_cancel(loop_id: Optional[str]) -> int:
+    loop = _selected(loop_id, "❌ 没有活跃的 Ralph-Planning 循环")
+    if loop is None:
+        return 0
+    with locked_state(loop.state_file) as state:
+        if state is None:
+            print("❌ 没有活跃的 Ralph-Planning 循环")
+            return 0
+        state.set('active', False)
+
+    print(f"🛑 Ralph-Planning 循环已取消{_loop_suffix(loop)}")
+    print("")
+    print("状态文件已保留，你可以查看:")
+    print(f"  - {loop.state_file} (循环状态)")
+    print(f"  - {loop.task_plan} (任务计划)")
+    print(f"  - {loop.notes} (工作日志)")
+    return 0
+
+
+def _loop_suffix(loop: Loop) -> str:
+    return '' if loop.id == DEFAULT_LOOP else f" [{loop.id}]"
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().split('用法：')[1].rstrip(), file=sys.stderr)
+        sys.exit(1)
+    if sys.argv[1] == 'stop':
+        sys.exit(command_stop())
+
+    # 只有命令行需要 argparse：Stop Hook 每次停止都要启动解释器，不为它付出导入时间
+    import argparse
+
+    loop_option = argparse.ArgumentParser(add_help=False)
+    loop_option.add_argument('--loop', default=None, help='循环名（只有一个活跃循环时可以省略）')
+    parser = argparse.ArgumentParser(description='Ralph-Planning 循环状态')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stop', help='Stop Hook')
+    get = subparsers.add_parser('get', parents=[loop_option], help='读取状态值')
+    get.add_argument('keys', nargs='*')
+    pause = subparsers.add_parser('pause', parents=[loop_option], help='暂停循环')
+    pause.add_argument('reason', nargs='*')
+    subparsers.add_parser('continue', parents=[loop_option], help='继续循环')
+    subparsers.add_parser('cancel', parents=[loop_option], help='取消循环')
+    subparsers.add_parser('list', help='列出所有循环')
+    subparsers.add_parser('path', parents=[loop_option], help='输出循环目录')
+    new = subparsers.add_parser('register', help='注册新循环')
+    new.add_argument('loop_id')
+    new.add_argument('started_at', nargs='?', default='')
+
+    args = parser.parse_args()
+    if args.command == 'stop':
+        sys.exit(command_stop())
+    elif args.command == 'get':
+        sys.exit(command_get(args.loop, args.keys))
+    elif args.command == 'pause':
+        sys.exit(command_pause(args.loop, ' '.join(args.reason) or 'manual_pause'))
+    elif args.command == 'continue':
+        sys.exit(command_continue(args.loop))
+    elif args.command == 'cancel':
+        sys.exit(command_cancel(args.loop))
+    elif args.command == 'list':
+        sys.exit(command_list())
+    elif args.command == 'path':
+        sys.exit(command_path(args.loop))
+    else:
+        sys.exit(command_register(args.loop_id, args.started_at))
+
+
+if __name__ == '__main__':
+    main()
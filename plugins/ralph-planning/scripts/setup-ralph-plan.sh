@@ -5,14 +5,11 @@
 set -e
 
 PLUGIN_ROOT="$(dirname "$(dirname "$(readlink -f "$0")")")"
-STATE_DIR=".claude"
-STATE_FILE="$STATE_DIR/ralph-state.yaml"
-TASK_PLAN="$STATE_DIR/task_plan.md"
-NOTES="$STATE_DIR/notes.md"
 
 # 默认值
 MAX_ITERATIONS=50
 COMPLETION_PROMISE="ALL_PHASES_COMPLETE"
+LOOP_NAME=""
 PROMPT=""
 
 # 解析参数
@@ -26,6 +23,10 @@ while [[ $# -gt 0 ]]; do
             COMPLETION_PROMISE="$2"
             shift 2
             ;;
+        --name)
+            LOOP_NAME="$2"
+            shift 2
+            ;;
         *)
             if [[ -z "$PROMPT" ]]; then
                 PROMPT="$1"
@@ -40,22 +41,48 @@ done
 # 检查 prompt
 if [[ -z "$PROMPT" ]]; then
     echo "❌ 错误: 请提供任务描述"
-    echo "用法: /ralph-plan \"任务描述\" [--max-iterations N] [--completion-promise TEXT]"
+    echo "用法: /ralph-plan \"任务描述\" [--max-iterations N] [--completion-promise TEXT] [--name 循环名]"
     exit 1
 fi
 
-# 检查是否已有活跃循环
-if [[ -f "$STATE_FILE" ]]; then
-    ACTIVE=$(grep "^active:" "$STATE_FILE" | awk '{print $2}')
-    if [[ "$ACTIVE" == "true" ]]; then
-        echo "⚠️  已有活跃的 Ralph-Planning 循环"
-        echo "使用 /ralph-cancel 取消当前循环，或 /ralph-status 查看状态"
-        exit 1
+# 循环是否活跃
+loop_active() {
+    [[ -f "$1/ralph-state.yaml" ]] && [[ "$(grep "^active:" "$1/ralph-state.yaml" | awk '{print $2}')" == "true" ]]
+}
+
+# 选择循环目录：default 循环使用 .claude/，其他循环使用 .claude/ralph/<循环名>/
+if [[ -z "$LOOP_NAME" ]]; then
+    if loop_active ".claude"; then
+        # 已有活跃的 default 循环（例如另一个会话中的循环）：新循环使用独立目录
+        LOOP_NAME="loop-$(date +%Y%m%d-%H%M%S)"
+        echo "ℹ️  已有活跃的 Ralph-Planning 循环，新循环命名为 $LOOP_NAME"
+    else
+        LOOP_NAME="default"
     fi
 fi
+if [[ ! "$LOOP_NAME" =~ ^[A-Za-z0-9][A-Za-z0-9_.-]*$ ]]; then
+    echo "❌ 错误: 无效的循环名: $LOOP_NAME（只能包含字母、数字、_、- 和 .）"
+    exit 1
+fi
+if [[ "$LOOP_NAME" == "default" ]]; then
+    STATE_DIR=".claude"
+else
+    STATE_DIR=".claude/ralph/$LOOP_NAME"
+fi
+STATE_FILE="$STATE_DIR/ralph-state.yaml"
+TASK_PLAN="$STATE_DIR/task_plan.md"
+NOTES="$STATE_DIR/notes.md"
+
+# 检查该循环是否已在运行
+if loop_active "$STATE_DIR"; then
+    echo "⚠️  循环 $LOOP_NAME 正在运行"
+    echo "使用 /ralph-cancel --loop $LOOP_NAME 取消它，或使用 --name 启动另一个循环"
+    exit 1
+fi
 
-# 创建状态目录
+# 创建状态目录（notes.md 会被重新创建，上一次循环的归档一并清除；指标按开始时间区分，保留）
 mkdir -p "$STATE_DIR"
+rm -f "$STATE_DIR/notes.archive.md" "$STATE_DIR/notes.archive.idx"
 
 # 获取当前时间
 STARTED_AT=$(date -Iseconds)
@@ -78,6 +105,9 @@ prompt: |
 # 阶段检查点
 checkpoints: {}
 
+# notes.md 中保留的迭代记录数（更早的记录归档到 notes.archive.md）
+notes_keep: 10
+
 # 错误统计
 error_count: 0
 consecutive_errors: 0
@@ -156,11 +186,18 @@ $PROMPT
 
 EOF
 
+# 注册循环：输出的绑定标记显示在当前会话中，Stop Hook 据此只把循环绑定给这个会话
+BIND_TOKEN=$(python3 "$PLUGIN_ROOT/scripts/ralph_state.py" register "$LOOP_NAME" "$STARTED_AT")
+
 echo "✅ Ralph-Planning 循环已初始化"
 echo ""
+if [[ "$LOOP_NAME" != "default" ]]; then
+    echo "🏷️  循环名: $LOOP_NAME"
+fi
 echo "📁 状态文件: $STATE_FILE"
 echo "📋 任务计划: $TASK_PLAN"
 echo "📝 工作日志: $NOTES"
+echo "🔑 会话绑定标记: $BIND_TOKEN"
 echo ""
 echo "🔄 最大迭代次数: $MAX_ITERATIONS"
 echo "🎯 完成标志: <promise>$COMPLETION_PROMISE</promise>"
@@ -169,5 +206,6 @@ echo "💡 提示:"
 echo "   - 使用 /ralph-status 查看当前状态"
 echo "   - 使用 /ralph-pause 暂停循环"
 echo "   - 使用 /ralph-cancel 取消循环"
+echo "   - 同时运行多个循环时，用 --loop $LOOP_NAME 指定这个循环"
 echo ""
 echo "🚀 开始执行任务..."
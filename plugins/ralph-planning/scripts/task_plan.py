@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+task_plan.md 的结构化索引
+
+Stop Hook 和 /ralph-status 都需要任务计划中的信息：任务总数和完成数、"完成标准"
+部分的完成情况、当前任务。这里把 task_plan.md 解析为结构化的模型（阶段、任务、完成标准、
+当前任务），两个工具读取同一个模型，统计口径一致。
+
+查询用的摘要（各项计数、各阶段进度、当前任务）以 JSON 缓存在 .claude/task_plan.cache.json 中，
+以 task_plan.md 的修改时间（纳秒）和大小为键，文件没有变化时直接读取缓存，不再解析。
+摘要的大小只与阶段数有关，任务很多时读取缓存也比重新解析快。
+
+解析规则：
+- 任务为行首的 "- [ ] " 或 "- [x] "（勾选不区分大小写，"- [X] " 也算完成）
+- "## 完成标准" 到下一个 "---" 或下一个二级标题之间的任务为完成标准
+- 当前任务为带有 "← **当前任务**" 标记的任务，没有标记时为第一个未完成的任务
+
+与原来的 grep/sed 的差异：原来的完成标准部分只在 "---" 处结束（模板中各部分之间都有分隔线，
+结果相同）；"- [X] " 原来计入总数但不算完成，现在算作完成。
+
+用法：
+    python3 task_plan.py summary [task_plan.md]   # 每行一个值：总数、完成数、完成标准总数、完成标准完成数、当前任务
+    python3 task_plan.py json [task_plan.md]      # 输出完整模型（不使用缓存）
+"""
+
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+TASK_PLAN = Path('.claude') / 'task_plan.md'
+
+CURRENT_TASK_MARKER = '← **当前任务**'
+CRITERIA_HEADING = '## 完成标准'
+PHASE_PREFIX = '## Phase'
+PHASE_STATUSES = ('✅', '🔄', '⏳')
+
+# 缓存格式版本（解析规则变化时旧缓存作废）
+CACHE_VERSION = 2
+
+
+@dataclass(slots=True)
+class Task:
+    """一个任务（或完成标准）"""
+
+    text: str
+    done: bool
+    line: int                 # 行号（从 1 开始）
+    current: bool = False     # 带有当前任务标记
+
+
+@dataclass(slots=True)
+class Phase:
+    """一个阶段（## Phase N: ...）"""
+
+    title: str
+    status: str               # ✅、🔄、⏳，没有标记时为空字符串
+    line: int
+    tasks: list[Task] = field(default_factory=list)
+
+    @property
+    def completed(self) -> int:
+        return sum(1 for task in self.tasks if task.done)
+
+
+@dataclass(slots=True)
+class TaskPlan:
+    """task_plan.md 的结构化模型"""
+
+    title: str = ''
+    criteria: list[Task] = field(default_factory=list)
+    phases: list[Phase] = field(default_factory=list)
+    other: list[Task] = field(default_factory=list)   # 不属于完成标准和阶段的任务
+    current: Optional[Task] = None
+
+    @property
+    def tasks(self) -> list[Task]:
+        """所有任务（按行号排序）"""
+        tasks = self.criteria + self.other
+        for phase in self.phases:
+            tasks.extend(phase.tasks)
+        return sorted(tasks, key=lambda task: task.line)
+
+    @property
+    def total(self) -> int:
+        return len(self.criteria) + len(self.other) + sum(len(phase.tasks) for phase in self.phases)
+
+    @property
+    def completed(self) -> int:
+        return (sum(1 for task in self.criteria if task.done) + sum(1 for task in self.other if task.done)
+                + sum(phase.completed for phase in self.phases))
+
+    @property
+    def criteria_completed(self) -> int:
+        return sum(1 for task in self.criteria if task.done)
+
+    @property
+    def criteria_met(self) -> bool:
+        """所有完成标准都已勾选（没有完成标准时为 False）"""
+        return bool(self.criteria) and self.criteria_completed == len(self.criteria)
+
+    @property
+    def current_task(self) -> str:
+        return self.current.text if self.current else ''
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> 'PlanSummary':
+        return PlanSummary(
+            title=self.title,
+            total=self.total,
+            completed=self.completed,
+            criteria_total=len(self.criteria),
+            criteria_completed=self.criteria_completed,
+            current_task=self.current_task,
+            current_line=self.current.line if self.current else 0,
+            phases=[PhaseSummary(phase.title, phase.status, len(phase.tasks), phase.completed)
+                    for phase in self.phases],
+        )
+
+
+@dataclass(slots=True)
+class PhaseSummary:
+    """一个阶段的进度"""
+
+    title: str
+    status: str
+    total: int
+    completed: int
+
+
+@dataclass(slots=True)
+class PlanSummary:
+    """任务计划的查询摘要（缓存的内容）"""
+
+    title: str = ''
+    total: int = 0
+    completed: int = 0
+    criteria_total: int = 0
+    criteria_completed: int = 0
+    current_task: str = ''
+    current_line: int = 0
+    phases: list[PhaseSummary] = field(default_factory=list)
+
+    @property
+    def criteria_met(self) -> bool:
+        """所有完成标准都已勾选（没有完成标准时为 False）"""
+        return self.criteria_total > 0 and self.criteria_completed == self.criteria_total
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PlanSummary':
+        phases = [PhaseSummary(**phase) for phase in data.pop('phases', [])]
+        return cls(**data, phases=phases)
+
+
+def _parse_task(line: str, number: int) -> Optional[Task]:
+    """解析行首的 "- [ ] " / "- [x] " 任务（x 不区分大小写），其他行返回 None"""
+    if line.startswith('- [ ]'):
+        done = False
+    elif line.startswith(('- [x]', '- [X]')):
+        done = True
+    else:
+        return None
+    current = CURRENT_TASK_MARKER in line
+    text = line[5:].replace(CURRENT_TASK_MARKER, '').strip()
+    return Task(text=text, done=done, line=number, current=current)
+
+
+def parse_task_plan(text: str) -> TaskPlan:
+    """
+    解析 task_plan.md 的内容
+
+    Args:
+        text: 文件内容
+
+    Returns:
+        TaskPlan
+    """
+    plan = TaskPlan()
+    section = None          # 'criteria'、Phase 或 None
+    first_unchecked = None
+
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.startswith('# ') and not plan.title:
+            plan.title = line[2:].strip()
+            continue
+        if line.startswith('## '):
+            if line.startswith(CRITERIA_HEADING):
+                section = 'criteria'
+            elif line.startswith(PHASE_PREFIX):
+                title = line[3:].strip()
+                status = ''
+                for mark in PHASE_STATUSES:
+                    if title.endswith(mark):
+                        status = mark
+                        title = title[:-len(mark)].rstrip()
+                        break
+                section = Phase(title=title, status=status, line=number)
+                plan.phases.append(section)
+            else:
+                section = None
+            continue
+        if line.startswith('---'):
+            section = None
+            continue
+
+        task = _parse_task(line, number)
+        if task is None:
+            # 不在行首的当前任务标记（原来的 grep 匹配任意位置）
+            if plan.current is None and CURRENT_TASK_MARKER in line:
+                text = line.replace(CURRENT_TASK_MARKER, '').strip().removeprefix('- [ ] ')
+                plan.current = Task(text=text, done=False, line=number, current=True)
+            continue
+
+        if section == 'criteria':
+            plan.criteria.append(task)
+        elif isinstance(section, Phase):
+            section.tasks.append(task)
+        else:
+            plan.other.append(task)
+
+        if task.current and plan.current is None:
+            plan.current = task
+        if not task.done and first_unchecked is None:
+            first_unchecked = task
+
+    if plan.current is None:
+        plan.current = first_unchecked
+    return plan
+
+
+def cache_path_for(task_plan: Path) -> Path:
+    """任务计划对应的缓存文件路径（同一目录）"""
+    return Path(task_plan).with_name('task_plan.cache.json')
+
+
+def load_task_plan(task_plan: Path = TASK_PLAN) -> Optional[TaskPlan]:
+    """
+    解析任务计划的完整模型
+
+    Returns:
+        TaskPlan；文件不存在时返回 None
+    """
+    try:
+        return parse_task_plan(Path(task_plan).read_text(encoding='utf-8'))
+    except OSError:
+        return None
+
+
+def load_summary(task_plan: Path = TASK_PLAN) -> Optional[PlanSummary]:
+    """
+    读取任务计划的查询摘要（文件修改时间和大小没有变化时读取缓存）
+
+    Args:
+        task_plan: task_plan.md 路径
+
+    Returns:
+        PlanSummary；文件不存在时返回 None
+    """
+    task_plan = Path(task_plan)
+    try:
+        stat = task_plan.stat()
+    except OSError:
+        return None
+
+    key = {'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    cache_file = cache_path_for(task_plan)
+    try:
+        cached = json.loads(cache_file.read_text(encoding='utf-8'))
+        if cached.get('key') == key:
+            return PlanSummary.from_dict(cached['summary'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    plan = load_task_plan(task_plan)
+    if plan is None:
+        return None
+    summary = plan.summary()
+    try:
+        temp_file = cache_file.with_name(f"{cache_file.name}.tmp.{os.getpid()}")
+        temp_file.write_text(json.dumps({'key': key, 'summary': asdict(summary)}, ensure_ascii=False),
+                             encoding='utf-8')
+        os.replace(temp_file, cache_file)
+    except OSError:
+        pass  # 缓存只是加速，写入失败不影响结果
+    return summary
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('summary', 'json'):
+        print("Usage:", file=sys.stderr)
+        print("  python3 task_plan.py summary [task_plan.md]", file=sys.stderr)
+        print("  python3 task_plan.py json [task_plan.md]", file=sys.stderr)
+        sys.exit(1)
+
+    task_plan = Path(sys.argv[2]) if len(sys.argv) > 2 else TASK_PLAN
+    if sys.argv[1] == 'summary':
+        summary = load_summary(task_plan)
+        if summary is None:
+            sys.exit(1)
+        print(summary.total)
+        print(summary.completed)
+        print(summary.criteria_total)
+        print(summary.criteria_completed)
+        print(summary.current_task)
+    else:
+        plan = load_task_plan(task_plan)
+        if plan is None:
+            sys.exit(1)
+        print(json.dumps(plan.to_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+读取会话记录（transcript JSONL）中最后一条 assistant 消息
+
+Stop Hook 每次停止时都要检查最后一条 assistant 消息中的 <promise> 标签。
+会话记录只追加不修改，长时间的自主循环会让它增长到几百 MB，因此这里从文件末尾
+按块向前读取，找到最后一条 assistant 记录就停止：每次调用的耗时与会话长度无关。
+
+用法：
+    python3 transcript_tail.py <transcript.jsonl>
+
+输出一行 JSON：
+    {"found": true, "text": "最后一条消息的文本", "promise": "<promise> 标签内容"}
+"""
+
+import json
+import mmap
+import re
+import sys
+from pathlib import Path
+from typing import Iterator, Optional
+
+# 每次向前读取的块大小
+BLOCK_SIZE = 1 << 16
+
+_PROMISE = re.compile(r'<promise>(.*?)</promise>', re.DOTALL)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def iter_lines_reversed(path: str | Path, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    从文件末尾开始按块向前读取，逆序返回每一行（不含换行符，跳过空行）
+
+    Args:
+        path: 文件路径
+        block_size: 每次读取的字节数
+
+    Yields:
+        行内容（bytes）
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        position = f.tell()
+        pending = []  # 当前行已经读到的部分（后读到的在后面）
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size)
+
+            parts = block.split(b'\n')
+            if len(parts) == 1:
+                # 整块都在同一行中（超长的记录）
+                pending.append(block)
+                continue
+
+            line = parts[-1] + b''.join(reversed(pending))
+            if line.strip():
+                yield line
+            for line in reversed(parts[1:-1]):
+                if line.strip():
+                    yield line
+            pending = [parts[0]]
+
+        line = b''.join(reversed(pending))
+        if line.strip():
+            yield line
+
+
+def message_text(record: dict) -> str:
+    """
+    提取消息中的文本（content 为数组时拼接所有 text 块）
+
+    Args:
+        record: 会话记录中的一条记录
+    """
+    content = record.get('message', {}).get('content', '')
+    if isinstance(content, list):
+        return '\n'.join(block.get('text', '') for block in content
+                         if isinstance(block, dict) and block.get('type') == 'text')
+    return content if isinstance(content, str) else ''
+
+
+def extract_promise(text: str) -> str:
+    """
+    提取第一个 <promise> 标签的内容（去掉首尾空白，连续空白合并为一个空格）
+
+    Returns:
+        标签内容，没有标签时返回空字符串
+    """
+    match = _PROMISE.search(text)
+    if match is None:
+        return ''
+    return _WHITESPACE.sub(' ', match.group(1)).strip()
+
+
+def last_assistant_record(path: str | Path, block_size: int = BLOCK_SIZE) -> Optional[dict]:
+    """
+    查找最后一条 assistant 记录
+
+    Args:
+        path: 会话记录文件路径
+        block_size: 每次向前读取的字节数
+
+    Returns:
+        记录，没有 assistant 记录时返回 None
+    """
+    for line in iter_lines_reversed(path, block_size):
+        # 先按字节过滤，只解析可能是 assistant 消息的行
+        if b'"assistant"' not in line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # 正在写入的最后一行可能不完整
+        if isinstance(record, dict) and record.get('message', {}).get('role') == 'assistant':
+            return record
+    return None
+
+
+def read_last_assistant(path: str | Path) -> dict:
+    """
+    读取最后一条 assistant 消息的文本和 <promise> 标签
+
+    Returns:
+        {'found': bool, 'text': str, 'promise': str}
+    """
+    record = None
+    if path and Path(path).is_file():
+        record = last_assistant_record(path)
+    if record is None:
+        return {'found': False, 'text': '', 'promise': ''}
+    text = message_text(record)
+    return {'found': True, 'text': text, 'promise': extract_promise(text)}
+
+
+def find_markers(path: str | Path, markers: list[str]) -> set[str]:
+    """
+    会话记录中出现过的标记（如循环的绑定标记）
+
+    用 mmap 在整个文件中按字节查找，不逐行解析 JSON。
+
+    Args:
+        path: 会话记录文件路径
+        markers: 要查找的标记（ASCII 字符串）
+
+    Returns:
+        出现过的标记
+    """
+    found = set()
+    if not path or not markers:
+        return found
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for marker in markers:
+                if data.find(marker.encode('utf-8')) >= 0:
+                    found.add(marker)
+    except (OSError, ValueError):
+        pass  # 文件不存在或为空
+    return found
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 transcript_tail.py <transcript.jsonl>", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(read_last_assistant(sys.argv[1]), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()